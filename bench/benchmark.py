@@ -0,0 +1,270 @@
+
+"""
+Benchmark harness for Git Cleaner. Builds synthetic repositories with git
+fast-import, then times listing, matching, scanning and rewriting with every backend.
+Run it from the repository root:
+
+    python -m bench.benchmark --sizes 1000 100000 --output bench/results/run.json
+"""
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+from src.matcher import MessageMatcher
+from src.messageScan import MessageScanner, ScanReport
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+PLANTED: str = "leakedtoken"
+
+
+class SyntheticRepo:
+
+    @staticmethod
+    def stream(commits: int, branches: int, messageLength: int, plantEvery: int, seed: int) -> bytes:
+
+        """
+        Builds a fast-import stream describing a synthetic linear history with side branches.
+        Args:
+            commits (int): The number of commits on the main branch.
+            branches (int): The number of extra branches forked from random commits.
+            messageLength (int): The approximate length of each message body.
+            plantEvery (int): Every n-th commit subject contains the PLANTED word.
+            seed (int): The random seed, the same arguments always give the same history.
+        Returns:
+            bytes: The fast-import stream.
+        """
+
+        rng: random.Random = random.Random(seed)
+        words: list[str] = ["fix", "add", "update", "refactor", "remove", "module", "parser", "cache", "test", "docs"]
+        chunks: list[bytes] = list()
+        when: int = 1_600_000_000
+
+        for i in range(1, commits + 1):
+            subject: str = f"{rng.choice(words)} {rng.choice(words)} #{i}" + (f" {PLANTED}" if i % plantEvery == 0 else "")
+            body: str = ' '.join(rng.choice(words) for _ in range(messageLength // 6))
+            message: bytes = f"{subject}\n\n{body}\n".encode('utf-8')
+            content: bytes = f"{i}\n".encode('utf-8')
+            chunks.append(
+                b"commit refs/heads/main\nmark :%d\n" % i
+                + b"author Bench <bench@example.com> %d +0000\ncommitter Bench <bench@example.com> %d +0000\n" % (when + i, when + i)
+                + b"data %d\n%s" % (len(message), message)
+                + (b"from :%d\n" % (i - 1) if i > 1 else b"")
+                + b"M 100644 inline file%d.txt\ndata %d\n%s\n" % (i % 100, len(content), content)
+            )
+
+        for b in range(branches):
+            chunks.append(b"reset refs/heads/branch%d\nfrom :%d\n\n" % (b, rng.randint(1, commits)))
+
+        chunks.append(b"done\n")
+        return b''.join(chunks)
+
+    @staticmethod
+    def generate(path: str, commits: int, branches: int = 0, messageLength: int = 60,
+                 plantEvery: int = 10, seed: int = 0) -> str:
+
+        """
+        Creates a synthetic repository on disk, with main checked out.
+        Args:
+            path (str): The directory to create the repository in.
+            commits (int): The number of commits on the main branch.
+            branches (int): The number of extra branches.
+            messageLength (int): The approximate length of each message body.
+            plantEvery (int): Every n-th commit subject contains the PLANTED word.
+            seed (int): The random seed.
+        Returns:
+            str: The path of the repository.
+        """
+
+        subprocess.run(['git', 'init', '-q', '-b', 'main', path], check=True)
+        stream: bytes = SyntheticRepo.stream(commits, branches, messageLength, plantEvery, seed)
+        subprocess.run(['git', '-C', path, 'fast-import', '--quiet', '--done'], input=stream, check=True)
+        subprocess.run(['git', '-C', path, 'reset', '-q', '--hard', 'main'], check=True)
+        for key, value in (('user.name', 'Bench'), ('user.email', 'bench@example.com')):
+            subprocess.run(['git', '-C', path, 'config', key, value], check=True)
+        return path
+
+
+
+class Probe:
+
+    """
+    Measures one benchmark phase: wall time, processes spawned from Python,
+    and the peak resident set size of this process and of its children.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name: str = name
+        self._spawns: int = 0
+        self._result: dict = dict()
+
+    def __enter__(self) -> "Probe":
+
+        # Every subprocess.run/Popen goes through Popen.__init__, count them there
+        original: Callable = subprocess.Popen.__init__
+        probe: Probe = self
+
+        def counting(popen, *args, **kwargs) -> None:
+            probe._spawns += 1
+            original(popen, *args, **kwargs)
+
+        self._original: Callable = original
+        subprocess.Popen.__init__ = counting
+        self._start: float = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        elapsed: float = time.perf_counter() - self._start
+        subprocess.Popen.__init__ = self._original
+        self._result = {"phase": self._name, "seconds": round(elapsed, 4), "spawns": self._spawns, **Probe.peakRss()}
+
+    @staticmethod
+    def peakRss() -> dict:
+        if resource is None: return {"peakRssKb": None, "childrenPeakRssKb": None}
+        scale: int = 1024 if sys.platform == 'darwin' else 1  # macOS reports bytes, Linux kilobytes
+        return {
+            "peakRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+            "childrenPeakRssKb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+        }
+
+    @property
+    def result(self) -> dict:
+        return self._result
+
+
+
+def naiveReplace(commits: list[Commit], targets: list[str], replacement: str) -> int:
+    # The original EditBatch loop, kept as the matching baseline
+    changed: int = 0
+    for commit in commits:
+        newMessage: str = commit.name
+        for target in targets:
+            if target in commit.name: newMessage = newMessage.replace(target, replacement)
+        if newMessage != commit.name: changed += 1
+    return changed
+
+
+def benchmarkSize(workdir: str, size: int, args: argparse.Namespace) -> list[dict]:
+
+    """
+    Runs every phase against one synthetic repository size.
+    Args:
+        workdir (str): The scratch directory.
+        size (int): The number of commits.
+        args (argparse.Namespace): The harness options.
+    Returns:
+        list[dict]: One record per phase.
+    """
+
+    records: list[dict] = list()
+    base: str = os.path.join(workdir, f"repo-{size}")
+
+    with Probe("generate") as probe:
+        SyntheticRepo.generate(base, size, args.branches, args.message_length, args.plant_every, args.seed)
+    records.append(probe.result)
+
+    git: GitService = GitService()
+    with Probe("list") as probe:
+        commits: list[Commit] = git.getCommits(base)
+    records.append({**probe.result, "commits": len(commits)})
+
+    with Probe("list-first-page") as probe:
+        first: list[Commit] = git.getCommits(base, limit=200)
+    records.append({**probe.result, "commits": len(first)})
+
+    rng: random.Random = random.Random(args.seed)
+    wordlist: list[str] = [PLANTED] + [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(12)) for _ in range(args.targets - 1)]
+
+    with Probe("match-naive") as probe:
+        changed: int = naiveReplace(commits, wordlist, "[redacted]")
+    records.append({**probe.result, "targets": len(wordlist), "changed": changed})
+
+    with Probe("match-compiled") as probe:
+        matched: list[Commit] = MessageMatcher.fromTargets(wordlist, "[redacted]").apply(commits)
+    records.append({**probe.result, "targets": len(wordlist), "changed": len(matched)})
+
+    with Probe("scan") as probe:
+        report: ScanReport = MessageScanner().scan(commits)
+    records.append({**probe.result, "bytes": report.size, "workers": report.workers, "hits": len(report.hits)})
+
+    for backend in (RewriteBackend.REBASE, RewriteBackend.FAST_IMPORT, RewriteBackend.DAG):
+
+        name: str = f"rewrite-{str(backend).lower()}"
+        if backend == RewriteBackend.REBASE and size > args.rebase_max:
+            records.append({"phase": name, "skipped": f"history larger than --rebase-max={args.rebase_max}"})
+            continue
+
+        # Every backend rewrites its own copy of the same history
+        copy: str = os.path.join(workdir, f"repo-{size}-{str(backend).lower()}")
+        shutil.copytree(base, copy, symlinks=True)
+        with Probe(name) as probe:
+            git.renameCommits(copy, [c.oid for c in matched], [c.name for c in matched], backend)
+        records.append({**probe.result, "rewritten": len(matched)})
+        git.close()
+        shutil.rmtree(copy, ignore_errors=True)
+
+    git.close()
+    shutil.rmtree(base, ignore_errors=True)
+    return [{"size": size, **r} for r in records]
+
+
+def main(argv: list[str] | None = None) -> int:
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="bench", description="Benchmark Git Cleaner on synthetic repositories.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000], help="history sizes to benchmark, e.g. 1000 100000 1000000")
+    parser.add_argument('--branches', type=int, default=10, help="extra branches per repository")
+    parser.add_argument('--message-length', type=int, default=200, help="approximate message body length")
+    parser.add_argument('--plant-every', type=int, default=50, help="every n-th subject contains the planted word")
+    parser.add_argument('--targets', type=int, default=1000, help="size of the replacement wordlist")
+    parser.add_argument('--rebase-max', type=int, default=2000, help="largest history rewritten with the rebase backend")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument('--workdir', default=None, help="scratch directory, a temporary one by default")
+    parser.add_argument('--output', default=None, help="JSON results file, bench/results/<timestamp>.json by default")
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    workdir: str = args.workdir or tempfile.mkdtemp(prefix="gitcleaner-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    records: list[dict] = list()
+    try:
+        for size in args.sizes:
+            for record in benchmarkSize(workdir, size, args):
+                records.append(record)
+                print(json.dumps(record))
+    finally:
+        if args.workdir is None: shutil.rmtree(workdir, ignore_errors=True)
+
+    git: subprocess.CompletedProcess = subprocess.run(['git', '--version'], capture_output=True, text=True)
+    report: dict = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git.stdout.strip(),
+        "options": vars(args),
+        "results": records,
+    }
+
+    output: str = args.output or os.path.join("bench", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
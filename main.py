@@ -1,8 +1,14 @@
 
-from src import View
+import sys
 
 
 if __name__ == "__main__":
+
+    # Any argument selects the headless command line, none starts the TUI
+    if len(sys.argv) > 1:
+        from src.cli import main
+        sys.exit(main())
+
+    from src import View
     view: View = View()
     view.display()
-
@@ -1,12 +1,57 @@
+import importlib
 
 
-from .gitService import GitService, Commit, Logger
-from .view import View, ViewHelper, ViewState
-
+# Every public name and the module defining it: the package root imports nothing up front,
+# so a command only pays for the subsystems it uses (asyncio, sqlite3, process pools, inquirer...)
+_EXPORTS: dict[str, str] = {
+    "AsyncGitService": "asyncGitService",
+    "CatFileSession": "catFile", "GitObject": "catFile",
+    "Commit": "commit",
+    "CommitCache": "commitCache",
+    "CommitPicker": "commitPicker",
+    "DagRewriter": "dagRewrite", "ObjectWriter": "dagRewrite",
+    "GitService": "gitService", "Logger": "gitService", "RewriteBackend": "gitService",
+    "DiscoveredRepo": "discovery", "RepoKind": "discovery", "RepoScanner": "discovery",
+    "FastRewriter": "fastRewrite",
+    "HistoryGraph": "historyGraph",
+    "IdentityMap": "identityMap",
+    "CompactionLevel": "maintenance", "CompactionReport": "maintenance", "Maintenance": "maintenance", "PushResult": "maintenance",
+    "MessageMatcher": "matcher", "MatchRule": "matcher",
+    "MessageIndex": "messageIndex",
+    "Detector": "messageScan", "MessageScanner": "messageScan", "ScanHit": "messageScan", "ScanReport": "messageScan",
+    "Metrics": "metrics", "CommandStats": "metrics",
+    "MultiRepoCleaner": "multiRepo", "RepoResult": "multiRepo",
+    "LazyCommit": "recordParser", "RecordParser": "recordParser",
+    "RewritePlan": "rewritePlan", "MessageChange": "rewritePlan",
+    "TransformPipeline": "transform", "TransformStage": "transform", "RegexStage": "transform", "MatcherStage": "transform",
+    "TrailerStage": "transform", "ConventionalStage": "transform", "CallableStage": "transform",
+    "View": "view", "ViewHelper": "view", "ViewState": "view",
+}
 
 
 __all__: list[str] = [
-    "GitService", "Commit", "Logger",
+    "GitService", "AsyncGitService", "Commit", "LazyCommit", "RecordParser", "Logger", "RewriteBackend", "FastRewriter", "DagRewriter", "ObjectWriter",
+    "HistoryGraph", "CommitCache", "CommitPicker",
+    "CatFileSession", "GitObject", "IdentityMap", "Maintenance", "CompactionLevel", "CompactionReport", "PushResult", "RepoScanner", "DiscoveredRepo", "RepoKind",
+    "MessageMatcher", "MatchRule", "MessageIndex", "Detector", "MessageScanner", "ScanHit", "ScanReport",
+    "Metrics", "CommandStats", "MultiRepoCleaner", "RepoResult",
+    "RewritePlan", "MessageChange", "TransformPipeline", "TransformStage", "RegexStage", "MatcherStage", "TrailerStage",
+    "ConventionalStage", "CallableStage", "api",
     "View", "ViewHelper", "ViewState"
 ]
 
+
+def __getattr__(name: str) -> object:
+
+    if name == "api": return importlib.import_module(f"{__name__}.api")
+    if name not in _EXPORTS: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value: object = getattr(importlib.import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+    # Cached on the package, the next lookups do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
@@ -0,0 +1,351 @@
+
+from .commit import Commit
+from .gitService import GitService, RewriteBackend
+from .identityMap import IdentityMap
+from .logger import Logger
+from .maintenance import CompactionLevel, CompactionReport, PushResult
+from .messageIndex import MessageIndex
+from .messageScan import Detector, MessageScanner, ScanReport
+from .metrics import Metrics
+from .multiRepo import MultiRepoCleaner, RepoResult
+from .rewriteJournal import RewriteJournal
+from .rewritePlan import RewritePlan
+from .transform import TransformPipeline
+
+
+def listCommits(repo: str, limit: int | None = None, log: bool = False, metrics: Metrics | None = None,
+                since: str | None = None, paths: list[str] | None = None, revisions: list[str] | None = None) -> list[Commit]:
+
+    """
+    Lists the commits of a repository, newest first.
+    Args:
+        repo (str): The path to the git repository.
+        limit (int | None): The maximum number of commits to list.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+        since (str | None): Only list commits more recent than this date.
+        paths (list[str] | None): Only list commits touching these paths.
+        revisions (list[str] | None): The revisions or ranges to list (e.g. ['v1.0..main']), HEAD by default.
+    Returns:
+        list[Commit]: The commits.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+        return git.getCommits(repo, limit=limit, since=since, paths=paths, revisions=revisions)
+
+
+def replace(repo: str, targets: list[str] | dict[str, str], replacement: str = "", ignoreCase: bool = False,
+            regex: bool = False, fullMessage: bool = False, dryRun: bool = False,
+            backend: RewriteBackend = RewriteBackend.AUTO, log: bool = False, metrics: Metrics | None = None,
+            limit: int | None = None, since: str | None = None, paths: list[str] | None = None,
+            revisions: list[str] | None = None, refs: list[str] | None = None) -> RewritePlan:
+
+    """
+    Replaces words in the commit messages of a repository's current branch.
+    Args:
+        repo (str): The path to the git repository.
+        targets (list[str] | dict[str, str]): The words to replace, or a target -> replacement mapping.
+        replacement (str): The replacement string for targets given as a list.
+        ignoreCase (bool): Whether the targets are matched case-insensitively.
+        regex (bool): Whether the targets are regular expressions.
+        fullMessage (bool): Whether the bodies are cleaned too, not only the subjects.
+        dryRun (bool): Whether to only compute the plan, leaving the repository untouched.
+        backend (RewriteBackend): The backend used for subject-only rewrites.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+        limit (int | None): Only clean the last commits, e.g. 200.
+        since (str | None): Only clean commits more recent than this date.
+        paths (list[str] | None): Only clean commits touching these paths.
+        revisions (list[str] | None): Only clean commits in these ranges of the current branch (e.g. ['v1.0..HEAD']).
+        refs (list[str] | None): Rewrite these refs at once instead of the current branch, names or globs
+            (e.g. GitService.ALL_REFS); their commits are scanned unless revisions are given.
+    Returns:
+        RewritePlan: The plan of the rewrite, applied unless dryRun is set.
+    Raises:
+        ValueError: If the folder is not a git repository, or no ref matches.
+        RuntimeError: If the rewrite fails.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+
+        if not git.isFolderAGitRepository(repo): raise ValueError(f"'{repo}' is not a git repository.")
+        if refs and not revisions:
+            revisions = sorted(git.listRefs(repo, refs))
+            if not revisions: raise ValueError(f"No ref matches: {', '.join(refs)}")
+
+        commits: list[Commit] = git.findReplacements(
+            repo, targets, replacement, ignoreCase, regex, fullMessage, limit, since, paths, revisions
+        )
+        plan: RewritePlan = git.planRewrite(repo, commits, fullMessage, backend, refs)
+        if dryRun or plan.empty: return plan
+
+        if fullMessage: git.rewriteMessages(repo, commits, refs)
+        else: git.renameCommits(repo, [c.oid for c in commits], [c.name for c in commits], backend, refs)
+        return plan
+
+
+def transform(repo: str, pipeline: TransformPipeline, dryRun: bool = False, log: bool = False,
+              metrics: Metrics | None = None, limit: int | None = None, since: str | None = None,
+              paths: list[str] | None = None, revisions: list[str] | None = None,
+              refs: list[str] | None = None) -> RewritePlan:
+
+    """
+    Runs a transform pipeline over the commit messages of a repository's current branch.
+    The new messages are streamed to fast-import, whatever the stages change.
+    Args:
+        repo (str): The path to the git repository.
+        pipeline (TransformPipeline): The stages to run on every message.
+        dryRun (bool): Whether to only compute the plan, leaving the repository untouched.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+        limit (int | None): Only transform the last commits.
+        since (str | None): Only transform commits more recent than this date.
+        paths (list[str] | None): Only transform commits touching these paths.
+        revisions (list[str] | None): Only transform commits in these ranges of the current branch.
+        refs (list[str] | None): Rewrite these refs at once instead of the current branch, names or globs;
+            their commits are transformed unless revisions are given.
+    Returns:
+        RewritePlan: The plan of the rewrite, applied unless dryRun is set.
+    Raises:
+        ValueError: If the folder is not a git repository, or no ref matches.
+        RuntimeError: If the rewrite fails.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+
+        if not git.isFolderAGitRepository(repo): raise ValueError(f"'{repo}' is not a git repository.")
+        if refs and not revisions:
+            revisions = sorted(git.listRefs(repo, refs))
+            if not revisions: raise ValueError(f"No ref matches: {', '.join(refs)}")
+
+        commits: list[Commit] = git.findTransforms(repo, pipeline, limit, since, paths, revisions)
+        plan: RewritePlan = git.planRewrite(repo, commits, True, refs=refs)
+        if dryRun or plan.empty: return plan
+
+        git.rewriteMessages(repo, commits, refs)
+        return plan
+
+
+def scan(repo: str, detectors: list[Detector] | None = None, hosts: list[str] | None = None,
+         workers: int | None = None, ignoreCase: bool = False, log: bool = False, metrics: Metrics | None = None,
+         limit: int | None = None, since: str | None = None, paths: list[str] | None = None,
+         revisions: list[str] | None = None, refs: list[str] | None = None) -> ScanReport:
+
+    """
+    Looks for leaked secrets, emails or internal hostnames in the commit messages of a repository.
+    Args:
+        repo (str): The path to the git repository.
+        detectors (list[Detector] | None): The detectors to run, the built-in ones when None.
+        hosts (list[str] | None): Also flag hostnames under these domains, e.g. ['corp.example.com'].
+        workers (int | None): The process pool size used for large histories.
+        ignoreCase (bool): Whether the detectors are matched case-insensitively.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+        limit (int | None): Only scan the last commits.
+        since (str | None): Only scan commits more recent than this date.
+        paths (list[str] | None): Only scan commits touching these paths.
+        revisions (list[str] | None): The revisions or ranges to scan, HEAD by default.
+        refs (list[str] | None): Scan every commit of these refs (names or globs) unless revisions are given.
+    Returns:
+        ScanReport: The matches with their offsets, see redact() to clean them.
+    Raises:
+        ValueError: If the folder is not a git repository, or no ref matches.
+    """
+
+    detectors = list(Detector.defaults() if detectors is None else detectors)
+    if hosts: detectors.append(Detector.hosts(hosts))
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+        if not git.isFolderAGitRepository(repo): raise ValueError(f"'{repo}' is not a git repository.")
+        if refs and not revisions:
+            revisions = sorted(git.listRefs(repo, refs))
+            if not revisions: raise ValueError(f"No ref matches: {', '.join(refs)}")
+        return git.scanMessages(repo, MessageScanner(detectors, workers, ignoreCase), limit, since, paths, revisions)
+
+
+def redact(repo: str, report: ScanReport, replacement: str = "[redacted]", dryRun: bool = False,
+           backend: RewriteBackend = RewriteBackend.AUTO, log: bool = False, metrics: Metrics | None = None,
+           refs: list[str] | None = None) -> RewritePlan:
+
+    """
+    Replaces every match of a scan in the commit messages of a repository's current branch.
+    Args:
+        repo (str): The path to the git repository.
+        report (ScanReport): The result of scan().
+        replacement (str): The text replacing each match.
+        dryRun (bool): Whether to only compute the plan, leaving the repository untouched.
+        backend (RewriteBackend): The backend used when only subjects change.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+        refs (list[str] | None): Rewrite these refs at once instead of the current branch, names or globs.
+    Returns:
+        RewritePlan: The plan of the rewrite, applied unless dryRun is set.
+    Raises:
+        ValueError: If a flagged commit is not on the current branch (or the refs).
+        RuntimeError: If the rewrite fails.
+    """
+
+    commits: list[Commit] = report.redact(replacement)
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+
+        plan: RewritePlan = git.planRewrite(repo, commits, report.bodies, backend, refs)
+        if dryRun or plan.empty: return plan
+
+        if report.bodies: git.rewriteMessages(repo, commits, refs)
+        else: git.renameCommits(repo, [c.oid for c in commits], [c.name for c in commits], backend, refs)
+        return plan
+
+
+def replaceMany(repos: list[str], targets: list[str], replacement: str = "",
+                workers: int | None = None, log: bool = False) -> list[RepoResult]:
+
+    """
+    Replaces words in the commit messages of several repositories concurrently.
+    Args:
+        repos (list[str]): The paths to the git repositories.
+        targets (list[str]): The words to replace.
+        replacement (str): The replacement string for the targets.
+        workers (int | None): The size of the process pool.
+        log (bool): Whether git commands are logged.
+    Returns:
+        list[RepoResult]: One result per repository.
+    """
+
+    return MultiRepoCleaner(workers, log).run(repos, targets, replacement)
+
+
+def search(query: str, repos: list[str] | None = None, index: str | None = None, refresh: bool = True,
+           limit: int | None = None, log: bool = False, metrics: Metrics | None = None) -> dict[str, list[Commit]]:
+
+    """
+    Looks a text up in the on-disk message index of several repositories.
+    Args:
+        query (str): The text to look for, matched case-insensitively from the start of a word.
+        repos (list[str] | None): The repositories searched (and indexed if needed), every indexed one when None.
+        index (str | None): The index file, $XDG_CACHE_HOME/gitcleaner/messages.sqlite by default.
+        refresh (bool): Whether the repositories are brought up to date with their HEAD first.
+        limit (int | None): The maximum number of commits returned.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+    Returns:
+        dict[str, list[Commit]]: The matching commits per repository, usable as renameCommits targets.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git, MessageIndex(git, index) as messages:
+        selected: list[str] = repos if repos is not None else list(messages.repos)
+        if refresh: messages.refresh(selected)
+        return messages.search(query, selected, limit)
+
+
+def rewriteIdentities(repo: str, identities: IdentityMap | str, log: bool = False,
+                      metrics: Metrics | None = None) -> dict[str, str]:
+
+    """
+    Applies identity replacements to the whole current branch of a repository.
+    Args:
+        repo (str): The path to the git repository.
+        identities (IdentityMap | str): The replacements, or the contents of a .mailmap file.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+    Returns:
+        dict[str, str]: The old -> new OID map of every replayed commit.
+    """
+
+    if isinstance(identities, str): identities = IdentityMap.fromMailmap(identities)
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+        return git.rewriteIdentities(repo, identities)
+
+
+def compact(repo: str, level: CompactionLevel = CompactionLevel.NORMAL, dropBackups: bool = False,
+            log: bool = False, metrics: Metrics | None = None) -> CompactionReport:
+
+    """
+    Expires the reflogs, repacks and prunes a repository after a rewrite.
+    Args:
+        repo (str): The path to the git repository.
+        level (CompactionLevel): LIGHT only forgets the rewritten refs' old entries and the loose objects,
+            NORMAL repacks everything, AGGRESSIVE also empties the reflogs and recomputes the deltas.
+        dropBackups (bool): Whether the refs/gitcleaner backups are deleted, the only way to reclaim
+            the previous history, which can then no longer be rolled back to.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+    Returns:
+        CompactionReport: The sizes before and after, and the space reclaimed.
+    Raises:
+        ValueError: If the folder is not a git repository.
+        RuntimeError: If a rewrite is pending or a step fails.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+        if not git.isFolderAGitRepository(repo): raise ValueError(f"'{repo}' is not a git repository.")
+        return git.compactRepository(repo, level, dropBackups)
+
+
+def publish(repo: str, remotes: list[str], refs: list[str] | None = None, atomic: bool = False,
+            log: bool = False, metrics: Metrics | None = None) -> list[PushResult]:
+
+    """
+    Pushes the refs moved by the last rewrite to several remotes, in one `--force-with-lease` push each.
+    Args:
+        repo (str): The path to the git repository.
+        remotes (list[str]): Remote names, URLs or paths, e.g. a local bare repository.
+        refs (list[str] | None): The refs to push (names or globs), the ones the last rewrite moved when None.
+        atomic (bool): Whether each remote must accept every ref or none.
+        log (bool): Whether git commands are logged.
+        metrics (Metrics | None): Collects the cost of the git commands when given.
+    Returns:
+        list[PushResult]: One result per remote, listing the rejected refs.
+    Raises:
+        ValueError: If the folder is not a git repository, or there is nothing to publish.
+    """
+
+    with GitService(Logger() if log else None, metrics=metrics) as git:
+        if not git.isFolderAGitRepository(repo): raise ValueError(f"'{repo}' is not a git repository.")
+        return git.publishRefs(repo, remotes, refs, atomic)
+
+
+def resume(repo: str, log: bool = False) -> None:
+
+    """
+    Finishes the interrupted rewrite of a repository.
+    Args:
+        repo (str): The path to the git repository.
+        log (bool): Whether git commands are logged.
+    Raises:
+        ValueError: If no rewrite is pending.
+        RuntimeError: If the rewrite stops again.
+    """
+
+    with GitService(Logger() if log else None) as git:
+        git.resumeRewrite(repo)
+
+
+def rollback(repo: str, backup: str | None = None, log: bool = False) -> str:
+
+    """
+    Puts the current branch back where it was before the pending or the last rewrite.
+    Args:
+        repo (str): The path to the git repository.
+        backup (str | None): The backup ref to restore, see backups().
+        log (bool): Whether git commands are logged.
+    Returns:
+        str: The OID the branch points at again.
+    """
+
+    with GitService(Logger() if log else None) as git:
+        return git.rollbackRewrite(repo, backup)
+
+
+def backups(repo: str, log: bool = False) -> list[tuple[str, str]]:
+
+    """
+    Lists the backup refs left by rewrites, newest first.
+    Args:
+        repo (str): The path to the git repository.
+        log (bool): Whether git commands are logged.
+    Returns:
+        list[tuple[str, str]]: The (ref, OID) pairs.
+    """
+
+    with GitService(Logger() if log else None) as git:
+        return RewriteJournal.backups(git, repo)
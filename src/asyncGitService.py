@@ -0,0 +1,334 @@
+
+from .commit import Commit
+from .gitService import GitService, RewriteBackend
+from .identityMap import IdentityMap
+from .logger import Logger
+from .matcher import MessageMatcher
+from .metrics import Metrics
+from .recordParser import RecordParser
+
+import asyncio
+import os
+import pathlib
+import shutil
+import signal
+import subprocess
+import time
+import weakref
+from typing import AsyncIterator, Awaitable
+
+
+class AsyncGitService:
+
+    """
+    Asyncio counterpart of GitService for read-mostly work over many repositories.
+    Every git process is started with asyncio.create_subprocess_exec; at most
+    `concurrency` of them run at once, each one is killed when it outlives its
+    timeout or when the awaiting task is cancelled. Rewrites are delegated to a
+    blocking GitService on a worker thread.
+    """
+
+    def __init__(self, logger: Logger | None = None, concurrency: int = 16, timeout: float | None = 60.0,
+                 metrics: Metrics | None = None) -> None:
+
+        """
+        Args:
+            logger (Logger | None): Logs every git command when given.
+            concurrency (int): The maximum number of git processes running at once.
+            timeout (float | None): The default time limit of a git command, in seconds.
+            metrics (Metrics | None): Collects the cost of the git commands when given.
+        """
+
+        assert concurrency > 0, "Concurrency must be positive."
+
+        self.logger: Logger | None = logger
+        self.metrics: Metrics | None = metrics
+        self._concurrency: int = concurrency
+        self._timeout: float | None = timeout
+        self._hasGit: bool | None = None
+        self._repositories: set[str] = set()
+        # One semaphore per event loop: a semaphore a task waited on is bound to that task's loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    @property
+    def timeout(self) -> float | None:
+        return self._timeout
+
+    @property
+    def Logger(self) -> Logger | None:
+        return self.logger
+
+    def hasLogger(self) -> bool:
+        return self.logger is not None
+
+    def hasMetrics(self) -> bool:
+        return self.metrics is not None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # The concurrency limit of the running loop, the service itself can be built outside of any loop
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if loop not in self._semaphores: self._semaphores[loop] = asyncio.Semaphore(self._concurrency)
+        return self._semaphores[loop]
+
+    def _record(self, command: list[str], returncode: int, duration: float, bytesRead: int, stderr: bytes | None) -> None:
+        if self.hasMetrics(): self.metrics.record(command, duration, returncode, bytesRead)
+        if self.hasLogger(): self.logger.logCommand(command, returncode, duration, stderr)
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        # Process.kill() polls the child first, racing the child watcher that reaps it; signal the pid directly
+        if process.returncode is None:
+            try: os.kill(process.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except ProcessLookupError: pass
+        await process.wait()
+
+    async def runGitCommand(self, command: list[str], env: dict | None = None, input: bytes | None = None,
+                            timeout: float | None = -1) -> subprocess.CompletedProcess:
+
+        """
+        Runs a git command without blocking the event loop.
+        Args:
+            command (list[str]): The command to run.
+            env (dict | None): The environment of the process.
+            input (bytes | None): Data written to the process stdin.
+            timeout (float | None): The time limit in seconds, the service default when omitted, None for no limit.
+        Returns:
+            subprocess.CompletedProcess: The result, stdout and stderr as bytes.
+        Raises:
+            TimeoutError: If the command outlived its timeout, the process is killed.
+            asyncio.CancelledError: If the awaiting task was cancelled, the process is killed.
+        """
+
+        assert isinstance(command, list), "Command must be a list of strings."
+        assert all(isinstance(arg, str) for arg in command), "All command arguments must be strings."
+
+        limit: float | None = self._timeout if timeout == -1 else timeout
+
+        async with self.semaphore:
+            start: float = time.perf_counter()
+            process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+                *command, env=env, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(input), limit)
+            except asyncio.TimeoutError:
+                await AsyncGitService._kill(process)
+                if self.hasLogger(): self.logger.logError(f"Command timed out after {limit}s: {' '.join(command)}")
+                raise TimeoutError(f"git command timed out after {limit}s: {' '.join(command)}") from None
+            except BaseException:
+                await AsyncGitService._kill(process)
+                raise
+
+            self._record(command, process.returncode, time.perf_counter() - start, len(stdout), stderr)
+            return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+    async def doesUserHaveGit(self) -> bool:
+
+        """
+        Checks if the user has git installed on their system.
+        Returns:
+            bool: True if git is installed, False otherwise.
+        """
+
+        if self._hasGit is not None: return self._hasGit
+        if shutil.which('git') is None:
+            self._hasGit = False
+            return False
+
+        try: self._hasGit = (await self.runGitCommand(['git', '--version'])).returncode == 0
+        except (OSError, TimeoutError): self._hasGit = False
+        return self._hasGit
+
+    async def isFolderAGitRepository(self, fp: str) -> bool:
+
+        """
+        Checks if the specified folder is a git repository.
+        Args:
+            fp (str): The path to the folder to check.
+        Returns:
+            bool: True if the folder is a git repository, False otherwise.
+        """
+
+        path: str = str(pathlib.Path(fp).resolve())
+        if path in self._repositories: return True
+
+        try:
+            result: subprocess.CompletedProcess = await self.runGitCommand(['git', '-C', path, 'rev-parse', '--is-inside-work-tree'])
+            found: bool = result.returncode == 0 and result.stdout.strip() == b'true'
+        except (OSError, TimeoutError):
+            return False
+
+        if found: self._repositories.add(path)
+        return found
+
+    async def resolve(self, fp: str, revision: str) -> str | None:
+        result: subprocess.CompletedProcess = await self.runGitCommand(
+            ['git', '-C', fp, 'rev-parse', '--verify', '--quiet', '--end-of-options', revision]
+        )
+        return result.stdout.decode('utf-8').strip() if result.returncode == 0 else None
+
+    async def iterCommits(self, fp: str, limit: int | None = None, since: str | None = None,
+                          paths: list[str] | None = None, revisions: list[str] | None = None,
+                          chunkSize: int = 1 << 16, timeout: float | None = -1) -> AsyncIterator[Commit]:
+
+        """
+        Lazily yields the commits of the specified git repository, newest first.
+        The process holds a concurrency slot until the iteration ends, and is
+        killed if the consumer stops early or the timeout expires.
+        Args:
+            fp (str): The path to the git repository.
+            limit (int | None): The maximum number of commits to yield.
+            since (str | None): Only yield commits more recent than this date.
+            paths (list[str] | None): Only yield commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to list, HEAD by default.
+            chunkSize (int): The maximum number of bytes read from the pipe at once.
+            timeout (float | None): The time limit of the whole listing, the service default when omitted.
+        Yields:
+            Commit: The commits of the repository.
+        Raises:
+            TimeoutError: If the listing outlived its timeout.
+            RuntimeError: If git log fails.
+        """
+
+        command: list[str] = GitService.buildLogCommand(fp, limit, since, paths, revisions)
+        allowed: float | None = self._timeout if timeout == -1 else timeout
+
+        async with self.semaphore:
+            start: float = time.perf_counter()
+            deadline: float | None = start + allowed if allowed is not None else None
+            process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+                *command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            completed: bool = False
+            bytesRead: int = 0
+            parser: RecordParser = RecordParser()
+            # stderr is drained alongside: a full stderr pipe would block git, and with it the stdout stream
+            errors: asyncio.Task = asyncio.create_task(process.stderr.read())
+
+            try:
+                while 1:
+                    remaining: float | None = deadline - time.perf_counter() if deadline is not None else None
+                    try: chunk: bytes = await asyncio.wait_for(process.stdout.read(chunkSize), remaining)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"git command timed out after {allowed}s: {' '.join(command)}") from None
+                    if not chunk: break
+
+                    bytesRead += len(chunk)
+                    for commit in parser.feed(chunk): yield commit
+
+                for commit in parser.close(): yield commit
+                completed = True
+
+            finally:
+                if not completed: await AsyncGitService._kill(process)
+                stderr: bytes = await errors
+                returncode: int = await process.wait()
+                duration: float = time.perf_counter() - start
+
+                if completed: self._record(command, returncode, duration, bytesRead, stderr)
+                else:
+                    if self.hasMetrics(): self.metrics.record(command, duration, 0, bytesRead)
+                    if self.hasLogger(): self.logger.logInfo(f"Command stream closed early: {' '.join(command)}")
+
+            if returncode != 0:
+                raise RuntimeError(f"git log failed: {stderr.decode('utf-8', errors='ignore').strip()}")
+
+    async def getCommits(self, fp: str, limit: int | None = None, since: str | None = None,
+                         paths: list[str] | None = None, revisions: list[str] | None = None) -> list[Commit]:
+
+        """
+        Retrieves the commits of the specified git repository.
+        Args:
+            fp (str): The path to the git repository.
+            limit (int | None): The maximum number of commits to retrieve.
+            since (str | None): Only retrieve commits more recent than this date.
+            paths (list[str] | None): Only retrieve commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to list, HEAD by default.
+        Returns:
+            list[Commit]: A list of commits, newest first.
+        """
+
+        return [c async for c in self.iterCommits(fp, limit=limit, since=since, paths=paths, revisions=revisions)]
+
+    async def findReplacements(self, fp: str, targets: list[str] | dict[str, str], replacement: str = "",
+                               ignoreCase: bool = False, regex: bool = False, fullMessage: bool = False) -> list[Commit]:
+
+        """
+        Scans the history for commits whose message contains any of the targets.
+        Args:
+            fp (str): The path to the git repository.
+            targets (list[str] | dict[str, str]): The words to replace, or a target -> replacement mapping.
+            replacement (str): The replacement string for targets given as a list.
+            ignoreCase (bool): Whether the targets are matched case-insensitively.
+            regex (bool): Whether the targets are regular expressions.
+            fullMessage (bool): Whether the bodies are cleaned too, not only the subjects.
+        Returns:
+            list[Commit]: The modified commits, carrying their new message.
+        """
+
+        matcher: MessageMatcher = MessageMatcher.fromTargets(targets, replacement, ignoreCase, regex)
+        changed: list[Commit] = list()
+        async for commit in self.iterCommits(fp):
+            changed += matcher.apply([commit], fullMessage)
+        return changed
+
+    async def _blocking(self, method: str, *args) -> object:
+        # Rewrites need a consistent view of one repository, they run on a blocking service in a thread
+        async with self.semaphore:
+            with GitService(self.logger, metrics=self.metrics) as git:
+                return await asyncio.to_thread(getattr(git, method), *args)
+
+    async def renameCommits(self, fp: str, targets: list[str], names: list[str],
+                            backend: RewriteBackend = RewriteBackend.AUTO, refs: list[str] | None = None) -> None:
+        await self._blocking('renameCommits', fp, targets, names, backend, refs)
+
+    async def rewriteMessages(self, fp: str, commits: list[Commit], refs: list[str] | None = None) -> dict[str, str]:
+        return await self._blocking('rewriteMessages', fp, commits, refs)
+
+    async def rewriteIdentities(self, fp: str, identities: IdentityMap) -> dict[str, str]:
+        return await self._blocking('rewriteIdentities', fp, identities)
+
+    @staticmethod
+    async def _gather(keys: list[str], calls: list[Awaitable]) -> dict[str, object]:
+        results: list[object] = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            # Cancellation of the caller must not be swallowed into the results
+            if isinstance(result, asyncio.CancelledError): raise result
+        return dict(zip(keys, results))
+
+    async def probe(self, folders: list[str]) -> dict[str, bool]:
+
+        """
+        Checks many folders concurrently.
+        Args:
+            folders (list[str]): The candidate folders.
+        Returns:
+            dict[str, bool]: Whether each folder is a git repository, in the input order.
+        """
+
+        results: dict[str, object] = await AsyncGitService._gather(folders, [self.isFolderAGitRepository(f) for f in folders])
+        return {f: r is True for f, r in results.items()}
+
+    async def listMany(self, repos: list[str], limit: int | None = None) -> dict[str, list[Commit] | Exception]:
+
+        """
+        Lists the commits of many repositories concurrently. A failing repository
+        does not stop the others, its exception is returned in its place.
+        Args:
+            repos (list[str]): The paths to the git repositories.
+            limit (int | None): The maximum number of commits per repository.
+        Returns:
+            dict[str, list[Commit] | Exception]: The commits (or the error) of each repository, in the input order.
+        """
+
+        return await AsyncGitService._gather(repos, [self.getCommits(r, limit=limit) for r in repos])
+
+    def __repr__(self) -> str:
+        return f"AsyncGitService(concurrency={self.concurrency}, timeout={self.timeout})"
@@ -0,0 +1,154 @@
+
+import atexit
+import subprocess
+import threading
+import weakref
+
+
+class GitObject:
+
+    def __init__(self, oid: str, type: str, size: int, data: bytes | None = None) -> None:
+        self._oid: str = oid
+        self._type: str = type
+        self._size: int = size
+        self._data: bytes | None = data
+
+    @property
+    def oid(self) -> str:
+        return self._oid
+
+    @property
+    def type(self) -> str:
+        return self._type
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def data(self) -> bytes | None:
+        return self._data
+
+    def message(self) -> str:
+
+        """
+        Extracts the message of a commit or tag object.
+        Returns:
+            str: The full raw message, headers excluded.
+        """
+
+        assert self.data is not None, "Object content was not loaded (batch-check session)."
+        return self.data.partition(b'\n\n')[2].decode('utf-8', errors='replace')
+
+    def __repr__(self) -> str:
+        return f"GitObject(oid={self.oid}, type={self.type}, size={self.size})"
+
+
+
+class CatFileSession:
+
+    """
+    Long-lived `git cat-file --batch` (or `--batch-check`) process serving object
+    lookups for one repository over a pipe. Requests are pipelined: a whole window
+    of names is written before the answers are read back, in order.
+    """
+
+    # Sessions still alive at interpreter exit are shut down by _closeAll
+    _sessions: weakref.WeakSet = weakref.WeakSet()
+    WINDOW: int = 128
+
+    def __init__(self, fp: str, check: bool = False) -> None:
+        self._fp: str = fp
+        self._check: bool = check
+        self._lock: threading.Lock = threading.Lock()
+        self._process: subprocess.Popen = subprocess.Popen(
+            ['git', '-C', fp, 'cat-file', '--batch-check' if check else '--batch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        CatFileSession._sessions.add(self)
+
+    @property
+    def fp(self) -> str:
+        return self._fp
+
+    @property
+    def check(self) -> bool:
+        return self._check
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def _read(self) -> GitObject | None:
+
+        header: bytes = self._process.stdout.readline()
+        if not header: raise RuntimeError("cat-file session terminated unexpectedly.")
+
+        if header.endswith((b' missing\n', b' ambiguous\n')): return None
+
+        oid, kind, size = header.decode('utf-8').split()
+        size = int(size)
+        if self.check: return GitObject(oid, kind, size)
+
+        data: bytes = self._process.stdout.read(size)
+        self._process.stdout.read(1)
+        return GitObject(oid, kind, size, data)
+
+    def query(self, revisions: list[str]) -> list[GitObject | None]:
+
+        """
+        Looks up several objects at once.
+        Args:
+            revisions (list[str]): Any names understood by git (OIDs, refs, "rev^{tree}", ...).
+        Returns:
+            list[GitObject | None]: The objects in the same order, None for missing ones.
+        """
+
+        assert all('\n' not in r for r in revisions), "Revisions cannot contain newlines."
+
+        objects: list[GitObject | None] = list()
+        with self._lock:
+            for i in range(0, len(revisions), self.WINDOW):
+                window: list[str] = revisions[i:i + self.WINDOW]
+                try:
+                    self._process.stdin.write(''.join(f"{r}\n" for r in window).encode('utf-8'))
+                    self._process.stdin.flush()
+                except (BrokenPipeError, ValueError) as e:
+                    raise RuntimeError("cat-file session terminated unexpectedly.") from e
+                objects += [self._read() for _ in window]
+        return objects
+
+    def get(self, revision: str) -> GitObject | None:
+        return self.query([revision])[0]
+
+    def close(self) -> None:
+
+        """
+        Shuts the session down, closing stdin first so git exits on its own.
+        """
+
+        if self._process.stdin and not self._process.stdin.closed:
+            try: self._process.stdin.close()
+            except OSError: pass
+        try: self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        if not self._process.stdout.closed: self._process.stdout.close()
+        CatFileSession._sessions.discard(self)
+
+    def __enter__(self) -> "CatFileSession":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"CatFileSession(fp={self.fp}, check={self.check}, alive={self.alive})"
+
+    @staticmethod
+    def _closeAll() -> None:
+        for session in list(CatFileSession._sessions): session.close()
+
+
+atexit.register(CatFileSession._closeAll)
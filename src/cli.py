@@ -0,0 +1,335 @@
+
+from . import api
+from .commit import Commit
+from .discovery import DiscoveredRepo, RepoScanner
+from .gitService import GitService, RewriteBackend
+from .logger import Logger, LogLevel
+from .maintenance import CompactionLevel, CompactionReport, PushResult
+from .messageScan import Detector, ScanReport
+from .metrics import Metrics
+from .multiRepo import RepoResult
+from .rewritePlan import RewritePlan
+from .matcher import MessageMatcher
+from .transform import ConventionalStage, MatcherStage, TrailerStage, TransformPipeline, TransformStage
+
+import argparse
+import json
+import sys
+
+
+def addSelection(parser: argparse.ArgumentParser) -> None:
+    # History selection shared by the commands reading commits
+    parser.add_argument('--since', default=None, help="only commits more recent than this date, e.g. '2 weeks ago'")
+    parser.add_argument('--path', dest='paths', action='append', default=None, help="only commits touching this pathspec (repeatable)")
+    parser.add_argument('--rev', dest='revisions', action='append', default=None, help="revision or range to read, e.g. v1.0..HEAD (repeatable)")
+
+
+def addRefs(parser: argparse.ArgumentParser) -> None:
+    # Multi-ref rewrites: every selected ref sharing a rewritten commit is moved in the same pass
+    parser.add_argument('--ref', dest='refs', action='append', default=None, help="rewrite this branch, tag or glob too (repeatable)")
+    parser.add_argument('--all-refs', action='store_true', help="rewrite every branch and tag at once")
+
+
+def selectedRefs(args: argparse.Namespace) -> list[str] | None:
+    return GitService.ALL_REFS + (args.refs or []) if args.all_refs else args.refs
+
+
+def buildParser() -> argparse.ArgumentParser:
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="gitcleaner", description="Clean commit messages and identities without the interactive menu."
+    )
+    parser.add_argument('--log', action='store_true', help="log every git command")
+    parser.add_argument('--log-file', default=None, help="also write JSON-lines log records to this (rotated) file")
+    parser.add_argument('--log-level', choices=[l.value.lower() for l in LogLevel if l != LogLevel.NONE], default='debug', help="lowest level logged")
+    parser.add_argument('--metrics', default=None, help="write a JSON metrics snapshot to this file and print a summary to stderr")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    listing: argparse.ArgumentParser = commands.add_parser('list', help="list the commits of a repository")
+    listing.add_argument('--repo', required=True, help="path to the git repository")
+    listing.add_argument('--limit', type=int, default=None, help="maximum number of commits to list")
+    addSelection(listing)
+
+    replace: argparse.ArgumentParser = commands.add_parser('replace', help="replace words in commit messages")
+    replace.add_argument('--repo', action='append', default=[], help="path to a git repository (repeatable)")
+    replace.add_argument('--root', default=None, help="discover every git repository below this directory")
+    replace.add_argument('--from', dest='targets', action='append', default=[], help="word to replace (repeatable)")
+    replace.add_argument('--to', dest='replacement', default="", help="replacement string")
+    replace.add_argument('--regex', action='store_true', help="treat the targets as regular expressions")
+    replace.add_argument('--ignore-case', action='store_true', help="match the targets case-insensitively")
+    replace.add_argument('--body', action='store_true', help="also clean the message bodies")
+    replace.add_argument('--strip-trailer', dest='trailers', action='append', default=[], metavar='KEY',
+                         help="remove this trailer (e.g. Signed-off-by) from the bodies, '*' for every trailer (repeatable)")
+    replace.add_argument('--conventional', action='store_true', help="normalize Conventional Commits subjects, e.g. 'Feature: Add X.' -> 'feat: add X'")
+    replace.add_argument('--backend', choices=[b.value.lower() for b in RewriteBackend], default='auto', help="rewrite backend")
+    replace.add_argument('--dry-run', action='store_true', help="only print the rewrite plan")
+    replace.add_argument('--json', action='store_true', help="print the rewrite plan as JSON")
+    replace.add_argument('--workers', type=int, default=None, help="process pool size, for several repositories or the transform stages")
+    replace.add_argument('--limit', type=int, default=None, help="only clean the last N commits")
+    replace.add_argument('--compact', choices=[l.value.lower() for l in CompactionLevel], default=None, help="compact the repository after the rewrite")
+    replace.add_argument('--push', dest='remotes', action='append', default=[], metavar='REMOTE', help="force-push the rewritten refs to this remote afterwards (repeatable)")
+    addSelection(replace)
+    addRefs(replace)
+
+    scan: argparse.ArgumentParser = commands.add_parser('scan', help="find secrets, emails or hostnames in commit messages")
+    scan.add_argument('--repo', required=True, help="path to the git repository")
+    scan.add_argument('--detector', dest='detectors', action='append', default=[], help="extra NAME=REGEX detector (repeatable)")
+    scan.add_argument('--host', dest='hosts', action='append', default=[], help="flag hostnames under this domain (repeatable)")
+    scan.add_argument('--no-defaults', action='store_true', help="only run the --detector and --host detectors")
+    scan.add_argument('--ignore-case', action='store_true', help="match the detectors case-insensitively")
+    scan.add_argument('--workers', type=int, default=None, help="process pool size for large histories")
+    scan.add_argument('--limit', type=int, default=None, help="only scan the last N commits")
+    scan.add_argument('--redact', default=None, metavar='TEXT', help="rewrite the flagged commits, replacing every match with TEXT")
+    scan.add_argument('--dry-run', action='store_true', help="with --redact, only print the rewrite plan")
+    scan.add_argument('--json', action='store_true', help="print the matches as JSON")
+    addSelection(scan)
+    addRefs(scan)
+
+    search: argparse.ArgumentParser = commands.add_parser('search', help="look words up in the message index of many repositories")
+    search.add_argument('query', help="text to look for, matched from the start of a word")
+    search.add_argument('--repo', action='append', default=[], help="path to a git repository (repeatable)")
+    search.add_argument('--root', default=None, help="search every git repository below this directory")
+    search.add_argument('--index', default=None, help="index file, $XDG_CACHE_HOME/gitcleaner/messages.sqlite by default")
+    search.add_argument('--no-refresh', action='store_true', help="do not bring the index up to date first")
+    search.add_argument('--limit', type=int, default=None, help="maximum number of commits listed")
+    search.add_argument('--json', action='store_true', help="print the matches as JSON")
+
+    discover: argparse.ArgumentParser = commands.add_parser('discover', help="find the git repositories below a directory")
+    discover.add_argument('--root', required=True, help="the directory to search in")
+    discover.add_argument('--depth', type=int, default=6, help="how many directory levels are walked at most")
+    discover.add_argument('--bare', action='store_true', help="also list bare repositories")
+    discover.add_argument('--no-validate', action='store_true', help="trust the .git entries without running git")
+    discover.add_argument('--cache', action='store_true', help="reuse the listings of unchanged directories between runs")
+    discover.add_argument('--json', action='store_true', help="print the repositories as JSON")
+
+    resume: argparse.ArgumentParser = commands.add_parser('resume', help="finish an interrupted rewrite")
+    resume.add_argument('--repo', required=True, help="path to the git repository")
+
+    rollback: argparse.ArgumentParser = commands.add_parser('rollback', help="undo the pending or the last rewrite")
+    rollback.add_argument('--repo', required=True, help="path to the git repository")
+    rollback.add_argument('--backup', default=None, help="backup ref to restore, the newest one by default")
+    rollback.add_argument('--list', action='store_true', help="only list the backup refs")
+
+    compact: argparse.ArgumentParser = commands.add_parser('compact', help="expire reflogs, repack and prune after a rewrite")
+    compact.add_argument('--repo', required=True, help="path to the git repository")
+    compact.add_argument('--level', choices=[l.value.lower() for l in CompactionLevel], default='normal', help="how aggressively to compact")
+    compact.add_argument('--drop-backups', action='store_true', help="also delete the backup refs, rollbacks become impossible")
+    compact.add_argument('--json', action='store_true', help="print the report as JSON")
+
+    publish: argparse.ArgumentParser = commands.add_parser('publish', help="force-push the refs of the last rewrite, with a lease")
+    publish.add_argument('--repo', required=True, help="path to the git repository")
+    publish.add_argument('--remote', dest='remotes', action='append', required=True, help="remote name, URL or path (repeatable)")
+    publish.add_argument('--atomic', action='store_true', help="each remote accepts every ref or none")
+    publish.add_argument('--json', action='store_true', help="print the results as JSON")
+    publish.add_argument('--ref', dest='refs', action='append', default=None, help="push this branch, tag or glob instead of the rewritten refs (repeatable)")
+    publish.add_argument('--all-refs', action='store_true', help="push every branch and tag")
+
+    identity: argparse.ArgumentParser = commands.add_parser('identity', help="replace author/committer identities")
+    identity.add_argument('--repo', required=True, help="path to the git repository")
+    identity.add_argument('--mailmap', required=True, help="path to a .mailmap style file")
+
+    return parser
+
+
+def runList(args: argparse.Namespace) -> int:
+    for commit in api.listCommits(args.repo, args.limit, args.log, args.collector, args.since, args.paths, args.revisions):
+        print(f"{commit.hashstr} {commit.name}")
+    return 0
+
+
+def runReplace(args: argparse.Namespace) -> int:
+
+    repos: list[str] = args.repo + ([r.path for r in RepoScanner(maxDepth=3).scan(args.root)] if args.root else [])
+    if not repos:
+        print("gitcleaner: error: no repository given, use --repo or --root", file=sys.stderr)
+        return 2
+
+    transforms: bool = bool(args.trailers) or args.conventional
+    if not args.targets and not transforms:
+        print("gitcleaner: error: nothing to do, use --from, --strip-trailer or --conventional", file=sys.stderr)
+        return 2
+
+    if len(repos) > 1:
+        if args.regex or args.ignore_case or args.body or args.dry_run or args.limit or args.since or args.paths or args.revisions or selectedRefs(args):
+            print("gitcleaner: error: --regex, --ignore-case, --body, --dry-run, --ref and the history selection need a single --repo", file=sys.stderr)
+            return 2
+        if transforms or args.compact or args.remotes:
+            print("gitcleaner: error: --strip-trailer, --conventional, --compact and --push need a single --repo", file=sys.stderr)
+            return 2
+        results: list[RepoResult] = api.replaceMany(repos, args.targets, args.replacement, args.workers, args.log)
+        if args.json: print(json.dumps([r.toDict() for r in results], indent=2))
+        else:
+            for result in results: print(result)
+        return 0 if all(r.ok for r in results) else 1
+
+    if transforms:
+        # The word replacements run first, then the trailers go, then the subjects get normalized
+        stages: list[TransformStage] = list()
+        if args.targets: stages.append(MatcherStage(MessageMatcher.fromTargets(args.targets, args.replacement, args.ignore_case, args.regex), args.body))
+        if args.trailers: stages.append(TrailerStage(None if '*' in args.trailers else args.trailers))
+        if args.conventional: stages.append(ConventionalStage())
+        return finishRewrite(api.transform(
+            repos[0], TransformPipeline(stages, args.workers), args.dry_run, args.log, args.collector,
+            args.limit, args.since, args.paths, args.revisions, selectedRefs(args)
+        ), args)
+
+    plan: RewritePlan = api.replace(
+        repos[0], args.targets, args.replacement, args.ignore_case, args.regex, args.body,
+        args.dry_run, RewriteBackend(args.backend.upper()), args.log, args.collector,
+        args.limit, args.since, args.paths, args.revisions, selectedRefs(args)
+    )
+    return finishRewrite(plan, args)
+
+
+def finishRewrite(plan: RewritePlan, args: argparse.Namespace) -> int:
+
+    if args.json: print(plan.toJson())
+    else:
+        for line in plan.summary(): print(line)
+        if not args.dry_run and not plan.empty: print(f"Rewrote {RewritePlan.plural(len(plan.changes), 'commit')}.")
+    if args.dry_run or plan.empty: return 0
+
+    # Post-rewrite stage: the JSON plan stays alone on stdout, the reports go to stderr
+    out = sys.stderr if args.json else sys.stdout
+    if args.compact:
+        for line in api.compact(plan.repository, CompactionLevel(args.compact.upper()), log=args.log, metrics=args.collector).summary(): print(line, file=out)
+    if args.remotes:
+        results: list[PushResult] = api.publish(plan.repository, args.remotes, log=args.log, metrics=args.collector)
+        for result in results: print(result, file=out)
+        if not all(r.ok for r in results): return 1
+    return 0
+
+
+def runScan(args: argparse.Namespace) -> int:
+
+    detectors: list[Detector] = ([] if args.no_defaults else Detector.defaults()) + [Detector.fromSpec(d) for d in args.detectors]
+    if not detectors and not args.hosts:
+        print("gitcleaner: error: --no-defaults needs --detector or --host", file=sys.stderr)
+        return 2
+
+    refs: list[str] | None = selectedRefs(args)
+    report: ScanReport = api.scan(
+        args.repo, detectors, args.hosts, args.workers, args.ignore_case, args.log, args.collector,
+        args.limit, args.since, args.paths, args.revisions, refs
+    )
+    if args.json: print(report.toJson())
+    else:
+        for hit in report.hits: print(f"{hit.commit.hashstr} {hit.detector} {hit.field}[{hit.start}:{hit.end}] {hit.text}")
+        for line in report.summary(): print(line)
+
+    # Like grep, a plain scan fails when something was found so that pipelines can gate on it
+    if args.redact is None: return 1 if not report.empty else 0
+    if report.empty: return 0
+
+    # Keep stdout valid JSON when the matches were printed as JSON
+    out = sys.stderr if args.json else sys.stdout
+    plan: RewritePlan = api.redact(args.repo, report, args.redact, args.dry_run, log=args.log, metrics=args.collector, refs=refs)
+    for line in plan.summary(): print(line, file=out)
+    if not args.dry_run and not plan.empty: print(f"Rewrote {RewritePlan.plural(len(plan.changes), 'commit')}.", file=out)
+    return 0
+
+
+def runSearch(args: argparse.Namespace) -> int:
+
+    # Without --repo or --root every repository already in the index is searched
+    repos: list[str] | None = args.repo + ([r.path for r in RepoScanner(maxDepth=3).scan(args.root)] if args.root else []) or None
+    hits: dict[str, list[Commit]] = api.search(args.query, repos, args.index, not args.no_refresh, args.limit, args.log, args.collector)
+    if args.json:
+        print(json.dumps({repo: [{"oid": c.oid, "short": c.hashstr, "subject": c.name} for c in commits] for repo, commits in hits.items()}, indent=2))
+    else:
+        for repo, commits in hits.items():
+            for commit in commits: print(f"{repo} {commit.hashstr} {commit.name}")
+
+    # Like grep, nothing found is reported through the exit status
+    return 0 if hits else 1
+
+
+def runDiscover(args: argparse.Namespace) -> int:
+    scanner: RepoScanner = RepoScanner(maxDepth=args.depth, bare=args.bare, validate=not args.no_validate, cache=args.cache)
+    repos: list[DiscoveredRepo] = scanner.scan(args.root)
+    if args.json: print(json.dumps([r.toDict() for r in repos], indent=2))
+    else:
+        for repo in repos: print(repo)
+    return 0
+
+
+def runResume(args: argparse.Namespace) -> int:
+    api.resume(args.repo, args.log)
+    print("Rewrite finished.")
+    return 0
+
+
+def runRollback(args: argparse.Namespace) -> int:
+    if args.list:
+        for ref, oid in api.backups(args.repo, args.log): print(f"{oid[:7]} {ref}")
+        return 0
+    oid: str = api.rollback(args.repo, args.backup, args.log)
+    print(f"Branch restored to {oid[:7]}.")
+    return 0
+
+
+def runCompact(args: argparse.Namespace) -> int:
+    report: CompactionReport = api.compact(args.repo, CompactionLevel(args.level.upper()), args.drop_backups, args.log, args.collector)
+    if args.json: print(report.toJson())
+    else:
+        for line in report.summary(): print(line)
+    return 0
+
+
+def runPublish(args: argparse.Namespace) -> int:
+    results: list[PushResult] = api.publish(args.repo, args.remotes, selectedRefs(args), args.atomic, args.log, args.collector)
+    if args.json: print(json.dumps([r.toDict() for r in results], indent=2))
+    else:
+        for result in results:
+            print(result)
+            for ref in result.rejected: print(f"    rejected {ref}: {result.refs[ref][1]}")
+    return 0 if all(r.ok for r in results) else 1
+
+
+def runIdentity(args: argparse.Namespace) -> int:
+    with open(args.mailmap, 'r', encoding='utf-8') as f:
+        rewritten: dict[str, str] = api.rewriteIdentities(args.repo, f.read(), args.log, args.collector)
+    print(f"Replayed {len(rewritten)} commits.")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+
+    """
+    Runs the non-interactive command line.
+    Args:
+        argv (list[str] | None): The arguments, sys.argv[1:] when None.
+    Returns:
+        int: The process exit code.
+    """
+
+    args: argparse.Namespace = buildParser().parse_args(argv)
+
+    # The logger is a singleton: configuring it here configures it for every GitService
+    if args.log or args.log_file:
+        Logger(level=LogLevel(args.log_level.upper()), path=args.log_file, console=args.log)
+        args.log = True
+
+    args.collector = Metrics() if args.metrics else None
+
+    try:
+        match args.command:
+            case 'list': return runList(args)
+            case 'replace': return runReplace(args)
+            case 'scan': return runScan(args)
+            case 'search': return runSearch(args)
+            case 'discover': return runDiscover(args)
+            case 'resume': return runResume(args)
+            case 'rollback': return runRollback(args)
+            case 'compact': return runCompact(args)
+            case 'publish': return runPublish(args)
+            case 'identity': return runIdentity(args)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"gitcleaner: error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.collector is not None:
+            for line in args.collector.summary(): print(line, file=sys.stderr)
+            args.collector.save(args.metrics)
+
+    return 2
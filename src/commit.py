@@ -0,0 +1,145 @@
+
+import sys
+
+
+class Commit:
+
+    # Slots keep a million-commit listing compact: no per-instance __dict__
+    __slots__: tuple[str, ...] = (
+        '_name', '_hashstr', '_oid', '_body',
+        '_authorName', '_authorEmail', '_authorDate',
+        '_committerName', '_committerEmail', '_committerDate',
+    )
+
+    # git log format matching fromRecord / toRecord, fields are separated by \x1f
+    RECORD_FORMAT: str = '%h%x1f%H%x1f%an%x1f%ae%x1f%at%x1f%cn%x1f%ce%x1f%ct%x1f%s%x1f%b'
+    RECORD_FIELDS: int = 10
+
+    def __init__(self, name: str, hashstr: str, oid: str | None = None, body: str = "",
+                 authorName: str = "", authorEmail: str = "", authorDate: int = 0,
+                 committerName: str = "", committerEmail: str = "", committerDate: int = 0) -> None:
+        self._name: str = name
+        self._hashstr: str = hashstr
+        self._oid: str = oid if oid else hashstr
+        self._body: str = body
+        # Identities repeat across a history, interning shares a single copy of each
+        self._authorName: str = sys.intern(authorName)
+        self._authorEmail: str = sys.intern(authorEmail)
+        self._authorDate: int = authorDate
+        self._committerName: str = sys.intern(committerName)
+        self._committerEmail: str = sys.intern(committerEmail)
+        self._committerDate: int = committerDate
+
+    @classmethod
+    def fromString(cls, commit_str: str) -> "Commit":
+
+        """
+        Creates a Commit object from a string representation of a commit.
+        Args:
+            commit_str (str): The string representation of the commit, expected format is "hash name".
+        Returns:
+            Commit: A Commit object with the name and hashstr extracted from the string.
+        Raises:
+            ValueError: If the commit string is not in the expected format.
+        """
+
+        # Only the quotes wrapping the whole line are dropped, quotes inside the subject are kept
+        commit_str = commit_str.strip()
+        if len(commit_str) >= 2 and commit_str[0] == commit_str[-1] == '"': commit_str = commit_str[1:-1]
+
+        parts: list[str] = commit_str.split(' ', 1)
+        if len(parts) == 2 and parts[0]:
+            return cls(name=parts[1], hashstr=parts[0])
+        raise ValueError("Invalid commit string format. Expected 'hash name' format.")
+
+    @classmethod
+    def fromRecord(cls, record: bytes) -> "Commit":
+
+        """
+        Creates a Commit object from a raw record produced with RECORD_FORMAT.
+        Args:
+            record (bytes): The raw record.
+        Returns:
+            Commit: The parsed commit.
+        Raises:
+            ValueError: If the record does not have the expected number of fields.
+        """
+
+        fields: list[str] = record.decode('utf-8', errors='replace').split('\x1f', cls.RECORD_FIELDS - 1)
+        if len(fields) != cls.RECORD_FIELDS: raise ValueError(f"Invalid commit record: {record[:80]!r}")
+
+        short, oid, an, ae, at, cn, ce, ct, subject, body = fields
+        return cls(subject, short, oid, body.rstrip('\n'), an, ae, int(at or 0), cn, ce, int(ct or 0))
+
+    def toRecord(self) -> bytes:
+        return '\x1f'.join((
+            self.hashstr, self.oid, self.authorName, self.authorEmail, str(self.authorDate),
+            self.committerName, self.committerEmail, str(self.committerDate), self.name, self.body
+        )).encode('utf-8')
+
+    def withMessage(self, name: str, body: str | None = None) -> "Commit":
+
+        """
+        Copies the commit with a new subject, and optionally a new body.
+        Args:
+            name (str): The new subject.
+            body (str | None): The new body, the current one is kept when None.
+        Returns:
+            Commit: The modified copy.
+        """
+
+        return Commit(
+            name, self.hashstr, self.oid, self.body if body is None else body,
+            self.authorName, self.authorEmail, self.authorDate,
+            self.committerName, self.committerEmail, self.committerDate
+        )
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def hashstr(self) -> str:
+        return self._hashstr
+
+    @property
+    def oid(self) -> str:
+        return self._oid
+
+    @property
+    def body(self) -> str:
+        return self._body
+
+    @property
+    def message(self) -> str:
+        return f"{self.name}\n\n{self.body}" if self.body else self.name
+
+    @property
+    def authorName(self) -> str:
+        return self._authorName
+
+    @property
+    def authorEmail(self) -> str:
+        return self._authorEmail
+
+    @property
+    def authorDate(self) -> int:
+        return self._authorDate
+
+    @property
+    def committerName(self) -> str:
+        return self._committerName
+
+    @property
+    def committerEmail(self) -> str:
+        return self._committerEmail
+
+    @property
+    def committerDate(self) -> int:
+        return self._committerDate
+
+    def __repr__(self) -> str:
+        return f"Commit={self.name} (hash={self.hashstr})"
+
+    def __str__(self) -> str:
+        return f"{self.hashstr}, {self.name}"
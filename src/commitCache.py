@@ -0,0 +1,135 @@
+
+from .commit import Commit
+from .recordParser import RecordParser
+
+import collections
+import hashlib
+import json
+import os
+import pathlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class CommitCache:
+
+    """
+    Two-level cache of parsed commit listings: an in-memory LRU in front of one
+    file per repository on disk. Entries are keyed by the resolved repository path
+    and stamped with the HEAD OID they were built from; when HEAD moves forward
+    only the new commits (`git log old..new`) are read and prepended.
+    """
+
+    def __init__(self, service: "GitService", directory: str | None = None, capacity: int = 8) -> None:
+
+        assert capacity > 0, "Capacity must be a positive integer."
+
+        default: pathlib.Path = pathlib.Path(os.environ.get('XDG_CACHE_HOME', pathlib.Path.home() / '.cache')) / 'gitcleaner'
+        self._service: "GitService" = service
+        self._directory: pathlib.Path = pathlib.Path(directory) if directory else default
+        self._capacity: int = capacity
+        self._memory: collections.OrderedDict[str, tuple[str, list[Commit]]] = collections.OrderedDict()
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return self._directory
+
+    @staticmethod
+    def key(fp: str) -> str:
+        return str(pathlib.Path(fp).resolve())
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.cache"
+
+    def head(self, fp: str) -> str | None:
+        try: return self._service.resolve(fp, 'HEAD')
+        except RuntimeError: return None
+
+    def _remember(self, key: str, head: str, commits: list[Commit]) -> None:
+        self._memory[key] = (head, commits)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._capacity: self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> tuple[str, list[Commit]] | None:
+
+        try:
+            with open(self._file(key), 'rb') as f:
+                header: dict = json.loads(f.readline())
+                data: bytes = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if header.get('path') != key or header.get('format') != Commit.RECORD_FORMAT: return None
+        commits: list[Commit] = RecordParser.parse(data)
+        return header['head'], commits
+
+    def _save(self, key: str, head: str, commits: list[Commit]) -> None:
+
+        # Write next to the target then swap, so readers never see a partial file
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target: pathlib.Path = self._file(key)
+        temporary: pathlib.Path = target.with_suffix(f'.{os.getpid()}.tmp')
+
+        with open(temporary, 'wb') as f:
+            f.write(json.dumps({'path': key, 'head': head, 'format': Commit.RECORD_FORMAT}).encode('utf-8') + b'\n')
+            f.write(b'\0'.join(c.toRecord() for c in commits))
+        os.replace(temporary, target)
+
+    def lookup(self, fp: str, head: str) -> list[Commit] | None:
+
+        """
+        Returns the cached listing of a repository, brought up to date with HEAD.
+        Args:
+            fp (str): The path to the git repository.
+            head (str): The current HEAD OID of the repository.
+        Returns:
+            list[Commit] | None: The commits newest first, or None on a cache miss.
+        """
+
+        key: str = CommitCache.key(fp)
+        entry: tuple[str, list[Commit]] | None = self._memory.get(key) or self._load(key)
+        if entry is None: return None
+
+        cachedHead, commits = entry
+        if cachedHead != head:
+
+            # HEAD moved: extend incrementally if it only moved forward, otherwise drop the entry
+            isAncestor: bool = self._service.runGitCommand(
+                ['git', '-C', fp, 'merge-base', '--is-ancestor', cachedHead, head]
+            ).returncode == 0
+            if not isAncestor:
+                self.invalidate(fp)
+                return None
+
+            commits = list(self._service.iterCommits(fp, revisions=[f'{cachedHead}..{head}'])) + commits
+            self.store(fp, head, commits)
+
+        else: self._remember(key, head, commits)
+        return commits
+
+    def store(self, fp: str, head: str, commits: list[Commit]) -> None:
+        key: str = CommitCache.key(fp)
+        self._remember(key, head, commits)
+        try: self._save(key, head, commits)
+        except OSError: pass
+
+    def invalidate(self, fp: str) -> None:
+
+        """
+        Drops the cached listing of a repository, both in memory and on disk.
+        Args:
+            fp (str): The path to the git repository.
+        """
+
+        key: str = CommitCache.key(fp)
+        self._memory.pop(key, None)
+        try: os.remove(self._file(key))
+        except OSError: pass
+
+    def clear(self) -> None:
+        self._memory.clear()
+        for entry in self.directory.glob('*.cache'):
+            try: os.remove(entry)
+            except OSError: pass
@@ -0,0 +1,232 @@
+
+from .commit import Commit
+
+import array
+import bisect
+import re
+import threading
+from typing import Iterator
+
+
+class CommitPicker:
+
+    """
+    Paged, searchable view over a lazily read history. Commits are pulled from
+    the log stream one window at a time as the user pages through them, while a
+    background thread keeps the next few windows loaded ahead of the one on
+    screen. The rest of the history is only read once a search is typed. The index is one contiguous lowercase text ("<oid>\\t<subject>" per
+    line) scanned by a single compiled pattern, so a fuzzy query costs one regex
+    pass at C speed, and refining a query only re-checks the previous matches.
+    """
+
+    WINDOW: int = 50
+    # Commits pulled from the stream per lock acquisition of the background loader
+    BATCH: int = 2048
+    # Windows kept loaded past the one on screen once prefetching is on
+    PREFETCH: int = 4
+
+    def __init__(self, commits: Iterator[Commit], window: int = WINDOW) -> None:
+        assert window > 0, "The window size must be positive."
+        self._stream: Iterator[Commit] = commits
+        self._window: int = window
+        self._commits: list[Commit] = list()
+        # Index lines of the commits loaded since the index text was last joined
+        self._pending: list[str] = list()
+        self._exhausted: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lookahead: int = 0
+        self._shown: int = 0
+
+        # Search state: the index text only grows, the offset of each line is kept in a compact array
+        self._text: str = ""
+        self._offsets: array.array = array.array('q')
+        self._query: str = ""
+        self._matches: list[int] | None = None
+        self._searched: int = 0
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def loaded(self) -> int:
+        return len(self._commits)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+    @property
+    def count(self) -> int:
+        # The commits currently listed: the matches of the query, or everything loaded so far
+        return len(self._matches) if self._matches is not None else self.loaded
+
+    def load(self, count: int | None = None) -> int:
+
+        """
+        Pulls more commits from the stream into the picker and its index.
+        Args:
+            count (int | None): The number of commits to pull, the whole remaining history when None.
+        Returns:
+            int: The number of commits actually pulled.
+        """
+
+        pulled: int = 0
+        while not self._exhausted and (count is None or pulled < count):
+            step: int = CommitPicker.BATCH if count is None else min(CommitPicker.BATCH, count - pulled)
+            with self._lock:
+                for commit in self._stream:
+                    self._commits.append(commit)
+                    self._pending.append(f"{commit.oid}\t{commit.name.lower()}")
+                    pulled += 1
+                    step -= 1
+                    if not step: break
+                else:
+                    self._exhausted = True
+            if self._stop.is_set(): break
+        return pulled
+
+    def prefetch(self, pages: int = PREFETCH) -> None:
+
+        """
+        Keeps a few windows past the one on screen loaded in the background, paging re-arms it.
+        Args:
+            pages (int): The number of windows loaded ahead.
+        """
+
+        assert pages > 0, "The number of prefetched pages must be positive."
+        self._lookahead = pages
+        if self._exhausted or (self._thread is not None and self._thread.is_alive()): return
+
+        missing: int = (self._shown + 1 + pages) * self._window + 1 - self.loaded
+        if missing <= 0: return
+        self._thread = threading.Thread(target=self.load, args=(missing,), name="CommitPicker", daemon=True)
+        self._thread.start()
+
+    def page(self, index: int) -> list[Commit]:
+
+        """
+        Gets a window of the listed commits, loading it from the stream if needed.
+        Args:
+            index (int): The window index, 0 being the newest commits (or the best matches).
+        Returns:
+            list[Commit]: The commits of the window, empty past the end.
+        """
+
+        assert index >= 0, "The page index must not be negative."
+        start: int = index * self._window
+        if self._matches is not None:
+            return [self._commits[i] for i in self._matches[start:start + self._window]]
+
+        # One commit more than the window tells whether a next page exists
+        missing: int = start + self._window + 1 - self.loaded
+        if missing > 0: self.load(missing)
+        self._shown = index
+        if self._lookahead: self.prefetch(self._lookahead)
+        return self._commits[start:start + self._window]
+
+    def hasPage(self, index: int) -> bool:
+        if self._matches is not None: return index * self._window < len(self._matches)
+        return index * self._window < self.loaded or (not self._exhausted and bool(self.load(1)))
+
+    def search(self, query: str) -> int:
+
+        """
+        Filters the history on a fuzzy query: its characters must appear in order in the subject,
+        or it must prefix the commit hash. Matches are ranked by how tightly they fit.
+        Args:
+            query (str): The query, case-insensitive. An empty query lists the whole history again.
+        Returns:
+            int: The number of matches.
+        """
+
+        query = query.strip().lower()
+        if not query:
+            self._query, self._matches = "", None
+            return self.loaded
+
+        # Searching covers the whole history, wait for the index to be complete
+        if self._thread is not None: self._thread.join()
+        self.load()
+
+        pattern: re.Pattern = CommitPicker.compile(query)
+        refine: bool = self._matches is not None and query.startswith(self._query) and self._searched == self.loaded
+        if refine:
+            # Narrowing a query can only drop matches, only the previous ones are checked again
+            found: list[tuple[int, int]] = list()
+            for i in self._matches:
+                match: re.Match | None = pattern.match(self._text, self._offsets[i])
+                if match: found.append((CommitPicker.score(match), i))
+        else:
+            found = self._scan(pattern)
+
+        found.sort()
+        self._query, self._matches, self._searched = query, [i for _, i in found], self.loaded
+        return len(self._matches)
+
+    def _scan(self, pattern: re.Pattern) -> list[tuple[int, int]]:
+
+        if self._pending:
+            position: int = len(self._text) + 1 if self._text else 0
+            for line in self._pending:
+                self._offsets.append(position)
+                position += len(line) + 1
+            self._text = '\n'.join(([self._text] if self._text else []) + self._pending)
+            self._pending = list()
+
+        return [(CommitPicker.score(m), bisect.bisect_right(self._offsets, m.start()) - 1) for m in pattern.finditer(self._text)]
+
+    @staticmethod
+    def compile(query: str) -> re.Pattern:
+
+        """
+        Builds the pattern matching one index line against a query.
+        Args:
+            query (str): The lowercase query.
+        Returns:
+            re.Pattern: The line-anchored pattern, its 'hash' or 'fuzzy' group telling how it matched.
+        """
+
+        # Each character is reached through a negated class rather than a lazy dot, it does not backtrack
+        fuzzy: str = ''.join(
+            (f"[^\\n{re.escape(c)}]*" if i else "") + re.escape(c) for i, c in enumerate(query)
+        )
+        # A query that cannot prefix a hash gets a group that never matches, so score() reads the same groups
+        prefix: str = query if re.fullmatch(r'[0-9a-f]+', query) else r'(?!)'
+        return re.compile(
+            f"^(?:(?P<hash>{prefix})[0-9a-f]*\\t|[0-9a-f]*\\t[^\\n{re.escape(query[0])}]*(?P<fuzzy>{fuzzy}))", re.MULTILINE
+        )
+
+    @staticmethod
+    def score(match: re.Match) -> int:
+        # Hash prefixes first, then the shortest stretch of subject holding the query
+        if match.group('hash') is not None: return 0
+        return 1 + match.end('fuzzy') - match.start('fuzzy')
+
+    def close(self) -> None:
+
+        """
+        Stops the background loader and closes the log stream.
+        """
+
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+        with self._lock:
+            close = getattr(self._stream, 'close', None)
+            if close is not None: close()
+        self._exhausted = True
+
+    def __enter__(self) -> "CommitPicker":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"CommitPicker(loaded={self.loaded}, exhausted={self.exhausted}, query={self.query!r})"
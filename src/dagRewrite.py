@@ -0,0 +1,284 @@
+
+from .catFile import CatFileSession, GitObject
+from .fastRewrite import FastRewriter
+from .historyGraph import HistoryGraph
+from .identityMap import IdentityMap
+from .logger import Logger
+
+import os
+import re
+import subprocess
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+    from .rewriteJournal import RewriteJournal
+
+
+class ObjectWriter:
+
+    """
+    Long-lived `git hash-object -w --stdin-paths` process writing objects of one
+    type. Each object goes through a single scratch file, so writing a commit
+    costs a pipe round trip rather than a process.
+    """
+
+    def __init__(self, fp: str, kind: str, directory: str | None = None) -> None:
+        descriptor, self._scratch = tempfile.mkstemp(prefix='object-', dir=directory)
+        os.close(descriptor)
+        self._process: subprocess.Popen = subprocess.Popen(
+            ['git', '-C', fp, 'hash-object', '-w', '-t', kind, '--stdin-paths'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    def write(self, data: bytes) -> str:
+
+        """
+        Writes an object to the repository.
+        Args:
+            data (bytes): The raw object content, without the loose object header.
+        Returns:
+            str: The OID of the object.
+        Raises:
+            RuntimeError: If git rejects the object.
+        """
+
+        with open(self._scratch, 'wb') as f: f.write(data)
+        try:
+            self._process.stdin.write(self._scratch.encode('utf-8') + b'\n')
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise RuntimeError(f"hash-object failed: {self._process.stderr.read().decode('utf-8', errors='ignore')}") from e
+
+        oid: bytes = self._process.stdout.readline().strip()
+        if not oid: raise RuntimeError(f"hash-object failed: {self._process.stderr.read().decode('utf-8', errors='ignore')}")
+        return oid.decode('ascii')
+
+    def close(self) -> None:
+        if not self._process.stdin.closed: self._process.stdin.close()
+        self._process.wait()
+        for stream in (self._process.stdout, self._process.stderr): stream.close()
+        if os.path.exists(self._scratch): os.remove(self._scratch)
+
+    def __enter__(self) -> "ObjectWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+
+class DagRewriter:
+
+    """
+    History rewrite backend replaying the commit graph itself instead of a linear
+    todo list. Commits are visited in topological order and rebuilt from their raw
+    objects, their parents being looked up in a memoized old -> new OID map: every
+    parent relationship (merges included) is kept, and a commit reachable through
+    many paths is still rewritten once. Trees, dates and extra headers are kept
+    byte for byte; signatures of rewritten commits and tags are dropped since they
+    no longer match. Refs only move at the end, in one update-ref transaction.
+    """
+
+    SIGNATURE_HEADERS: tuple[bytes, ...] = (b'gpgsig ', b'gpgsig-sha256 ')
+    TAG_SIGNATURE: re.Pattern = re.compile(rb'-----BEGIN (?:PGP|SSH) SIGNATURE-----.*', re.DOTALL)
+    # Raw commits held in memory at once
+    BATCH: int = 1024
+    # Seconds between two checkpoints of the journal
+    CHECKPOINT: float = 30.0
+
+    def __init__(self, service: "GitService") -> None:
+        self._service: "GitService" = service
+
+    @property
+    def service(self) -> "GitService":
+        return self._service
+
+    @property
+    def logger(self) -> Logger | None:
+        return self.service.Logger
+
+    def tips(self, fp: str) -> dict[str, tuple[str, str]]:
+
+        # The current branch, or HEAD itself when detached
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        head: str | None = self.service.resolve(fp, 'HEAD')
+        if head is None: raise RuntimeError(f"'{fp}' has no commit to rewrite.")
+        return {result.stdout.decode('utf-8').strip() if result.returncode == 0 else 'HEAD': (head, head)}
+
+    def rewrite(self, fp: str, subjects: dict[str, str] | None = None, messages: dict[str, str] | None = None,
+                identities: IdentityMap | None = None, tips: dict[str, tuple[str, str]] | None = None,
+                graph: HistoryGraph | None = None, journal: "RewriteJournal | None" = None) -> dict[str, str]:
+
+        """
+        Rewrites the subjects or full messages of the targeted commits (and the identities
+        of every commit when given), keeping the shape of the graph.
+        Args:
+            fp (str): The path to the git repository.
+            subjects (dict[str, str] | None): The new subjects, keyed by full commit OID.
+            messages (dict[str, str] | None): The new full messages, keyed by full commit OID.
+            identities (IdentityMap | None): The identity replacements, applied to every reachable commit.
+            tips (dict[str, tuple[str, str]] | None): The refs to move with the (object, commit) they point at
+                (see GitService.listRefs), the current branch when None.
+            graph (HistoryGraph | None): The graph of the tips, loaded when None.
+            journal (RewriteJournal | None): The journal of the rewrite. The commits it already records as
+                rewritten are not written again, progress is checkpointed into it, and its directory holds
+                the object writer's scratch file.
+        Returns:
+            dict[str, str]: The old -> new OID map of every replayed commit.
+        Raises:
+            RuntimeError: If a target is not reachable, an object cannot be written or a ref moved meanwhile.
+        """
+
+        subjects, messages = subjects or dict(), messages or dict()
+        tips = tips if tips else self.tips(fp)
+        graph = graph if graph is not None else HistoryGraph.load(self.service, fp, sorted({c for _, c in tips.values()}))
+
+        targets: set[str] = set(subjects) | set(messages)
+        missing: list[str] = sorted(t[:7] for t in targets if t not in graph)
+        if missing: raise RuntimeError(f"Targets not reachable from the rewritten refs: {', '.join(missing)}")
+
+        affected: set[str] = set(graph.order) if identities else graph.affected(targets)
+        session: CatFileSession = self.service.catFile(fp)
+        scratch: str | None = journal.directory if journal is not None else None
+        # The objects written before an interruption are still in the repository
+        mapping: dict[str, str] = {old: new for old, new in (journal.rewritten if journal is not None else {}).items() if old in affected}
+        start: float = time.perf_counter()
+        saved: float = start
+
+        with ObjectWriter(fp, 'commit', scratch) as writer:
+            order: list[str] = [oid for oid in graph.order if oid in affected and oid not in mapping]
+            try:
+                for i in range(0, len(order), DagRewriter.BATCH):
+
+                    batch: list[str] = order[i:i + DagRewriter.BATCH]
+                    for oid, obj in zip(batch, session.query(batch)):
+                        if obj is None: raise RuntimeError(f"Missing commit object: {oid}")
+
+                        # Parents come first in topological order, so their new OIDs are already known
+                        data: bytes = self.rewriteCommit(obj.data, mapping, subjects.get(oid), messages.get(oid), identities)
+                        mapping[oid] = writer.write(data) if data != obj.data else oid
+
+                    if journal is not None and time.perf_counter() - saved > DagRewriter.CHECKPOINT:
+                        journal.checkpoint(mapping)
+                        saved = time.perf_counter()
+
+                self._moveRefs(fp, tips, mapping, scratch)
+
+            except BaseException:
+                # What was written before the interruption is recorded for resumeRewrite
+                if journal is not None and mapping: journal.checkpoint(mapping)
+                raise
+        if self.service.hasMetrics(): self.service.metrics.record(['git', 'hash-object'], time.perf_counter() - start, 0)
+        if self.logger is not None: self.logger.logInfo(f"Rewrote {len(mapping)} commits on {', '.join(tips)} by walking the commit graph.")
+        return mapping
+
+    @staticmethod
+    def rewriteCommit(data: bytes, mapping: dict[str, str], subject: str | None = None, message: str | None = None,
+                      identities: IdentityMap | None = None) -> bytes:
+
+        """
+        Rebuilds a raw commit object.
+        Args:
+            data (bytes): The raw commit.
+            mapping (dict[str, str]): The old -> new OIDs of the commits already rewritten.
+            subject (str | None): The new subject.
+            message (str | None): The new full message, it wins over the subject.
+            identities (IdentityMap | None): The identity replacements.
+        Returns:
+            bytes: The new raw commit, equal to data when nothing changed.
+        """
+
+        head, sep, body = data.partition(b'\n\n')
+        lines: list[bytes] = list()
+        changed: bool = subject is not None or message is not None
+        signature: bool = False
+
+        for line in head.split(b'\n'):
+
+            # Continuation lines of a multi-line header (e.g. a signature) start with a space
+            if line.startswith(b' '):
+                if not signature: lines.append(line)
+                continue
+            signature = line.startswith(DagRewriter.SIGNATURE_HEADERS)
+            if signature: continue
+
+            if line.startswith(b'parent '):
+                parent: str = line[7:].decode('ascii')
+                if mapping.get(parent, parent) != parent:
+                    line = b'parent ' + mapping[parent].encode('ascii')
+                    changed = True
+
+            elif identities and line.startswith((b'author ', b'committer ')):
+                mapped: bytes = FastRewriter.mapIdentity(line + b'\n', identities)[:-1]
+                changed = changed or mapped != line
+                line = mapped
+
+            # A replaced message is written as UTF-8
+            elif line.startswith(b'encoding ') and (subject is not None or message is not None):
+                continue
+
+            lines.append(line)
+
+        if not changed: return data
+
+        if message is not None: body = message.rstrip('\n').encode('utf-8') + b'\n'
+        elif subject is not None: body = FastRewriter.replaceSubject(body, subject)
+        return b'\n'.join(lines) + (sep or b'\n\n') + body
+
+    def _moveRefs(self, fp: str, tips: dict[str, tuple[str, str]], mapping: dict[str, str], scratch: str | None) -> None:
+
+        updates: list[str] = list()
+        tags: list[tuple[str, GitObject]] = list()
+        for ref, (obj, commit) in sorted(tips.items()):
+            new: str = mapping.get(commit, commit)
+            if new == commit: continue
+            if obj == commit: updates.append(f"update {ref} {new} {obj}\n")
+            else: tags.append((ref, self.service.catFile(fp).get(obj)))
+
+        # Annotated tags are re-created on the new commit, unsigned
+        if tags:
+            with ObjectWriter(fp, 'tag', scratch) as writer:
+                retagged: dict[str, str] = dict()
+                for ref, tag in tags:
+                    updates.append(f"update {ref} {self._retag(fp, tag, mapping, retagged, writer)} {tag.oid}\n")
+
+        # Every ref moves or none does; the old values guard against concurrent updates
+        command: list[str] = ['git', '-C', fp, 'update-ref', '-m', 'gitcleaner: rewrite', '--stdin']
+        result: subprocess.CompletedProcess = self.service.runGitCommand(
+            command + (['--no-deref'] if 'HEAD' in tips else []), input=''.join(updates).encode('utf-8')
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Moving the refs failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+    def _retag(self, fp: str, tag: GitObject, mapping: dict[str, str], retagged: dict[str, str], writer: ObjectWriter) -> str:
+
+        """
+        Re-creates an annotated tag over the rewritten history.
+        Args:
+            fp (str): The path to the git repository.
+            tag (GitObject): The tag object.
+            mapping (dict[str, str]): The old -> new OIDs of the rewritten commits.
+            retagged (dict[str, str]): The old -> new OIDs of the tags already re-created, shared along the chains.
+            writer (ObjectWriter): The writer of tag objects.
+        Returns:
+            str: The OID of the new tag.
+        """
+
+        if tag.oid in retagged: return retagged[tag.oid]
+
+        head, sep, body = tag.data.partition(b'\n\n')
+        first, rest = head.split(b'\n', 1)
+        target: str = first[len(b'object '):].decode('ascii')
+        # A tag of a tag (listRefs peels these down to their commit) gets its whole chain re-created
+        if rest.startswith(b'type tag'): new: str = self._retag(fp, self.service.catFile(fp).get(target), mapping, retagged, writer)
+        else: new = mapping.get(target, target)
+
+        data: bytes = f"object {new}".encode('ascii') + b'\n' + rest + sep + DagRewriter.TAG_SIGNATURE.sub(b'', body)
+        retagged[tag.oid] = writer.write(data)
+        return retagged[tag.oid]
+
+    def __repr__(self) -> str:
+        return f"DagRewriter(service={self.service})"
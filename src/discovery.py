@@ -0,0 +1,398 @@
+
+from .gitService import GitService
+
+import concurrent.futures
+import enum
+import json
+import os
+import pathlib
+import subprocess
+
+
+class RepoKind(enum.Enum):
+
+    REPOSITORY: str = "REPOSITORY"
+    WORKTREE: str = "WORKTREE"
+    SUBMODULE: str = "SUBMODULE"
+    BARE: str = "BARE"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+
+class DiscoveredRepo:
+
+    def __init__(self, path: str, gitDir: str, kind: RepoKind, valid: bool | None = None) -> None:
+        self._path: str = path
+        self._gitDir: str = gitDir
+        self._kind: RepoKind = kind
+        self._valid: bool | None = valid
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def gitDir(self) -> str:
+        return self._gitDir
+
+    @property
+    def kind(self) -> RepoKind:
+        return self._kind
+
+    @property
+    def valid(self) -> bool | None:
+        # None when the scan did not validate the repository with git
+        return self._valid
+
+    def setValid(self, valid: bool) -> None:
+        self._valid = valid
+
+    def toDict(self) -> dict:
+        return {"path": self.path, "gitDir": self.gitDir, "kind": str(self.kind), "valid": self.valid}
+
+    def __repr__(self) -> str:
+        return f"DiscoveredRepo(path={self.path}, kind={self.kind}, valid={self.valid})"
+
+    def __str__(self) -> str:
+        return f"{self.path} ({str(self.kind).lower()})"
+
+
+
+class RepoScanner:
+
+    """
+    Finds git repositories below a root directory without spawning git for
+    every folder. The tree is walked with os.scandir and repositories are
+    recognized by their `.git` entry: a directory for regular clones, a
+    `gitdir:` file for linked worktrees and submodules. Submodules are read
+    from `.gitmodules` instead of walking the checkout, linked worktrees from
+    `.git/worktrees`. Directory listings and validation results can be cached
+    on disk per root, keyed by mtime, so rescanning an unchanged tree is mostly
+    stat calls; the entries a scan no longer reaches are dropped when saving.
+    """
+
+    # Directories that never hold repositories worth cleaning but can hold millions of files
+    PRUNE: frozenset[str] = frozenset({
+        'node_modules', 'bower_components', '.venv', 'venv', '__pycache__', '.tox', '.nox',
+        '.mypy_cache', '.pytest_cache', '.gradle', '.m2', '.cache', '.terraform', 'site-packages',
+    })
+
+    CACHE_FORMAT: int = 2
+
+    def __init__(self, service: GitService | None = None, maxDepth: int = 6, prune: set[str] | frozenset[str] | None = None,
+                 workers: int | None = None, validate: bool = True, submodules: bool = True, worktrees: bool = True,
+                 bare: bool = False, followSymlinks: bool = False, cache: bool = False, cacheDirectory: str | None = None) -> None:
+
+        """
+        Args:
+            service (GitService | None): The service running the validation commands.
+            maxDepth (int): How many directory levels below the root are walked at most.
+            prune (set[str] | None): Directory names never descended into, PRUNE by default.
+            workers (int | None): How many validation commands run at once.
+            validate (bool): Whether every candidate is confirmed with `git rev-parse`.
+            submodules (bool): Whether initialized submodules of the repositories found are listed.
+            worktrees (bool): Whether the linked worktrees of the repositories found are listed.
+            bare (bool): Whether bare repositories are listed.
+            followSymlinks (bool): Whether symbolic links to directories are walked.
+            cache (bool): Whether listings and validations are cached on disk.
+            cacheDirectory (str | None): The cache location, $XDG_CACHE_HOME/gitcleaner by default.
+        """
+
+        assert maxDepth >= 0, "The maximum depth cannot be negative."
+
+        default: pathlib.Path = pathlib.Path(os.environ.get('XDG_CACHE_HOME', pathlib.Path.home() / '.cache')) / 'gitcleaner'
+        self._service: GitService = service if service is not None else GitService()
+        self._maxDepth: int = maxDepth
+        self._prune: frozenset[str] = frozenset(prune) if prune is not None else RepoScanner.PRUNE
+        self._workers: int = workers if workers else min(32, (os.cpu_count() or 1) * 4)
+        self._validate: bool = validate
+        self._submodules: bool = submodules
+        self._worktrees: bool = worktrees
+        self._bare: bool = bare
+        self._followSymlinks: bool = followSymlinks
+        self._cacheFile: pathlib.Path | None = (pathlib.Path(cacheDirectory) if cacheDirectory else default) / 'discovery.json' if cache else None
+
+        # path -> (mtime, .git entry kind, subdirectories) and git dir -> (stamp, valid), for the root last walked
+        self._root: str | None = None
+        self._listings: dict[str, tuple[int, str | None, list[str]]] = dict()
+        self._validations: dict[str, tuple[str, bool]] = dict()
+        # The entries used by the last scan, the others are pruned when saving
+        self._listed: set[str] = set()
+        self._validated: set[str] = set()
+
+    @property
+    def maxDepth(self) -> int:
+        return self._maxDepth
+
+    @property
+    def prune(self) -> frozenset[str]:
+        return self._prune
+
+    @property
+    def cacheFile(self) -> pathlib.Path | None:
+        return self._cacheFile
+
+    def _read(self) -> dict[str, dict]:
+        # The cached entries of every root
+        try:
+            with open(self._cacheFile, 'r', encoding='utf-8') as f:
+                data: dict = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        return data.get('roots', dict()) if data.get('format') == RepoScanner.CACHE_FORMAT else dict()
+
+    def _load(self, root: str) -> None:
+
+        if self._root == root: return
+        self._root = root
+        cached: dict = self._read().get(root, dict()) if self._cacheFile is not None else dict()
+        self._listings = {k: (v[0], v[1], v[2]) for k, v in cached.get('listings', {}).items()}
+        self._validations = {k: (v[0], v[1]) for k, v in cached.get('validations', {}).items()}
+
+    def _save(self) -> None:
+
+        if self._cacheFile is None or self._root is None: return
+        # Other scans may have saved their roots meanwhile; roots that were removed are dropped
+        roots: dict[str, dict] = {root: entries for root, entries in self._read().items() if os.path.isdir(root)}
+        roots[self._root] = {
+            'listings': {k: v for k, v in self._listings.items() if k in self._listed},
+            'validations': {k: v for k, v in self._validations.items() if k in self._validated},
+        }
+
+        self._cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        temporary: pathlib.Path = self._cacheFile.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'format': RepoScanner.CACHE_FORMAT, 'roots': roots}, f)
+        os.replace(temporary, self._cacheFile)
+
+    def clearCache(self) -> None:
+        self._root = None
+        self._listings.clear()
+        self._validations.clear()
+        if self._cacheFile is not None and self._cacheFile.exists(): self._cacheFile.unlink()
+
+    def _list(self, folder: str) -> tuple[str | None, list[str]]:
+
+        """
+        Lists a directory, or reuses its cached listing while its mtime is unchanged.
+        Args:
+            folder (str): The directory.
+        Returns:
+            tuple[str | None, list[str]]: The kind of git entry it holds ('dir', 'file', 'bare' or None),
+            and the names of the subdirectories worth walking.
+        """
+
+        mtime: int = os.stat(folder).st_mtime_ns
+        self._listed.add(folder)
+        cached: tuple[int, str | None, list[str]] | None = self._listings.get(folder)
+        if cached is not None and cached[0] == mtime: return cached[1], cached[2]
+
+        git: str | None = None
+        subdirs: list[str] = list()
+        names: set[str] = set()
+
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                names.add(entry.name)
+                if entry.name == '.git':
+                    git = 'dir' if entry.is_dir() else 'file'
+                elif entry.name not in self._prune and entry.is_dir(follow_symlinks=self._followSymlinks):
+                    subdirs.append(entry.name)
+
+        if git is None and {'HEAD', 'objects', 'refs'} <= names and os.path.isfile(os.path.join(folder, 'HEAD')):
+            git = 'bare'
+
+        self._listings[folder] = (mtime, git, subdirs)
+        return git, subdirs
+
+    @staticmethod
+    def readGitFile(path: str) -> str | None:
+
+        """
+        Reads the `gitdir:` pointer of a `.git` file.
+        Args:
+            path (str): The path to the `.git` file.
+        Returns:
+            str | None: The absolute git directory it points to, None if unreadable.
+        """
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                line: str = f.readline().strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        if not line.startswith('gitdir:'): return None
+        gitDir: str = line[len('gitdir:'):].strip()
+        return os.path.normpath(os.path.join(os.path.dirname(path), gitDir))
+
+    def classify(self, folder: str, git: str) -> DiscoveredRepo | None:
+
+        """
+        Builds the description of a folder holding a git entry.
+        Args:
+            folder (str): The folder.
+            git (str): The kind of its git entry, as returned by the listing.
+        Returns:
+            DiscoveredRepo | None: The repository, None for dangling pointers or ignored bare repositories.
+        """
+
+        if git == 'dir':
+            gitDir: str = os.path.join(folder, '.git')
+            return DiscoveredRepo(folder, gitDir, RepoKind.REPOSITORY) if os.path.isfile(os.path.join(gitDir, 'HEAD')) else None
+
+        if git == 'bare':
+            return DiscoveredRepo(folder, folder, RepoKind.BARE) if self._bare else None
+
+        gitDir: str | None = RepoScanner.readGitFile(os.path.join(folder, '.git'))
+        if gitDir is None or not os.path.isdir(gitDir): return None
+
+        parts: tuple[str, ...] = pathlib.PurePath(gitDir).parts
+        if len(parts) > 1 and parts[-2] == 'worktrees': kind: RepoKind = RepoKind.WORKTREE
+        elif 'modules' in parts: kind: RepoKind = RepoKind.SUBMODULE
+        else: kind: RepoKind = RepoKind.REPOSITORY
+        return DiscoveredRepo(folder, gitDir, kind)
+
+    def _related(self, repo: DiscoveredRepo) -> list[DiscoveredRepo]:
+
+        # Initialized submodules, listed in .gitmodules, and linked worktrees, listed in the git dir
+        related: list[DiscoveredRepo] = list()
+
+        if self._submodules and repo.kind != RepoKind.BARE:
+            try:
+                with open(os.path.join(repo.path, '.gitmodules'), 'r', encoding='utf-8') as f:
+                    lines: list[str] = f.read().splitlines()
+            except (OSError, UnicodeDecodeError):
+                lines = list()
+
+            for line in lines:
+                key, sep, value = line.strip().partition('=')
+                if not sep or key.strip() != 'path': continue
+                folder: str = os.path.normpath(os.path.join(repo.path, value.strip()))
+                entry: str = os.path.join(folder, '.git')
+                if not os.path.lexists(entry): continue
+                found: DiscoveredRepo | None = self.classify(folder, 'dir' if os.path.isdir(entry) else 'file')
+                if found is not None: related += [found] + self._related(found)
+
+        if self._worktrees and repo.kind in (RepoKind.REPOSITORY, RepoKind.BARE):
+            try:
+                names: list[str] = os.listdir(os.path.join(repo.gitDir, 'worktrees'))
+            except OSError:
+                names = list()
+
+            for name in names:
+                pointer: str = os.path.join(repo.gitDir, 'worktrees', name, 'gitdir')
+                try:
+                    with open(pointer, 'r', encoding='utf-8') as f:
+                        entry: str = f.readline().strip()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                if os.path.lexists(entry):
+                    related.append(DiscoveredRepo(os.path.dirname(os.path.normpath(entry)), os.path.dirname(pointer), RepoKind.WORKTREE))
+
+        return related
+
+    def walk(self, root: str) -> list[DiscoveredRepo]:
+
+        """
+        Finds the repository candidates below a root directory, without running git.
+        Args:
+            root (str): The directory to search in.
+        Returns:
+            list[DiscoveredRepo]: The unvalidated candidates, sorted by path.
+        """
+
+        root = str(pathlib.Path(root).resolve())
+        self._load(root)
+        self._listed.clear()
+        self._validated.clear()
+        found: dict[str, DiscoveredRepo] = dict()
+        visited: set[str] = set()
+        pending: list[tuple[str, int]] = [(root, 0)]
+
+        while pending:
+            folder, depth = pending.pop()
+
+            # Followed symbolic links may loop back on a directory already walked
+            if self._followSymlinks:
+                real: str = os.path.realpath(folder)
+                if real in visited: continue
+                visited.add(real)
+
+            try:
+                git, subdirs = self._list(folder)
+            except OSError:
+                continue
+
+            if git is not None:
+                repo: DiscoveredRepo | None = self.classify(folder, git)
+                if repo is not None:
+                    for r in [repo] + self._related(repo): found.setdefault(r.path, r)
+                # Repositories nest (vendored clones, submodules), only the git dir itself is skipped
+                if git == 'bare': continue
+
+            if depth < self._maxDepth:
+                pending += [(os.path.join(folder, name), depth + 1) for name in subdirs]
+
+        return sorted(found.values(), key=lambda r: r.path)
+
+    @staticmethod
+    def _stamp(repo: DiscoveredRepo) -> str:
+        # A repository is revalidated once its git dir or its HEAD changes
+        try:
+            return f"{os.stat(repo.gitDir).st_mtime_ns}:{os.stat(os.path.join(repo.gitDir, 'HEAD')).st_mtime_ns}"
+        except OSError:
+            return ""
+
+    def _check(self, repo: DiscoveredRepo) -> bool:
+        flag: str = '--is-bare-repository' if repo.kind == RepoKind.BARE else '--is-inside-work-tree'
+        try:
+            result: subprocess.CompletedProcess = self._service.runGitCommand(['git', '-C', repo.path, 'rev-parse', flag])
+        except OSError:
+            return False
+        return result.returncode == 0 and result.stdout.strip() == b'true'
+
+    def validate(self, repos: list[DiscoveredRepo]) -> list[DiscoveredRepo]:
+
+        """
+        Confirms candidates with git, in parallel, skipping those validated since their last change.
+        Args:
+            repos (list[DiscoveredRepo]): The candidates.
+        Returns:
+            list[DiscoveredRepo]: The same candidates, with their validity set.
+        """
+
+        stale: list[tuple[DiscoveredRepo, str]] = list()
+        for repo in repos:
+            stamp: str = RepoScanner._stamp(repo)
+            self._validated.add(repo.gitDir + '\0' + repo.path)
+            cached: tuple[str, bool] | None = self._validations.get(repo.gitDir + '\0' + repo.path)
+            if stamp and cached is not None and cached[0] == stamp: repo.setValid(cached[1])
+            else: stale.append((repo, stamp))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as pool:
+            for (repo, stamp), valid in zip(stale, pool.map(lambda item: self._check(item[0]), stale)):
+                repo.setValid(valid)
+                if stamp: self._validations[repo.gitDir + '\0' + repo.path] = (stamp, valid)
+
+        return repos
+
+    def scan(self, root: str) -> list[DiscoveredRepo]:
+
+        """
+        Finds, and optionally validates, every git repository below a root directory.
+        Args:
+            root (str): The directory to search in.
+        Returns:
+            list[DiscoveredRepo]: The repositories, sorted by path; invalid candidates are dropped when validating.
+        """
+
+        repos: list[DiscoveredRepo] = self.walk(root)
+        if self._validate: repos = [r for r in self.validate(repos) if r.valid]
+        self._save()
+        return repos
+
+    def __repr__(self) -> str:
+        return f"RepoScanner(maxDepth={self.maxDepth}, validate={self._validate}, cache={self.cacheFile})"
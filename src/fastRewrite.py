@@ -0,0 +1,275 @@
+
+from .catFile import GitObject
+from .identityMap import IdentityMap
+from .logger import Logger
+
+import contextlib
+import subprocess
+import tempfile
+import threading
+import os
+import re
+import time
+from typing import BinaryIO, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class FastRewriter:
+
+    """
+    History rewrite backend streaming `git fast-export` through an in-process
+    message filter into `git fast-import`. Only refs are updated, the working
+    tree and the index are never touched.
+    """
+
+    IDENTITY_LINE: re.Pattern = re.compile(rb'^(author|committer) (?:(.*) )?<(.*)> (.*)$')
+    HEX: re.Pattern = re.compile(r'[0-9a-fA-F]{4,39}')
+
+    def __init__(self, service: "GitService") -> None:
+        self._service: "GitService" = service
+
+    @property
+    def service(self) -> "GitService":
+        return self._service
+
+    @property
+    def logger(self) -> Logger | None:
+        return self.service.Logger
+
+    @staticmethod
+    def replaceSubject(message: bytes, subject: str) -> bytes:
+
+        """
+        Replaces the subject (first paragraph) of a raw commit message, keeping its body.
+        Args:
+            message (bytes): The original raw commit message.
+            subject (str): The new subject.
+        Returns:
+            bytes: The new raw commit message.
+        """
+
+        _, sep, body = message.partition(b'\n\n')
+        return subject.encode('utf-8') + b'\n' + (sep[1:] + body if sep else b'')
+
+    def resolve(self, fp: str, revisions: list[str]) -> list[str]:
+
+        """
+        Resolves revisions (e.g. abbreviated hashes) to full commit OIDs.
+        Args:
+            fp (str): The path to the git repository.
+            revisions (list[str]): The revisions to resolve.
+        Returns:
+            list[str]: The full OIDs, in the same order as the revisions.
+        Raises:
+            ValueError: If any revision cannot be resolved, or is a prefix shared by several objects.
+        """
+
+        oids: list[GitObject | None] = self.service.catFile(fp, check=True).query([f'{r}^{{commit}}' for r in revisions])
+        missing: list[str] = [r for r, obj in zip(revisions, oids) if obj is None]
+        if not missing: return [obj.oid for obj in oids]
+
+        # cat-file answers "missing" and "ambiguous" alike, a wrong guess must never be made for the caller
+        ambiguous: dict[str, list[str]] = {r: self.candidates(fp, r) for r in missing if FastRewriter.HEX.fullmatch(r)}
+        ambiguous = {r: found for r, found in ambiguous.items() if len(found) > 1}
+        if ambiguous:
+            raise ValueError("Ambiguous commit prefixes, use longer hashes: " + '; '.join(
+                f"{r} matches {', '.join(c[:12] for c in found)}" for r, found in ambiguous.items()
+            ))
+        raise ValueError(f"Could not resolve revisions: {', '.join(missing)}")
+
+    def candidates(self, fp: str, prefix: str) -> list[str]:
+        # Every object whose OID starts with the prefix, whatever its type
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, 'rev-parse', f'--disambiguate={prefix}'])
+        return result.stdout.decode('ascii', errors='ignore').split() if result.returncode == 0 else []
+
+    def currentBranch(self, fp: str) -> str:
+
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        if result.returncode != 0:
+            raise RuntimeError("HEAD is detached, the fast-import backend can only rewrite a branch.")
+        return result.stdout.decode('utf-8').strip()
+
+    def rewrite(self, fp: str, subjects: dict[str, str] | None = None, base: str | None = None,
+                messages: dict[str, str] | None = None, identities: IdentityMap | None = None,
+                refs: list[str] | None = None, exclude: list[str] | None = None) -> dict[str, str]:
+
+        """
+        Rewrites commits: subjects or full messages of the targeted commits, and
+        author/committer identities of every replayed commit. Commits shared by
+        several of the refs are replayed once, and every ref is moved to the new
+        history in the same import; annotated tags are re-created (signatures are dropped).
+        Args:
+            fp (str): The path to the git repository.
+            subjects (dict[str, str] | None): The new subjects, keyed by full commit OID.
+            base (str | None): The oldest commit to replay, its parents are kept untouched.
+                The whole branch is replayed when None.
+            messages (dict[str, str] | None): The new full messages, keyed by full commit OID.
+            identities (IdentityMap | None): The identity replacements applied to every replayed commit.
+            refs (list[str] | None): The full names of the refs to rewrite, the current branch when None.
+            exclude (list[str] | None): Commits kept untouched along with their ancestors, see HistoryGraph.boundary.
+        Returns:
+            dict[str, str]: The old -> new OID map of every replayed commit.
+        Raises:
+            RuntimeError: If the export or the import fails, or a target is not reached.
+        """
+
+        subjects, messages = subjects or dict(), messages or dict()
+        refs = refs if refs else [self.currentBranch(fp)]
+        marks = tempfile.NamedTemporaryFile('w', delete=False, suffix='.marks', encoding='utf-8')
+        marks.close()
+
+        exportCommand: list[str] = [
+            'git', '-C', fp, 'fast-export', '--show-original-ids', '--reference-excluded-parents',
+            '--no-data', '--signed-tags=strip', '--reencode=yes', '--use-done-feature', *refs
+        ] + ([f'^{base}^@'] if base else []) + [f'^{oid}' for oid in exclude or []]
+        importCommand: list[str] = ['git', '-C', fp, 'fast-import', '--quiet', '--force', f'--export-marks={marks.name}']
+
+        start: float = time.perf_counter()
+        exporter: subprocess.Popen = subprocess.Popen(exportCommand, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        importer: subprocess.Popen = subprocess.Popen(importCommand, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        exportErrors: Callable[[], str] = FastRewriter.drain(exporter.stderr)
+        importErrors: Callable[[], str] = FastRewriter.drain(importer.stderr)
+
+        try:
+
+            try:
+                originals: dict[str, str] = self._filter(exporter.stdout, importer.stdin, subjects, messages, identities)
+            except BrokenPipeError:
+                # fast-import stopped reading, its own error tells why
+                exporter.kill()
+                importer.wait()
+                raise RuntimeError(f"fast-import failed: {importErrors()}") from None
+            missing: set[str] = (set(subjects) | set(messages)) - set(originals.values())
+
+            if exporter.wait() != 0 or missing:
+                # Killing the importer before it reads 'done' leaves every ref untouched
+                importer.kill()
+                importer.wait()
+                reasons: list[str] = [exportErrors().strip()] + ([f"targets not reached: {', '.join(sorted(missing))}"] if missing else [])
+                raise RuntimeError(f"fast-export failed: {'; '.join(r for r in reasons if r)}")
+
+            with contextlib.suppress(BrokenPipeError): importer.stdin.close()
+            if importer.wait() != 0:
+                raise RuntimeError(f"fast-import failed: {importErrors()}")
+
+            mapping: dict[str, str] = dict()
+            with open(marks.name, 'r', encoding='utf-8') as f:
+                for line in f:
+                    mark, _, oid = line.strip().partition(' ')
+                    if mark in originals: mapping[originals[mark]] = oid
+
+            if self.logger is not None: self.logger.logInfo(f"Rewrote {len(mapping)} commits on {', '.join(refs)} with fast-import.")
+            return mapping
+
+        except BaseException:
+            for process in (exporter, importer):
+                if process.poll() is None: process.kill()
+            raise
+
+        finally:
+            for process in (exporter, importer):
+                process.wait()
+            exportErrors()
+            importErrors()
+            for process in (exporter, importer):
+                for stream in (process.stdin, process.stdout, process.stderr):
+                    # The buffered tail of a killed importer's input has nowhere to go
+                    if stream is not None and not stream.closed:
+                        with contextlib.suppress(BrokenPipeError): stream.close()
+            os.remove(marks.name)
+
+            if self.service.hasMetrics():
+                duration: float = time.perf_counter() - start
+                self.service.metrics.record(exportCommand, duration, exporter.returncode)
+                self.service.metrics.record(importCommand, duration, importer.returncode)
+
+    @staticmethod
+    def drain(stream: BinaryIO) -> Callable[[], str]:
+
+        """
+        Reads a pipe to its end on a thread of its own, so that a process writing a lot to it never blocks.
+        Args:
+            stream (BinaryIO): The pipe, e.g. the stderr of a process.
+        Returns:
+            Callable[[], str]: Waits for the end of the pipe and returns what was read.
+        """
+
+        chunks: list[bytes] = list()
+        thread: threading.Thread = threading.Thread(target=lambda: chunks.append(stream.read()), name="FastRewriter", daemon=True)
+        thread.start()
+
+        def text() -> str:
+            thread.join()
+            return b''.join(chunks).decode('utf-8', errors='ignore')
+
+        return text
+
+    def _filter(self, source: BinaryIO, sink: BinaryIO, subjects: dict[str, str],
+                messages: dict[str, str], identities: IdentityMap | None) -> dict[str, str]:
+
+        """
+        Copies a fast-export stream into a fast-import stream, swapping the messages
+        of the targeted commits and the mapped identities on the fly.
+        Args:
+            source (BinaryIO): The fast-export output.
+            sink (BinaryIO): The fast-import input.
+            subjects (dict[str, str]): The new subjects, keyed by full commit OID.
+            messages (dict[str, str]): The new full messages, keyed by full commit OID.
+            identities (IdentityMap | None): The identity replacements.
+        Returns:
+            dict[str, str]: The export marks of every commit, mapped to their original OID.
+        """
+
+        originals: dict[str, str] = dict()
+        mark: str | None = None
+        original: str | None = None
+
+        while line := source.readline():
+
+            if line.startswith((b'commit ', b'tag ')):
+                mark, original = None, None
+
+            elif line.startswith(b'mark '):
+                mark = line[5:].strip().decode('ascii')
+
+            elif line.startswith(b'original-oid '):
+                original = line[13:].strip().decode('ascii')
+                if mark is not None: originals[mark] = original
+
+            elif identities and line.startswith((b'author ', b'committer ')):
+                line = self.mapIdentity(line, identities)
+
+            elif line.startswith(b'data '):
+                data: bytes = source.read(int(line[5:]))
+                if original in messages: data = messages[original].rstrip('\n').encode('utf-8') + b'\n'
+                elif original in subjects: data = self.replaceSubject(data, subjects[original])
+                if original in messages or original in subjects: line = b'data %d\n' % len(data)
+                sink.write(line)
+                sink.write(data)
+                original = None
+                continue
+
+            sink.write(line)
+
+        return originals
+
+    @staticmethod
+    def mapIdentity(line: bytes, identities: IdentityMap) -> bytes:
+
+        """
+        Applies an identity map to a fast-export author/committer line.
+        Args:
+            line (bytes): The raw line, e.g. b"author Name <email> 1700000000 +0000\\n".
+            identities (IdentityMap): The identity replacements.
+        Returns:
+            bytes: The line with the mapped identity.
+        """
+
+        match: re.Match | None = FastRewriter.IDENTITY_LINE.match(line.rstrip(b'\n'))
+        if match is None: return line
+
+        kind, name, email, when = match.groups()
+        newName, newEmail = identities.map((name or b'').decode('utf-8', errors='replace'), email.decode('utf-8', errors='replace'))
+        return kind + b' ' + (newName.encode('utf-8') + b' ' if newName else b'') + b'<' + newEmail.encode('utf-8') + b'> ' + when + b'\n'
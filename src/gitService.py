@@ -1,58 +1,67 @@
 
+from .catFile import CatFileSession, GitObject
+from .commit import Commit
+from .commitCache import CommitCache
+from .dagRewrite import DagRewriter
 from .logger import Logger
-
+from .maintenance import CompactionLevel, CompactionReport, Maintenance, PushResult
+from .fastRewrite import FastRewriter
+from .historyGraph import HistoryGraph
+from .identityMap import IdentityMap
+from .matcher import MessageMatcher
+from .messageScan import MessageScanner, ScanReport
+from .metrics import Metrics
+from .rewriteJournal import RewriteJournal
+from .recordParser import RecordParser
+from .rewritePlan import RewritePlan
+from .transform import TransformPipeline
+
+import contextlib
+import enum
+import fnmatch
 import sys
 import subprocess
 import pathlib
-import tempfile
+import threading
+import time
 import os
 import json 
+from typing import Callable, Iterator
 
 
-class Commit:
-
-    def __init__(self, name: str, hashstr: str) -> None:
-        self._name: str = name
-        self._hashstr: str = hashstr
+class RewriteBackend(enum.Enum):
 
-    @classmethod
-    def fromString(cls, commit_str: str) -> "Commit":
-
-        """
-        Creates a Commit object from a string representation of a commit.
-        Args:
-            commit_str (str): The string representation of the commit, expected format is "hash name".
-        Returns:
-            Commit: A Commit object with the name and hashstr extracted from the string.
-        Raises:
-            ValueError: If the commit string is not in the expected format.
-        """
-        
-        parts: list[str] = commit_str.split(' ', 1)
-        if len(parts) == 2:
-            return cls(name=parts[1].strip('"'), hashstr=parts[0].strip('"'))
-        raise ValueError("Invalid commit string format. Expected 'hash name' format.")
-
-    @property
-    def name(self) -> str:
-        return self._name
-    
-    @property
-    def hashstr(self) -> str:
-        return self._hashstr
-    
-    def __repr__(self) -> str:
-        return f"Commit={self.name} (hash={self.hashstr})"
+    AUTO: str = "AUTO"
+    REBASE: str = "REBASE"
+    FAST_IMPORT: str = "FAST_IMPORT"
+    DAG: str = "DAG"
 
     def __str__(self) -> str:
-        return f"{self.hashstr}, {self.name}"
+        return self.value
 
 
 
 class GitService:
 
-    def __init__(self, logger: Logger | None = None) -> None:
+    # Target count from which renameCommits switches to fast-export/fast-import
+    FAST_IMPORT_THRESHOLD: int = 32
+    # Every branch and tag, for the refs argument of the rewrites
+    ALL_REFS: list[str] = ['refs/heads/*', 'refs/tags/*']
+
+    def __init__(self, logger: Logger | None = None, cache: bool = False, cacheDirectory: str | None = None,
+                 metrics: Metrics | None = None) -> None:
         self.logger: Logger = logger
+        self.metrics: Metrics | None = metrics
+        self._cache: CommitCache | None = CommitCache(self, cacheDirectory) if cache else None
+        self._hasGit: bool | None = None
+        self._repositories: set[str] = set()
+        self._sessions: dict[tuple[str, bool], CatFileSession] = dict()
+        # Checkpoints of the interrupted rewrite resumeRewrite is running again
+        self._resumed: dict[str, str] = dict()
+
+    @property
+    def cache(self) -> CommitCache | None:
+        return self._cache
 
     @property
     def Logger(self) -> Logger | None:
@@ -61,8 +70,80 @@ class GitService:
     def hasLogger(self) -> bool:
         return self.logger is not None
 
+    def hasMetrics(self) -> bool:
+        return self.metrics is not None
+
+    def span(self, name: str, **attributes) -> contextlib.AbstractContextManager:
+
+        """
+        Times a higher-level operation when metrics are enabled.
+        Args:
+            name (str): The operation name.
+            **attributes: Extra values stored with the span.
+        Returns:
+            contextlib.AbstractContextManager: The span, a no-op without metrics.
+        """
+
+        return self.metrics.span(name, **attributes) if self.hasMetrics() else contextlib.nullcontext({})
+
+    def catFile(self, fp: str, check: bool = False) -> CatFileSession:
+
+        """
+        Returns the persistent cat-file session of a repository, starting it if needed.
+        Args:
+            fp (str): The path to the git repository.
+            check (bool): Whether to use a --batch-check session (no object contents).
+        Returns:
+            CatFileSession: The pooled session.
+        """
+
+        key: tuple[str, bool] = (str(pathlib.Path(fp).resolve()), check)
+        session: CatFileSession | None = self._sessions.get(key)
+
+        if session is None or not session.alive:
+            session = CatFileSession(key[0], check)
+            self._sessions[key] = session
+            if self.hasLogger(): self.logger.logInfo(f"Started cat-file session: {session}")
+            if self.hasMetrics(): self.metrics.spawned(['git', 'cat-file'])
+
+        return session
+
+    def close(self) -> None:
+
+        """
+        Shuts down every pooled cat-file session.
+        """
+
+        for session in self._sessions.values(): session.close()
+        self._sessions.clear()
+
+    def __enter__(self) -> "GitService":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def resolve(self, fp: str, revision: str) -> str | None:
+        obj: GitObject | None = self.catFile(fp, check=True).get(revision)
+        return obj.oid if obj is not None else None
+
+    def getMessages(self, fp: str, revisions: list[str]) -> dict[str, str]:
+
+        """
+        Retrieves the full messages of several commits through the cat-file session.
+        Args:
+            fp (str): The path to the git repository.
+            revisions (list[str]): The commits to read.
+        Returns:
+            dict[str, str]: The full messages keyed by revision, missing commits being skipped.
+        """
+
+        objects: list[GitObject | None] = self.catFile(fp).query([f'{r}^{{commit}}' for r in revisions])
+        return {r: obj.message() for r, obj in zip(revisions, objects) if obj is not None}
+
     def runGitCommand(self, command: list[str], env: any = None,
-                      stdout: int | None = None, stderr: int | None = None) -> subprocess.CompletedProcess:
+                      stdout: int | None = None, stderr: int | None = None,
+                      input: bytes | None = None) -> subprocess.CompletedProcess:
 
         try:
 
@@ -72,11 +153,12 @@ class GitService:
             stdout = stdout if stdout else subprocess.PIPE
             stderr = stderr if stderr else subprocess.PIPE
 
-            result: subprocess.CompletedProcess = subprocess.run(command, stdout=stdout, stderr=stderr, env=env)
+            start: float = time.perf_counter()
+            result: subprocess.CompletedProcess = subprocess.run(command, stdout=stdout, stderr=stderr, env=env, input=input)
+            duration: float = time.perf_counter() - start
 
-            if self.hasLogger():
-                if result.returncode == 0: self.logger.logInfo(f"Command executed successfully: {' '.join(command)}")
-                else: self.logger.logError(f"Command failed with error: {result.stderr.decode('utf-8', errors='ignore')}")
+            if self.hasMetrics(): self.metrics.record(command, duration, result.returncode, len(result.stdout or b''))
+            if self.hasLogger(): self.logger.logCommand(command, result.returncode, duration, result.stderr)
 
             return result
         
@@ -92,13 +174,16 @@ class GitService:
             bool: True if git is installed, False otherwise.
         """
 
+        if self._hasGit is not None: return self._hasGit
+
         USER_ON_WINDOWS: bool = sys.platform.startswith('win')
         pipe: list[str] = ['git', '--version'] if USER_ON_WINDOWS else ['which', 'git']
         
         try:
             result: subprocess.CompletedProcess = self.runGitCommand(pipe)
-            return result.returncode == 0
-        except: return False
+            self._hasGit = result.returncode == 0
+        except: self._hasGit = False
+        return self._hasGit
 
     def isFolderAGitRepository(self, fp: str) -> bool:
         
@@ -110,110 +195,747 @@ class GitService:
             bool: True if the folder is a git repository, False otherwise.
         """
 
+        # Only positive answers are remembered, a folder may become a repository later on
+        path: str = str(pathlib.Path(fp).resolve())
+        if path in self._repositories: return True
+
         try:
-            result: subprocess.CompletedProcess = self.runGitCommand(
-                ['git', '-C', str(pathlib.Path(fp).resolve()), 'rev-parse', '--is-inside-work-tree']
-            )
-            return result.returncode == 0 and result.stdout.strip() == b'true'
+            result: subprocess.CompletedProcess = self.runGitCommand(['git', '-C', path, 'rev-parse', '--is-inside-work-tree'])
+            found: bool = result.returncode == 0 and result.stdout.strip() == b'true'
         except:
             return False
 
-    def getCommits(self, fp: str) -> list[Commit]:
-        
+        if found: self._repositories.add(path)
+        return found
+
+    def streamGitCommand(self, command: list[str], chunkSize: int = 1 << 16) -> Iterator[bytes]:
+
+        """
+        Runs a git command and yields its stdout incrementally, chunk by chunk.
+        The process is terminated if the consumer stops iterating early.
+        Args:
+            command (list[str]): The command to run.
+            chunkSize (int): The maximum number of bytes read from the pipe at once.
+        Yields:
+            bytes: Raw chunks of the command output.
         """
-        Retrieves the names of commits in the specified git repository.
+
+        assert isinstance(command, list), "Command must be a list of strings."
+        assert all(isinstance(arg, str) for arg in command), "All command arguments must be strings."
+
+        start: float = time.perf_counter()
+        process: subprocess.Popen = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        completed: bool = False
+        bytesRead: int = 0
+
+        # stderr is drained alongside: a full stderr pipe would block git, and with it the stdout stream
+        errors: list[bytes] = list()
+        drain: threading.Thread = threading.Thread(target=lambda: errors.append(process.stderr.read()), name="streamGitCommand", daemon=True)
+        drain.start()
+
+        try:
+            while chunk := process.stdout.read1(chunkSize):
+                bytesRead += len(chunk)
+                yield chunk
+            completed = True
+
+        finally:
+            if not completed and process.poll() is None: process.kill()
+            process.stdout.close()
+            returncode: int = process.wait()
+            drain.join()
+            process.stderr.close()
+            stderr: bytes = b''.join(errors)
+            duration: float = time.perf_counter() - start
+
+            # A stream closed early was killed, it is counted without being reported as a failure
+            if self.hasMetrics(): self.metrics.record(command, duration, returncode if completed else 0, bytesRead)
+            if self.hasLogger():
+                if not completed: self.logger.logInfo(f"Command stream closed early: {' '.join(command)}")
+                else: self.logger.logCommand(command, returncode, duration, stderr)
+
+    @staticmethod
+    def buildLogCommand(fp: str, limit: int | None = None, since: str | None = None,
+                        paths: list[str] | None = None, revisions: list[str] | None = None) -> list[str]:
+
+        """
+        Builds the `git log` command listing commits as NUL-delimited Commit records.
         Args:
-            folderPath (str): The path to the git repository.
+            fp (str): The path to the git repository.
+            limit (int | None): The maximum number of commits to list.
+            since (str | None): Only list commits more recent than this date.
+            paths (list[str] | None): Only list commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to list, HEAD by default.
         Returns:
-            list[str]: A list of commit names.
+            list[str]: The command.
         """
 
-        result: subprocess.CompletedProcess = self.runGitCommand(['git', '-C', fp, 'log', '--pretty=format:"%h %s"'])
+        command: list[str] = ['git', '-C', fp, 'log', '-z', f'--pretty=format:{Commit.RECORD_FORMAT}']
+        if limit is not None: command.append(f'--max-count={int(limit)}')
+        if since is not None: command.append(f'--since={since}')
+        if revisions: command += ['--end-of-options', *revisions]
+        if paths: command += ['--', *paths]
+        return command
+
+    def iterCommits(self, fp: str, limit: int | None = None, since: str | None = None,
+                    paths: list[str] | None = None, revisions: list[str] | None = None) -> Iterator[Commit]:
+
+        """
+        Lazily yields the commits of the specified git repository, newest first.
+        The history is read through a pipe using NUL-delimited records, so only the
+        commits actually consumed are parsed. Unfiltered listings go through the
+        commit cache when it is enabled.
+        Args:
+            fp (str): The path to the git repository.
+            limit (int | None): The maximum number of commits to yield.
+            since (str | None): Only yield commits more recent than this date (git date format).
+            paths (list[str] | None): Only yield commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to list, HEAD by default.
+        Yields:
+            Commit: The commits of the repository.
+        """
+
+        command: list[str] = GitService.buildLogCommand(fp, limit, since, paths, revisions)
+        filtered: bool = any(arg is not None for arg in (limit, since, paths, revisions))
+        head: str | None = self.cache.head(fp) if self.cache is not None and not filtered else None
+        if head is None:
+            yield from self._iterRecords(command)
+            return
+
+        cached: list[Commit] | None = self.cache.lookup(fp, head)
+        if cached is not None:
+            yield from cached
+            return
+
+        # Cold cache: stream as usual and only store the listing if it was fully consumed
         commits: list[Commit] = list()
+        for commit in self._iterRecords(command):
+            commits.append(commit)
+            yield commit
+        self.cache.store(fp, head, commits)
+
+    def _iterRecords(self, command: list[str]) -> Iterator[Commit]:
+        # Commits share the pipe chunks they were read into and decode their fields on access
+        yield from RecordParser.iterate(self.streamGitCommand(command))
 
-        if result.returncode == 0:
-                
-            lines: list[str] = result.stdout.decode('utf-8').strip().split('\n')
-            for line in lines:
-                try:
-                    commit: Commit = Commit.fromString(line)
-                    commits.append(commit)
-                except ValueError as ve:
-                    if self.hasLogger(): self.logger.logWarning(f"Skipping invalid commit line: {line} - {ve}")
+    @staticmethod
+    def parseRecord(record: bytes) -> Commit:
+        return Commit.fromRecord(record)
+
+    def getCommits(self, fp: str, limit: int | None = None, since: str | None = None,
+                   paths: list[str] | None = None, revisions: list[str] | None = None) -> list[Commit]:
+        
+        """
+        Retrieves the commits of the specified git repository.
+        Args:
+            fp (str): The path to the git repository.
+            limit (int | None): The maximum number of commits to retrieve.
+            since (str | None): Only retrieve commits more recent than this date.
+            paths (list[str] | None): Only retrieve commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to list (e.g. ['main', 'v1.0..HEAD']), HEAD by default.
+        Returns:
+            list[Commit]: A list of commits, newest first.
+        """
 
+        with self.span("getCommits", repo=fp) as span:
+            commits: list[Commit] = list(self.iterCommits(fp, limit=limit, since=since, paths=paths, revisions=revisions))
+            span["commits"] = len(commits)
         return commits
     
+    def findReplacements(self, fp: str, targets: list[str] | dict[str, str], replacement: str = "",
+                         ignoreCase: bool = False, regex: bool = False, fullMessage: bool = False,
+                         limit: int | None = None, since: str | None = None, paths: list[str] | None = None,
+                         revisions: list[str] | None = None) -> list[Commit]:
+
+        """
+        Scans the history for commits whose message contains any of the targets.
+        All the targets are compiled once and each message is rewritten in one pass.
+        Only the selected slice of history is read (see iterCommits for the selection arguments).
+        Args:
+            fp (str): The path to the git repository.
+            targets (list[str] | dict[str, str]): The words to replace, or a target -> replacement mapping.
+            replacement (str): The replacement string for targets given as a list.
+            ignoreCase (bool): Whether the targets are matched case-insensitively.
+            regex (bool): Whether the targets are regular expressions.
+            fullMessage (bool): Whether the bodies are cleaned too, not only the subjects.
+            limit (int | None): Only scan this many commits.
+            since (str | None): Only scan commits more recent than this date.
+            paths (list[str] | None): Only scan commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to scan, HEAD by default.
+        Returns:
+            list[Commit]: The modified commits, carrying their new message.
+        """
+
+        with self.span("findReplacements", repo=fp, targets=len(targets)) as span:
+            matcher: MessageMatcher = MessageMatcher.fromTargets(targets, replacement, ignoreCase, regex)
+            history: Iterator[Commit] = self.iterCommits(fp, limit=limit, since=since, paths=paths, revisions=revisions)
+            commits: list[Commit] = matcher.apply(history, fullMessage)
+            span["modified"] = len(commits)
+        return commits
+
+    def findTransforms(self, fp: str, pipeline: TransformPipeline, limit: int | None = None, since: str | None = None,
+                       paths: list[str] | None = None, revisions: list[str] | None = None) -> list[Commit]:
+
+        """
+        Streams the history through a transform pipeline.
+        Only the selected slice of history is read (see iterCommits for the selection arguments).
+        Args:
+            fp (str): The path to the git repository.
+            pipeline (TransformPipeline): The stages to run on every message.
+            limit (int | None): Only transform this many commits.
+            since (str | None): Only transform commits more recent than this date.
+            paths (list[str] | None): Only transform commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to transform, HEAD by default.
+        Returns:
+            list[Commit]: The modified commits, carrying their new message, ready for rewriteMessages.
+        """
+
+        with self.span("findTransforms", repo=fp, stages=len(pipeline.stages)) as span:
+            history: Iterator[Commit] = self.iterCommits(fp, limit=limit, since=since, paths=paths, revisions=revisions)
+            commits: list[Commit] = list(pipeline.apply(history))
+            span.update({"modified": len(commits), "workers": pipeline.used})
+        return commits
+
+    def scanMessages(self, fp: str, scanner: MessageScanner | None = None, limit: int | None = None,
+                     since: str | None = None, paths: list[str] | None = None,
+                     revisions: list[str] | None = None) -> ScanReport:
+
+        """
+        Looks for secrets and patterns (tokens, emails, hostnames...) in the commit messages.
+        Only the selected slice of history is read (see iterCommits for the selection arguments).
+        Args:
+            fp (str): The path to the git repository.
+            scanner (MessageScanner | None): The detectors to run, the built-in ones when None.
+            limit (int | None): Only scan this many commits.
+            since (str | None): Only scan commits more recent than this date.
+            paths (list[str] | None): Only scan commits touching these paths.
+            revisions (list[str] | None): The revisions or ranges to scan, HEAD by default.
+        Returns:
+            ScanReport: The matches; ScanReport.redact turns them into commits for renameCommits or rewriteMessages.
+        """
+
+        scanner = scanner if scanner is not None else MessageScanner()
+        with self.span("scanMessages", repo=fp, detectors=len(scanner.detectors)) as span:
+            report: ScanReport = scanner.scan(self.iterCommits(fp, limit=limit, since=since, paths=paths, revisions=revisions))
+            span.update({"commits": report.scanned, "hits": len(report.hits), "workers": report.workers})
+        return report
+
+    def chooseBackend(self, targets: int, backend: RewriteBackend = RewriteBackend.AUTO, merges: bool = False) -> RewriteBackend:
+        if backend != RewriteBackend.AUTO: return backend
+        if targets >= self.FAST_IMPORT_THRESHOLD: return RewriteBackend.FAST_IMPORT
+        # A linear rebase todo would flatten the merges
+        return RewriteBackend.DAG if merges else RewriteBackend.REBASE
+
+    def hasMerges(self, fp: str, oldest: str) -> bool:
+
+        """
+        Checks whether replaying the current branch from a commit would go through merges.
+        Args:
+            fp (str): The path to the git repository.
+            oldest (str): The oldest commit replayed.
+        Returns:
+            bool: Whether a merge commit sits between it and HEAD.
+        """
+
+        hasParent: bool = self.resolve(fp, f'{oldest}^') is not None
+        result: subprocess.CompletedProcess = self.runGitCommand(
+            ['git', '-C', fp, 'rev-list', '--merges', '--max-count=1', 'HEAD'] + ([f'^{oldest}^@'] if hasParent else [])
+        )
+        return result.returncode == 0 and bool(result.stdout.strip())
+
+    def planRewrite(self, fp: str, commits: list[Commit], fullMessage: bool = False,
+                    backend: RewriteBackend = RewriteBackend.AUTO, refs: list[str] | None = None) -> RewritePlan:
+
+        """
+        Computes what rewriting the given commits would do, without touching the repository.
+        Args:
+            fp (str): The path to the git repository.
+            commits (list[Commit]): The commits carrying their new message, e.g. from findReplacements.
+            fullMessage (bool): Whether the rewrite replaces full messages (always fast-import).
+            backend (RewriteBackend): The backend renameCommits would be asked to use.
+            refs (list[str] | None): The refs rewritten at once (see rewriteRefs), the current branch when None.
+        Returns:
+            RewritePlan: The plan, exportable as JSON.
+        """
+
+        if refs: return RewritePlan.computeRefs(self, fp, commits, refs, str(backend if backend == RewriteBackend.DAG else RewriteBackend.FAST_IMPORT))
+        chosen: RewriteBackend = RewriteBackend.FAST_IMPORT if fullMessage else self.chooseBackend(len(commits), backend)
+        merged: RewriteBackend | None = self.chooseBackend(len(commits), backend, merges=True) if not fullMessage else None
+        return RewritePlan.compute(self, fp, commits, str(chosen), str(merged) if merged else None)
+
     def abortRebase(self, fp: str) -> None:
         self.runGitCommand(['git', '-C', fp, 'rebase', '--abort'])
 
-    def renameCommits(self, fp: str, targets: list[str], names: list[str]) -> None:
+    def renameCommits(self, fp: str, targets: list[str], names: list[str],
+                      backend: RewriteBackend = RewriteBackend.AUTO, refs: list[str] | None = None) -> None:
+
+        """
+        Renames the subjects of several commits in one rewrite, on the current branch
+        or on a set of refs at once (see rewriteRefs).
+        Args:
+            fp (str): The path to the git repository.
+            targets (list[str]): The commits to rename, full OIDs or unambiguous abbreviations.
+            names (list[str]): The new subjects, in the same order as the targets.
+            backend (RewriteBackend): The rewrite backend, AUTO picks fast-import for large target sets
+                and the DAG walk when merges would be replayed. Rewriting several refs uses fast-import
+                unless DAG is asked for.
+            refs (list[str] | None): The refs to rewrite (names or globs, e.g. GitService.ALL_REFS),
+                only the current branch when None.
+        Raises:
+            ValueError: If a target is unknown or ambiguous, not on the current branch or on any of the refs, or the
+                rebase backend is asked to replay merges.
+            RuntimeError: If the rewrite fails or stops.
+        """
+
+        with self.span("renameCommits", repo=fp, targets=len(targets)):
+            if not refs:
+                self._renameCommits(fp, targets, names, backend)
+                return
+
+            oids: list[str] = FastRewriter(self).resolve(fp, targets)
+            arguments: dict = {"targets": oids, "names": names, "backend": str(backend), "refs": refs}
+            self.rewriteRefs(fp, refs, subjects=dict(zip(oids, names, strict=True)), operation="renameCommits",
+                             arguments=arguments, backend=backend)
+
+    def listRefs(self, fp: str, patterns: list[str]) -> dict[str, tuple[str, str]]:
+
+        """
+        Lists the refs matching some names or globs. A pattern matches a full ref name
+        (e.g. refs/remotes/origin/*) or a branch or tag name (e.g. main, v1.*).
+        Backup refs are never listed.
+        Args:
+            fp (str): The path to the git repository.
+            patterns (list[str]): The names or globs.
+        Returns:
+            dict[str, tuple[str, str]]: The (object, commit) each matching ref points at, by full name;
+                they differ for annotated tags.
+        """
+
+        result: subprocess.CompletedProcess = self.runGitCommand(
+            ['git', '-C', fp, 'for-each-ref', '--format=%(refname) %(objecttype) %(objectname) %(*objecttype) %(*objectname)']
+        )
+        if result.returncode != 0: return dict()
+
+        refs: dict[str, tuple[str, str]] = dict()
+        nested: dict[str, str] = dict()
+        for line in result.stdout.decode('utf-8').splitlines():
+
+            name, kind, oid, *peeled = line.split()
+            if name.startswith(f"{RewriteJournal.BACKUP_NAMESPACE}/"): continue
+            if not any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(name, f'refs/heads/{p}') or fnmatch.fnmatchcase(name, f'refs/tags/{p}') for p in patterns): continue
+
+            # Only refs ending on a commit can be rewritten, e.g. tags of blobs are skipped
+            if kind == 'commit': refs[name] = (oid, oid)
+            elif kind == 'tag' and peeled and peeled[0] == 'commit': refs[name] = (oid, peeled[1])
+            elif kind == 'tag' and peeled and peeled[0] == 'tag': nested[name] = oid
+
+        # for-each-ref peels a single level, tags of tags are peeled down to their commit here
+        if nested:
+            commits: list[GitObject | None] = self.catFile(fp, check=True).query([f'{oid}^{{commit}}' for oid in nested.values()])
+            refs.update({name: (oid, obj.oid) for (name, oid), obj in zip(nested.items(), commits) if obj is not None})
+
+        return refs
+
+    def rewriteRefs(self, fp: str, refs: list[str], subjects: dict[str, str] | None = None,
+                    messages: dict[str, str] | None = None, operation: str = "rewriteRefs",
+                    arguments: dict | None = None, backend: RewriteBackend = RewriteBackend.FAST_IMPORT) -> dict[str, str]:
+
+        """
+        Rewrites commits shared by several refs in a single fast-import pass. The affected
+        commits are the targets and their descendants on any of the refs; each one is
+        replayed once, then every ref pointing into them is moved, annotated tags being
+        re-created on the new commits. The other refs are left untouched.
+        Args:
+            fp (str): The path to the git repository.
+            refs (list[str]): The refs to rewrite, names or globs (see listRefs).
+            subjects (dict[str, str] | None): The new subjects, keyed by full commit OID.
+            messages (dict[str, str] | None): The new full messages, keyed by full commit OID.
+            operation (str): The public method running the rewrite, for resumeRewrite.
+            arguments (dict | None): Its JSON-serializable arguments.
+            backend (RewriteBackend): DAG walks the commit graph, any other value uses fast-import
+                unless a moved tag points at another tag.
+        Returns:
+            dict[str, str]: The old -> new OID map of every replayed commit.
+        Raises:
+            ValueError: If no ref matches, or a target is on none of them.
+            RuntimeError: If the rewrite fails.
+        """
+
+        subjects, messages = subjects or dict(), messages or dict()
+        with self.span("rewriteRefs", repo=fp, targets=len(subjects) + len(messages)) as span:
+
+            tips: dict[str, tuple[str, str]] = self.listRefs(fp, refs)
+            if not tips: raise ValueError(f"No ref matches: {', '.join(refs)}")
+
+            graph: HistoryGraph = HistoryGraph.load(self, fp, sorted({commit for _, commit in tips.values()}))
+            targets: set[str] = set(subjects) | set(messages)
+            missing: list[str] = sorted(t[:7] for t in targets if t not in graph)
+            if missing: raise ValueError(f"Commits not on the selected refs: {', '.join(missing)}")
+
+            affected: set[str] = graph.affected(targets)
+            moved: dict[str, str] = {ref: obj for ref, (obj, commit) in tips.items() if commit in affected}
+            span.update({"refs": len(moved), "replayed": len(affected)})
 
-        commits: list[Commit] = self.getCommits(fp)
-        changeDict: dict[str: str] = {t[:7]: n for t, n in zip(targets, names, strict=True)}
-        targetHash: set[str] = set(changeDict.keys())
+            # fast-export cannot export a tag of a tag, the DAG walk re-creates the whole chain
+            tags: list[GitObject | None] = self.catFile(fp).query([obj for ref, obj in moved.items() if obj != tips[ref][1]])
+            if any(tag is not None and b'\ntype tag\n' in tag.data.partition(b'\n\n')[0] for tag in tags): backend = RewriteBackend.DAG
 
-        subset: list[str] = []
-        seen = set()
-        for c in commits:
-            h = c.hashstr[:7]
+            def rewrite(journal: RewriteJournal) -> dict[str, str]:
+                if backend == RewriteBackend.DAG:
+                    return DagRewriter(self).rewrite(fp, subjects, messages, tips=tips, graph=graph, journal=journal)
+                return FastRewriter(self).rewrite(fp, subjects, messages=messages, refs=sorted(moved), exclude=graph.boundary(affected))
+
+            if self.cache is not None: self.cache.invalidate(fp)
+            return self._journaled(fp, operation, arguments if arguments is not None else {"refs": refs, "subjects": subjects, "messages": messages},
+                                   rewrite, refs=moved)
+
+    def _renameCommits(self, fp: str, targets: list[str], names: list[str], backend: RewriteBackend) -> None:
+
+        # Abbreviated hashes collide on large histories: everything below works on full OIDs only
+        oids: list[str] = FastRewriter(self).resolve(fp, targets)
+        changeDict: dict[str, str] = dict(zip(oids, names, strict=True))
+        targetHash: set[str] = set(changeDict)
+
+        subset: list[Commit] = []
+        seen: set[str] = set()
+        for c in self.iterCommits(fp):
             subset.append(c)
-            if h in targetHash:
-                seen.add(h)
+            if c.oid in targetHash:
+                seen.add(c.oid)
             if seen == targetHash:
                 break
         subset.reverse()
 
+        # Only the current branch is rewritten, commits selected from other refs cannot be reached
+        if seen != targetHash:
+            raise ValueError(f"Commits not on the current branch: {', '.join(sorted(t[:12] for t in targetHash - seen))}")
+
+        # Whatever the backend, the refs are about to move
+        if self.cache is not None: self.cache.invalidate(fp)
+
+        # The todo list below is linear, merges in the replayed range go to the DAG walk instead
+        merges: bool = backend in (RewriteBackend.AUTO, RewriteBackend.REBASE) and self.hasMerges(fp, subset[0].oid)
+        if merges and backend == RewriteBackend.REBASE:
+            raise ValueError("The rewritten range contains merge commits, which the rebase backend would flatten; use the DAG or FAST_IMPORT backend.")
+
+        backend = self.chooseBackend(len(targetHash), backend, merges)
+        arguments: dict = {"targets": list(changeDict), "names": list(changeDict.values()), "backend": str(backend)}
+
+        if backend == RewriteBackend.DAG:
+            self._journaled(fp, "renameCommits", arguments, lambda journal: DagRewriter(self).rewrite(
+                fp, changeDict, journal=journal
+            ))
+            return
+
+        if backend == RewriteBackend.FAST_IMPORT:
+            # fast-import moves the branch once, at the very end: there is no partial progress to checkpoint
+            self._journaled(fp, "renameCommits", arguments, lambda journal: FastRewriter(self).rewrite(
+                fp, changeDict, base=subset[0].oid
+            ))
+            return
+
         lines: list[str] = list()
+        messages: dict[str, str] = dict()
         for c in subset:
-            if c.hashstr in targets: lines.append(f"reword {c.hashstr[:7]} {c.name}")
-            else: lines.append(f"pick {c.hashstr[:7]} {c.name}")
-        # Create a temporary file to store the todo list for the rebase
-        todo_file = tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8')
-        todo_file.write('\n'.join(lines))
-        todo_file.close()
-
-        # Create a sequence editor
-        seq_editor_script = tempfile.NamedTemporaryFile('w', delete=False, suffix='.py', encoding='utf-8')
-        script: str = f"import sys\ntodo_path = r\"{todo_file.name}\"\nwith open(sys.argv[1], 'w', encoding='utf-8') as out, open(todo_path, 'r', encoding='utf-8') as inp: out.write(inp.read())"""
-        seq_editor_script.write(script)
-        seq_editor_script.close()
-
-        # Write the new names into another temporary file
-        msg_file = tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8')
-        json.dump(names, msg_file)
-        msg_file.close()
-
-        # Manage GIT EDITOR (replace commit editmsg)
-        editor_script = tempfile.NamedTemporaryFile('w', delete=False, suffix='.py', encoding='utf-8')
-        editor_script.write(
-            f"import sys, json\n"
-            f"path = sys.argv[1]\n"
-            f"queue_path = r\"{msg_file.name}\"\n"
-            f"with open(queue_path, 'r+', encoding='utf-8') as f:\n"
-            f"    msgs = json.load(f)\n"
-            f"    if not msgs:\n"
-            f"        exit(0)\n"
-            f"    msg = msgs.pop(0)\n"
-            f"    f.seek(0); f.truncate(); json.dump(msgs, f)\n"
-            f"with open(path, 'w', encoding='utf-8') as f:\n"
-            f"    f.write(msg)\n"
+            if c.oid in targetHash:
+                lines.append(f"reword {c.oid} {c.name}")
+                messages[c.oid] = changeDict[c.oid]
+            else: lines.append(f"pick {c.oid} {c.name}")
+
+        def rebase(journal: RewriteJournal) -> None:
+
+            # The todo list, the new subjects and both editors live in the journal directory,
+            # so that a stopped rebase can be continued later with the same editors
+            with open(journal.file('git-rebase-todo'), 'w', encoding='utf-8') as f: f.write('\n'.join(lines))
+            with open(journal.file('messages.json'), 'w', encoding='utf-8') as f: json.dump(messages, f)
+
+            with open(journal.file('sequence-editor.py'), 'w', encoding='utf-8') as f:
+                f.write(
+                    f"import sys\n"
+                    f"with open(sys.argv[1], 'w', encoding='utf-8') as out, open(r\"{journal.file('git-rebase-todo')}\", 'r', encoding='utf-8') as inp:\n"
+                    f"    out.write(inp.read())\n"
+                )
+
+            # The commit being reworded is the last 'reword' line git moved to rebase-merge/done
+            with open(journal.file('editor.py'), 'w', encoding='utf-8') as f:
+                f.write(
+                    f"import sys, json\n"
+                    f"path = sys.argv[1]\n"
+                    f"with open(r\"{journal.file('messages.json')}\", 'r', encoding='utf-8') as f:\n"
+                    f"    msgs = json.load(f)\n"
+                    f"with open(r\"{os.path.join(journal.rebaseDirectory, 'done')}\", 'r', encoding='utf-8') as f:\n"
+                    f"    done = [l.split() for l in f if l.split()]\n"
+                    f"oid = next((l[1] for l in reversed(done) if l[0] in ('reword', 'r')), None)\n"
+                    f"if oid not in msgs:\n"
+                    f"    exit(0)\n"
+                    f"with open(path, 'r', encoding='utf-8') as f:\n"
+                    f"    _, sep, body = f.read().partition('\\n\\n')\n"
+                    f"with open(path, 'w', encoding='utf-8') as f:\n"
+                    f"    f.write(msgs[oid] + '\\n' + (sep[1:] + body if sep else ''))\n"
+                )
+
+            # The root commit has no parent to rebase onto
+            first: str = subset[0].oid
+            hasParent: bool = self.resolve(fp, f'{first}^') is not None
+            result: subprocess.CompletedProcess = self.runGitCommand(
+                ['git', '-C', fp, 'rebase', '-i', f'{first}^' if hasParent else '--root'], env=GitService.rebaseEnvironment(journal)
+            )
+            self._checkRebase(journal, result)
+
+        self._journaled(fp, "renameCommits", arguments, rebase)
+
+    @staticmethod
+    def rebaseEnvironment(journal: RewriteJournal) -> dict[str, str]:
+        env: dict[str, str] = os.environ.copy()
+        env['GIT_SEQUENCE_EDITOR'] = f'"{sys.executable}" "{journal.file("sequence-editor.py")}"'
+        env['GIT_EDITOR'] = f'"{sys.executable}" "{journal.file("editor.py")}"'
+        return env
+
+    def _checkRebase(self, journal: RewriteJournal, result: subprocess.CompletedProcess) -> None:
+
+        if result.returncode == 0: return
+        error: str = result.stderr.decode('utf-8', errors='ignore').strip()
+        if journal.rebaseInProgress:
+            raise RuntimeError(f"Rebase stopped, resume it with resumeRewrite or undo it with rollbackRewrite: {error}")
+        raise RuntimeError(f"Rebase failed: {error}")
+
+    def _journaled(self, fp: str, operation: str, arguments: dict, run: Callable[[RewriteJournal], object],
+                   refs: dict[str, str] | None = None) -> object:
+
+        """
+        Runs a rewrite under a journal, backing HEAD (and the other refs it moves) up first.
+        The rebase and DAG backends checkpoint the commits they rewrote, so an interrupted
+        rewrite keeps its journal and resumeRewrite picks it up from there. fast-import moves
+        the refs in one go once the whole stream is imported: until then nothing changed, so
+        its journal is dropped on failure and the rewrite is simply run again.
+        Args:
+            fp (str): The path to the git repository.
+            operation (str): The public method running the rewrite, for resumeRewrite.
+            arguments (dict): Its JSON-serializable arguments.
+            run (Callable[[RewriteJournal], object]): The rewrite itself.
+            refs (dict[str, str] | None): The other refs moved by the rewrite, with the object they point at.
+        Returns:
+            object: What the rewrite returned.
+        """
+
+        journal: RewriteJournal = RewriteJournal.begin(self, fp, operation, arguments, refs, self._resumed)
+        try:
+            result: object = run(journal)
+        except BaseException as e:
+            # A stopped rebase or checkpointed DAG walk can be continued; otherwise the refs are untouched
+            if journal.rebaseInProgress or journal.rewritten: journal.interrupt(f"{type(e).__name__}: {e}")
+            else: self._dropJournal(journal)
+            raise
+
+        journal.finish()
+        if self.hasLogger(): self.logger.logInfo(f"{operation} done, backup of the previous history: {journal.backup}")
+        return result
+
+    def _dropJournal(self, journal: RewriteJournal) -> None:
+        # Nothing moved, the backup refs would only be clutter
+        deletes: str = ''.join(f"delete {ref}\n" for ref in journal.backupRefs)
+        self.runGitCommand(['git', '-C', journal.fp, 'update-ref', '--stdin'], input=deletes.encode('utf-8'))
+        journal.discard()
+
+    def resumeRewrite(self, fp: str) -> None:
+
+        """
+        Finishes an interrupted rewrite. A stopped rebase continues from the last
+        commit it replayed; a rewrite that never moved the branch runs again, a DAG
+        walk skipping the commits it checkpointed.
+        Args:
+            fp (str): The path to the git repository.
+        Raises:
+            ValueError: If no rewrite is pending.
+            RuntimeError: If the rewrite stops again.
+        """
+
+        journal: RewriteJournal | None = RewriteJournal.load(self, fp)
+        if journal is None: raise ValueError(f"No interrupted rewrite in '{fp}'.")
+        if self.cache is not None: self.cache.invalidate(fp)
+
+        if journal.rebaseInProgress:
+            journal.checkpoint(journal.rebaseProgress())
+            env: dict[str, str] = GitService.rebaseEnvironment(journal)
+
+            # A reword that stopped before its message was written is amended again, --continue would keep the old one
+            stopped: str | None = journal.stoppedReword()
+            subjects: dict[str, str] = dict(zip(journal.arguments["targets"], journal.arguments["names"]))
+            # Both sides are full OIDs: the todo list and the journal only ever hold resolved targets
+            wanted: str | None = subjects.get(stopped) if stopped else None
+            if wanted is not None and self._pickedWithoutMessage(fp, stopped, wanted):
+                result: subprocess.CompletedProcess = self.runGitCommand(
+                    ['git', '-C', fp, 'commit', '--amend', '--only', '--allow-empty', '--quiet'], env=env
+                )
+                if result.returncode != 0:
+                    journal.interrupt(result.stderr.decode('utf-8', errors='ignore').strip())
+                    raise RuntimeError(f"Rewording the stopped commit failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+            result: subprocess.CompletedProcess = self.runGitCommand(['git', '-C', fp, 'rebase', '--continue'], env=env)
+            try: self._checkRebase(journal, result)
+            except RuntimeError as e:
+                if journal.rebaseInProgress: journal.interrupt(str(e))
+                raise
+            journal.finish()
+            return
+
+        # fast-import only moves the refs once everything is written: a moved ref means it completed
+        if self.resolve(fp, 'HEAD') != journal.head or any(self.resolve(fp, ref) != oid for ref, (oid, _) in journal.refs.items()):
+            journal.finish()
+            return
+
+        self._dropJournal(journal)
+        args: dict = journal.arguments
+        self._resumed = journal.rewritten
+        try:
+            match journal.operation:
+                case "renameCommits": self.renameCommits(fp, args["targets"], args["names"], RewriteBackend(args["backend"]), args.get("refs"))
+                case "rewriteMessages": self._rewriteMessages(fp, args["messages"], args.get("refs"))
+                case "rewriteRefs": self.rewriteRefs(fp, args["refs"], args["subjects"], args["messages"])
+                case "rewriteIdentities": self.rewriteIdentities(fp, IdentityMap.fromList(args["identities"]))
+                case _: raise ValueError(f"Unknown rewrite operation: {journal.operation}")
+        finally:
+            self._resumed = dict()
+
+    def _pickedWithoutMessage(self, fp: str, original: str, subject: str) -> bool:
+
+        # HEAD is the stopped commit replayed (same tree and author) but still carrying its old subject
+        head, source = self.catFile(fp).query(['HEAD', original])
+        if head is None or source is None: return False
+        headers: Callable[[bytes], list[bytes]] = lambda data: [l for l in data.split(b'\n\n', 1)[0].split(b'\n') if l.startswith((b'tree ', b'author '))]
+        return headers(head.data) == headers(source.data) and head.message().split('\n', 1)[0] != subject
+
+    def rollbackRewrite(self, fp: str, backup: str | None = None) -> str:
+
+        """
+        Puts a branch back where it was before a rewrite, aborting a stopped rebase first.
+        The other refs moved by the same rewrite (its backups share their timestamp) are restored too.
+        Commits made on top of the rewritten history since are left to the reflog.
+        Args:
+            fp (str): The path to the git repository.
+            backup (str | None): The backup ref to restore, by default the pending rewrite's
+                or else the newest backup of the current branch.
+        Returns:
+            str: The OID the branch points at again.
+        Raises:
+            ValueError: If there is no backup to restore.
+        """
+
+        journal: RewriteJournal | None = RewriteJournal.load(self, fp)
+        if self.cache is not None: self.cache.invalidate(fp)
+        if journal is not None and journal.rebaseInProgress: self.abortRebase(fp)
+
+        branchResult: subprocess.CompletedProcess = self.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        branch: str | None = journal.branch if journal is not None else (
+            branchResult.stdout.decode('utf-8').strip() if branchResult.returncode == 0 else None
         )
-        editor_script.close()
 
-        # Prepare the environment for the git command
-        env = os.environ.copy()
-        env['GIT_SEQUENCE_EDITOR'] = f'python "{seq_editor_script.name}"'
-        env['GIT_EDITOR'] = f'python "{editor_script.name}"'
+        if backup is None and journal is not None: backup = journal.backup
+        if backup is None:
+            backups: list[tuple[str, str]] = RewriteJournal.backups(self, fp, branch) if branch else []
+            if not backups: raise ValueError(f"No backup to roll back to in '{fp}'.")
+            backup = backups[0][0]
+
+        oid: str | None = self.resolve(fp, backup)
+        if oid is None: raise ValueError(f"Unknown backup ref: {backup}")
+
+        # Message and identity rewrites keep every tree, so the index and working tree stay valid
+        restore: dict[str, str] = {RewriteJournal.backedUp(ref): target for ref, target in RewriteJournal.siblings(self, fp, backup) if ref != backup}
+        restore[branch if branch else 'HEAD'] = oid
+        updates: str = ''.join(f"update {ref} {target}\n" for ref, target in restore.items())
+
+        command: list[str] = ['git', '-C', fp, 'update-ref', '-m', f'gitcleaner: rollback to {backup}', '--stdin']
+        result: subprocess.CompletedProcess = self.runGitCommand(command + ([] if branch else ['--no-deref']), input=updates.encode('utf-8'))
+        if result.returncode != 0:
+            raise RuntimeError(f"Rollback failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+        if journal is not None: journal.discard()
+        return oid
+
+    def compactRepository(self, fp: str, level: CompactionLevel = CompactionLevel.NORMAL, dropBackups: bool = False) -> CompactionReport:
 
-        first: str = subset[0].hashstr[:7]
-        self.runGitCommand(['git', '-C', fp, 'rebase', '-i', f'{first}^'], env=env)
+        """
+        Reclaims the space held by the history a rewrite replaced (see Maintenance.compact).
+        Args:
+            fp (str): The path to the git repository.
+            level (CompactionLevel): How much reflog history is forgotten and how hard the packs are recompressed.
+            dropBackups (bool): Whether the backup refs are deleted too, making rollbacks impossible.
+        Returns:
+            CompactionReport: The sizes before and after.
+        """
 
-        # Clean up temporary files
-        os.remove(todo_file.name)
-        os.remove(seq_editor_script.name)
-        os.remove(msg_file.name)
-        os.remove(editor_script.name)
+        return Maintenance(self).compact(fp, level, dropBackups)
+
+    def publishRefs(self, fp: str, remotes: list[str], refs: list[str] | None = None, atomic: bool = False) -> list[PushResult]:
+
+        """
+        Force-pushes the refs moved by the last rewrite, with a lease, in one push per remote
+        (see Maintenance.publish).
+        Args:
+            fp (str): The path to the git repository.
+            remotes (list[str]): Remote names, URLs or paths.
+            refs (list[str] | None): The refs to push, names or globs, the rewritten ones when None.
+            atomic (bool): Whether each remote must accept every ref or none.
+        Returns:
+            list[PushResult]: One result per remote.
+        """
+
+        return Maintenance(self).publish(fp, remotes, refs, atomic)
 
     def renameCommit(self, fp: str, target: str, name: str) -> None:
         self.renameCommits(fp, [target], [name])
 
+    def rewriteMessages(self, fp: str, commits: list[Commit], refs: list[str] | None = None) -> dict[str, str]:
+
+        """
+        Replaces the full messages (subject and body) of several commits of the current
+        branch, or of a set of refs (see rewriteRefs), in one fast-import rewrite.
+        Args:
+            fp (str): The path to the git repository.
+            commits (list[Commit]): The commits carrying their new message, e.g. from findReplacements.
+            refs (list[str] | None): The refs to rewrite (names or globs), only the current branch when None.
+        Returns:
+            dict[str, str]: The old -> new OID map of every replayed commit.
+        Raises:
+            ValueError: If a commit is not on the current branch, or on any of the refs.
+        """
+
+        if not commits: return dict()
+        oids: list[str] = FastRewriter(self).resolve(fp, [c.oid for c in commits])
+        return self._rewriteMessages(fp, dict(zip(oids, [c.message for c in commits])), refs)
+
+    def _rewriteMessages(self, fp: str, messages: dict[str, str], refs: list[str] | None = None) -> dict[str, str]:
+
+        if refs: return self.rewriteRefs(fp, refs, messages=messages, operation="rewriteMessages", arguments={"messages": messages, "refs": refs})
+        if self.cache is not None: self.cache.invalidate(fp)
+        with self.span("rewriteMessages", repo=fp, targets=len(messages)):
+            oldest: Commit | None = None
+            remaining: set[str] = set(messages)
+            for c in self.iterCommits(fp):
+                if c.oid in remaining:
+                    oldest = c
+                    remaining.discard(c.oid)
+                if not remaining: break
+
+            if remaining:
+                raise ValueError(f"Commits not on the current branch: {', '.join(sorted(r[:7] for r in remaining))}")
+            return self._journaled(fp, "rewriteMessages", {"messages": messages},
+                                   lambda journal: FastRewriter(self).rewrite(fp, base=oldest.oid if oldest else None, messages=messages))
+
+    def rewriteIdentities(self, fp: str, identities: IdentityMap) -> dict[str, str]:
+
+        """
+        Applies mailmap-style identity replacements to the authors and committers
+        of the whole current branch.
+        Args:
+            fp (str): The path to the git repository.
+            identities (IdentityMap): The identity replacements.
+        Returns:
+            dict[str, str]: The old -> new OID map of every replayed commit.
+        """
+
+        if self.cache is not None: self.cache.invalidate(fp)
+        with self.span("rewriteIdentities", repo=fp):
+            return self._journaled(fp, "rewriteIdentities", {"identities": identities.toList()},
+                                   lambda journal: FastRewriter(self).rewrite(fp, identities=identities))
+
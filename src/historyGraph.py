@@ -0,0 +1,98 @@
+
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class HistoryGraph:
+
+    """
+    Parent links of the commits reachable from a set of refs, in topological
+    order (parents before children). It answers which commits a rewrite has to
+    replay: the targets and everything descending from them, on every ref at
+    once, so that a commit shared by many branches is replayed a single time.
+    """
+
+    def __init__(self, order: list[str], parents: dict[str, tuple[str, ...]]) -> None:
+        self._order: list[str] = order
+        self._parents: dict[str, tuple[str, ...]] = parents
+
+    @classmethod
+    def load(cls, service: "GitService", fp: str, tips: Iterable[str]) -> "HistoryGraph":
+
+        """
+        Reads the graph of the commits reachable from some tips.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            tips (Iterable[str]): The commits (or refs) to start from.
+        Returns:
+            HistoryGraph: The graph.
+        """
+
+        order: list[str] = list()
+        parents: dict[str, tuple[str, ...]] = dict()
+
+        command: list[str] = ['git', '-C', fp, 'rev-list', '--topo-order', '--reverse', '--parents', '--end-of-options', *tips]
+        for line in cls._lines(service.streamGitCommand(command)):
+            oid, *rest = line.split()
+            order.append(oid)
+            parents[oid] = tuple(rest)
+
+        return cls(order, parents)
+
+    @staticmethod
+    def _lines(chunks: Iterator[bytes]) -> Iterator[str]:
+
+        pending: bytes = b''
+        for chunk in chunks:
+            lines: list[bytes] = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            yield from (line.decode('ascii') for line in lines if line)
+        if pending: yield pending.decode('ascii')
+
+    @property
+    def order(self) -> list[str]:
+        return self._order
+
+    @property
+    def parents(self) -> dict[str, tuple[str, ...]]:
+        return self._parents
+
+    def affected(self, targets: Iterable[str]) -> set[str]:
+
+        """
+        Finds the commits a rewrite of the targets gives a new OID.
+        Args:
+            targets (Iterable[str]): The full OIDs of the rewritten commits.
+        Returns:
+            set[str]: The targets and all their descendants.
+        """
+
+        affected: set[str] = set(targets) & self._parents.keys()
+        # Parents come first, one pass settles every commit
+        for oid in self._order:
+            if oid not in affected and any(p in affected for p in self._parents[oid]): affected.add(oid)
+        return affected
+
+    def boundary(self, affected: set[str]) -> list[str]:
+
+        """
+        Finds the commits to exclude so that only the affected commits get exported.
+        Args:
+            affected (set[str]): The commits to replay, see affected().
+        Returns:
+            list[str]: The parents of affected commits that are not affected themselves.
+        """
+
+        return sorted({p for oid in affected for p in self._parents.get(oid, ()) if p not in affected})
+
+    def __contains__(self, oid: str) -> bool:
+        return oid in self._parents
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __repr__(self) -> str:
+        return f"HistoryGraph(commits={len(self)})"
@@ -0,0 +1,96 @@
+
+import re
+
+
+class IdentityMap:
+
+    """
+    Mailmap-style identity replacement. Each entry maps a commit identity
+    (an email, optionally narrowed by a name) to a proper name and/or email,
+    following the four line forms of gitmailmap(5):
+
+        Proper Name <commit@email>
+        <proper@email> <commit@email>
+        Proper Name <proper@email> <commit@email>
+        Proper Name <proper@email> Commit Name <commit@email>
+    """
+
+    LINE: re.Pattern = re.compile(r'^\s*([^<#]*?)\s*<([^>]*)>\s*(?:([^<]*?)\s*<([^>]*)>)?\s*(?:#.*)?$')
+
+    def __init__(self) -> None:
+        # (lowercased commit email, commit name or None) -> (proper name or None, proper email or None)
+        self._entries: dict[tuple[str, str | None], tuple[str | None, str | None]] = dict()
+
+    @classmethod
+    def fromMailmap(cls, text: str) -> "IdentityMap":
+
+        """
+        Creates an identity map from the contents of a .mailmap file.
+        Args:
+            text (str): The mailmap contents.
+        Returns:
+            IdentityMap: The parsed map.
+        Raises:
+            ValueError: If a line is not a valid mailmap entry.
+        """
+
+        identities: IdentityMap = cls()
+        for number, line in enumerate(text.splitlines(), start=1):
+
+            if not line.strip() or line.lstrip().startswith('#'): continue
+            match: re.Match | None = cls.LINE.match(line)
+            if match is None: raise ValueError(f"Invalid mailmap entry at line {number}: {line}")
+
+            properName, firstEmail, commitName, commitEmail = match.groups()
+            if commitEmail is None: identities.add(firstEmail, newName=properName or None)
+            else: identities.add(commitEmail, commitName or None, properName or None, firstEmail or None)
+
+        return identities
+
+    def add(self, email: str, name: str | None = None, newName: str | None = None, newEmail: str | None = None) -> None:
+
+        """
+        Adds an identity replacement.
+        Args:
+            email (str): The commit email to match (case-insensitive).
+            name (str | None): The commit name to match, any name when None.
+            newName (str | None): The replacement name, kept as is when None.
+            newEmail (str | None): The replacement email, kept as is when None.
+        """
+
+        assert newName is not None or newEmail is not None, "An identity replacement needs a new name or a new email."
+        self._entries[(email.lower(), name)] = (newName, newEmail)
+
+    def map(self, name: str, email: str) -> tuple[str, str]:
+
+        """
+        Maps an identity, entries narrowed by name taking precedence.
+        Args:
+            name (str): The commit name.
+            email (str): The commit email.
+        Returns:
+            tuple[str, str]: The (name, email) to use.
+        """
+
+        entry: tuple[str | None, str | None] | None = self._entries.get((email.lower(), name)) or self._entries.get((email.lower(), None))
+        if entry is None: return name, email
+        return entry[0] if entry[0] is not None else name, entry[1] if entry[1] is not None else email
+
+    def toList(self) -> list[list[str | None]]:
+        # [email, name, newName, newEmail] rows, enough to rebuild the map with fromList
+        return [[email, name, newName, newEmail] for (email, name), (newName, newEmail) in self._entries.items()]
+
+    @classmethod
+    def fromList(cls, rows: list[list[str | None]]) -> "IdentityMap":
+        identities: IdentityMap = cls()
+        for email, name, newName, newEmail in rows: identities.add(email, name, newName, newEmail)
+        return identities
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __repr__(self) -> str:
+        return f"IdentityMap(entries={len(self)})"
@@ -1,6 +1,11 @@
 
+import atexit
 import enum
+import json
+import os
+import queue
 import sys
+import threading
 import time
 import uuid
 
@@ -14,34 +19,70 @@ class LogLevel(enum.Enum):
     ERROR: str = "ERROR"
     CRITICAL: str = "CRITICAL"
 
+    @property
+    def severity(self) -> int:
+        # Plain (NONE) messages are filtered like INFO ones
+        return {"DEBUG": 10, "NONE": 20, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}[self.value]
+
     def __str__(self) -> str:
         return self.value
-    
- 
+
+
 class Logger:
 
     # Singleton variables
     _instance: object | None = None
     _initialized: bool = False
 
+    # Stops the writer thread
+    _STOP: object = object()
+
     def __new__(cls, *args, **kwargs) -> "Logger":
         if cls._instance is None:
             cls._instance = super(Logger, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, description: str = "Logger") -> None:
+    def __init__(self, description: str = "Logger", level: LogLevel = LogLevel.DEBUG, path: str | None = None,
+                 maxBytes: int = 10 * 1024 * 1024, backups: int = 3, console: bool = True, background: bool = True) -> None:
+
+        """
+        Args:
+            description (str): The name printed in front of every console line.
+            level (LogLevel): The lowest level that gets logged, lower records are dropped unformatted.
+            path (str | None): A JSON-lines log file, rotated once it grows past maxBytes.
+            maxBytes (int): The size from which the log file is rotated.
+            backups (int): How many rotated files (path.1, path.2, ...) are kept.
+            console (bool): Whether records are also printed to the console.
+            background (bool): Whether records are written by a background thread. Interactive sessions
+                write them synchronously, so that console lines never land in the middle of a prompt.
+        """
 
         # Ensure that the logger is only initialized once
         if self._initialized: return
+        Logger._initialized = True
 
         self._description: str = description
         self._date: str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         self._uuid: str = str(uuid.uuid4())
+        self._threshold: int = level.severity
+        self._path: str | None = path
+        self._maxBytes: int = maxBytes
+        self._backups: int = backups
+        self._console: bool = console
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+        # Records are formatted and written by a single background thread, in order
+        self._closing: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = threading.Thread(target=self._run, name="LoggerWriter", daemon=True) if background else None
+        if self._thread is not None: self._thread.start()
+        atexit.register(self.close)
 
     @property
     def description(self) -> str:
         return self._description
-    
+
     @property
     def date(self) -> str:
         return self._date
@@ -50,6 +91,16 @@ class Logger:
     def uuid(self) -> str:
         return self._uuid
 
+    @property
+    def path(self) -> str | None:
+        return self._path
+
+    def setLevel(self, level: LogLevel) -> None:
+        self._threshold = level.severity
+
+    def isEnabledFor(self, level: LogLevel) -> bool:
+        return level.severity >= self._threshold
+
     def consoleLog(self, content: str, level: LogLevel | None = LogLevel.NONE) -> None:
 
         """
@@ -59,16 +110,128 @@ class Logger:
             level (LogLevel): The log level for the message.
         """
 
-        assert isinstance(content, str), "Content must be a string."
-        assert isinstance(level, LogLevel), "Level must be an instance of LogLevel."
+        level = level or LogLevel.NONE
+        if level.severity < self._threshold: return
+        self._submit({"time": time.time(), "level": level.value, "logger": self._description, "message": content})
+
+    def logCommand(self, command: list[str], returncode: int, duration: float, stderr: bytes | None = None) -> None:
+
+        """
+        Logs the outcome of a git command as a structured record. The message itself
+        is only built by the writer thread, and never for a filtered level.
+        Args:
+            command (list[str]): The command that ran.
+            returncode (int): Its exit code.
+            duration (float): Its wall time, in seconds.
+            stderr (bytes | None): Its error output, kept for failed commands.
+        """
+
+        level: LogLevel = LogLevel.INFO if returncode == 0 else LogLevel.ERROR
+        if level.severity < self._threshold: return
+
+        repo: str | None = command[command.index('-C') + 1] if '-C' in command[:-1] else None
+        self._submit({
+            "time": time.time(), "level": level.value, "logger": self._description, "repo": repo,
+            "command": command, "duration": duration, "returncode": returncode,
+            "stderr": stderr if returncode != 0 else None,
+        })
+
+    def _submit(self, record: dict) -> None:
+
+        with self._lock:
+            if self._thread is not None and not self._closing:
+                self._queue.put(record)
+                return
+
+        # Once close() queued the stop marker (e.g. during interpreter shutdown) records are written synchronously,
+        # after the queued ones
+        if self._thread is not None: self._thread.join()
+        with self._lock: self._write(record)
+
+    def _run(self) -> None:
+        while 1:
+            record: dict | object = self._queue.get()
+            try:
+                if record is Logger._STOP: return
+                self._write(record)
+            except Exception as e:
+                print(f"[{self._description}] [ERROR] Could not write log record: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _message(record: dict) -> str:
+        if "message" in record: return record["message"]
+        if record["returncode"] == 0: return f"Command executed successfully: {' '.join(record['command'])} ({record['duration'] * 1000:.1f} ms)"
+        return f"Command failed with error: {(record['stderr'] or b'').decode('utf-8', errors='ignore')}"
 
-        fromattedContent: str = f"[{self.description}] [{level}] {content}" if level != LogLevel.NONE else f"[{self.description}] {content}"
-        print(fromattedContent, file=sys.stderr if level in {LogLevel.ERROR, LogLevel.CRITICAL} else sys.stdout)
+    def _write(self, record: dict) -> None:
+
+        message: str = Logger._message(record)
+
+        if self._console:
+            fromattedContent: str = f"[{record['logger']}] [{record['level']}] {message}" if record['level'] != LogLevel.NONE.value else f"[{record['logger']}] {message}"
+            print(fromattedContent, file=sys.stderr if record['level'] in {"ERROR", "CRITICAL"} else sys.stdout)
+
+        if self._file is not None:
+            entry: dict = {k: v for k, v in record.items() if k != "stderr" and v is not None}
+            entry["message"] = message
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            if self._file.tell() >= self._maxBytes: self._rotate()
+
+    def _rotate(self) -> None:
+
+        # path -> path.1 -> path.2 ... the oldest backup being dropped
+        self._file.close()
+        for i in range(self._backups - 1, 0, -1):
+            if os.path.exists(f"{self._path}.{i}"): os.replace(f"{self._path}.{i}", f"{self._path}.{i + 1}")
+        if self._backups > 0: os.replace(self._path, f"{self._path}.1")
+        else: os.remove(self._path)
+        self._file = open(self._path, 'a', encoding='utf-8')
+
+    def flush(self) -> None:
+
+        """
+        Blocks until every queued record has been written.
+        """
+
+        if self._thread is not None: self._queue.join()
+        with self._lock:
+            if self._file is not None: self._file.flush()
+        sys.stdout.flush()
+
+    def close(self) -> None:
+
+        """
+        Writes the pending records, stops the writer thread and closes the log file.
+        """
+
+        with self._lock:
+            if self._closing: return
+            self._closing = True
+            if self._thread is not None: self._queue.put(Logger._STOP)
+
+        if self._thread is not None: self._thread.join()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @classmethod
+    def reset(cls) -> None:
+
+        """
+        Closes and forgets the singleton, the next Logger() builds a fresh one.
+        """
+
+        if cls._instance is not None: cls._instance.close()
+        cls._instance = None
+        cls._initialized = False
 
     def logWarning(self, content: str) -> None:
         self.consoleLog(content, LogLevel.WARNING)
 
-    def logError(self, content: str) -> None: 
+    def logError(self, content: str) -> None:
         self.consoleLog(content, LogLevel.ERROR)
 
     def logCritical(self, content: str) -> None:
@@ -83,24 +246,14 @@ class Logger:
     def log(self, content: str) -> None:
         self.consoleLog(content, LogLevel.NONE)
 
-    def __del__(self) -> None:
-        
-        """
-        Destructor to clean up the logger instance.
-        """
-
-        self._instance = None
-        self._initialized = False
-    
     def __repr__(self) -> str:
         return f"Logger(description={self.description}, date={self.date})"
-    
+
     def __str__(self) -> str:
         return f"Logger: {self.description} | Date: {self.date}"
-    
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Logger):
             self.logWarning("Comparison with non-Logger object.")
             return False
         return self.uuid == other.uuid
-    
@@ -0,0 +1,372 @@
+
+from .rewriteJournal import RewriteJournal
+
+import enum
+import json
+import subprocess
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class CompactionLevel(enum.Enum):
+
+    # Only the reflogs of the rewritten refs, the loose objects are pruned and packs are kept
+    LIGHT: str = "LIGHT"
+    # Every reflog loses its unreachable entries, then everything is repacked into one pack
+    NORMAL: str = "NORMAL"
+    # Every reflog is emptied and the deltas are recomputed with a wide window, like gc --aggressive
+    AGGRESSIVE: str = "AGGRESSIVE"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+
+class CompactionReport:
+
+    def __init__(self, path: str, level: CompactionLevel, before: dict[str, int], after: dict[str, int],
+                 steps: list[str], backups: int, dropped: int, duration: float) -> None:
+        self._path: str = path
+        self._level: CompactionLevel = level
+        self._before: dict[str, int] = before
+        self._after: dict[str, int] = after
+        self._steps: list[str] = steps
+        self._backups: int = backups
+        self._dropped: int = dropped
+        self._duration: float = duration
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def level(self) -> CompactionLevel:
+        return self._level
+
+    @property
+    def before(self) -> dict[str, int]:
+        # `git count-objects -v` before compacting, sizes in bytes
+        return self._before
+
+    @property
+    def after(self) -> dict[str, int]:
+        return self._after
+
+    @property
+    def reclaimed(self) -> int:
+        return self._before["bytes"] - self._after["bytes"]
+
+    @property
+    def steps(self) -> list[str]:
+        # The git commands run, in order
+        return self._steps
+
+    @property
+    def backups(self) -> int:
+        # The backup refs left, they keep the previous history reachable
+        return self._backups
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    def toDict(self) -> dict:
+        return {
+            "path": self.path, "level": str(self.level), "before": self.before, "after": self.after,
+            "reclaimed": self.reclaimed, "steps": self.steps, "backups": self.backups, "droppedBackups": self.dropped,
+            "duration": self.duration,
+        }
+
+    def toJson(self, indent: int | None = 2) -> str:
+        return json.dumps(self.toDict(), indent=indent)
+
+    def summary(self) -> list[str]:
+
+        """
+        Builds a short human-readable description of the compaction.
+        Returns:
+            list[str]: One line per fact.
+        """
+
+        lines: list[str] = [
+            f"{self.path}: {str(self.level).lower()} compaction in {self.duration:.2f}s",
+            f"Size: {Maintenance.humanSize(self.before['bytes'])} -> {Maintenance.humanSize(self.after['bytes'])} "
+            f"({Maintenance.humanSize(max(self.reclaimed, 0))} reclaimed)",
+            f"Objects: {self.before['objects']} -> {self.after['objects']}",
+        ]
+        if self.dropped: lines.append(f"Dropped {self.dropped} backup refs, the previous history can no longer be rolled back to.")
+        if self.backups: lines.append(f"{self.backups} backup refs still keep the previous history alive, drop them to reclaim it.")
+        return lines
+
+    def __repr__(self) -> str:
+        return f"CompactionReport(path={self.path}, level={self.level}, reclaimed={self.reclaimed})"
+
+
+
+class PushResult:
+
+    def __init__(self, remote: str, refs: dict[str, tuple[str, str]], error: str | None = None) -> None:
+        self._remote: str = remote
+        self._refs: dict[str, tuple[str, str]] = refs
+        self._error: str | None = error
+
+    @property
+    def remote(self) -> str:
+        return self._remote
+
+    @property
+    def refs(self) -> dict[str, tuple[str, str]]:
+        # The `git push --porcelain` flag and summary of each ref, e.g. ('+', 'forced update')
+        return self._refs
+
+    @property
+    def rejected(self) -> list[str]:
+        return [ref for ref, (flag, _) in self._refs.items() if flag == '!']
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def ok(self) -> bool:
+        return self._error is None and not self.rejected
+
+    def toDict(self) -> dict:
+        return {
+            "remote": self.remote, "refs": {ref: {"flag": flag, "summary": summary} for ref, (flag, summary) in self.refs.items()},
+            "rejected": self.rejected, "error": self.error,
+        }
+
+    def __repr__(self) -> str:
+        return f"PushResult(remote={self.remote}, refs={len(self.refs)}, rejected={len(self.rejected)}, error={self.error})"
+
+    def __str__(self) -> str:
+        if self.error is not None and not self.refs: return f"{self.remote}: failed: {self.error}"
+        current: int = sum(1 for flag, _ in self._refs.values() if flag == '=')
+        status: str = f"{len(self.refs) - len(self.rejected) - current} refs pushed" + (f", {current} up to date" if current else "") \
+            + (f", {len(self.rejected)} rejected" if self.rejected else "")
+        return f"{self.remote}: {status}"
+
+
+
+class Maintenance:
+
+    """
+    Post-rewrite housekeeping. A rewrite leaves the previous history reachable
+    from the reflogs and ORIG_HEAD, so the repository only grows; compacting
+    expires those entries, repacks and prunes what nothing reaches anymore.
+    Publishing pushes every ref moved by the last rewrite to each remote in one
+    batched `--force-with-lease` push, the lease being the commit the remote is
+    known to hold, so a ref that moved on the remote meanwhile is never clobbered.
+    """
+
+    REPACK: dict[CompactionLevel, list[str]] = {
+        CompactionLevel.LIGHT: ['repack', '-d', '-q'],
+        CompactionLevel.NORMAL: ['repack', '-a', '-d', '-q'],
+        CompactionLevel.AGGRESSIVE: ['repack', '-a', '-d', '-f', '-q', '--depth=50', '--window=250'],
+    }
+
+    def __init__(self, service: "GitService") -> None:
+        self._service: "GitService" = service
+
+    @property
+    def service(self) -> "GitService":
+        return self._service
+
+    @staticmethod
+    def humanSize(size: int) -> str:
+        if size < 1024: return f"{size} B"
+        value: float = size / 1024
+        for unit in ("KiB", "MiB"):
+            if value < 1024: return f"{value:.1f} {unit}"
+            value /= 1024
+        return f"{value:.1f} GiB"
+
+    def sizes(self, fp: str) -> dict[str, int]:
+
+        """
+        Measures the object database.
+        Args:
+            fp (str): The path to the git repository.
+        Returns:
+            dict[str, int]: The objects, loose objects and packs counts, and their size in bytes.
+        Raises:
+            RuntimeError: If the object database cannot be read.
+        """
+
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, 'count-objects', '-v'])
+        if result.returncode != 0: raise RuntimeError(f"count-objects failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+        counts: dict[str, int] = dict()
+        for line in result.stdout.decode('utf-8').splitlines():
+            key, _, value = line.partition(':')
+            counts[key.strip()] = int(value.strip() or 0)
+
+        # count-objects reports kibibytes
+        return {
+            "objects": counts.get("count", 0) + counts.get("in-pack", 0),
+            "loose": counts.get("count", 0),
+            "packs": counts.get("packs", 0),
+            "bytes": (counts.get("size", 0) + counts.get("size-pack", 0) + counts.get("size-garbage", 0)) * 1024,
+        }
+
+    def rewrittenRefs(self, fp: str) -> dict[str, str]:
+
+        """
+        Finds the refs moved by the last rewrite, from its backup refs.
+        Args:
+            fp (str): The path to the git repository.
+        Returns:
+            dict[str, str]: The commit each ref pointed at before the rewrite, by full ref name.
+        """
+
+        backups: list[tuple[str, str]] = RewriteJournal.backups(self.service, fp)
+        if not backups: return dict()
+        refs: dict[str, str] = {RewriteJournal.backedUp(ref): oid for ref, oid in RewriteJournal.siblings(self.service, fp, backups[0][0])}
+        # A detached HEAD has nothing to publish
+        refs.pop('HEAD', None)
+        return refs
+
+    def compact(self, fp: str, level: CompactionLevel = CompactionLevel.NORMAL, dropBackups: bool = False) -> CompactionReport:
+
+        """
+        Expires the reflogs, repacks and prunes the unreachable objects.
+        Objects are pruned immediately: no other git process should write to the repository meanwhile.
+        Args:
+            fp (str): The path to the git repository.
+            level (CompactionLevel): How much history is forgotten and how hard the packs are recompressed.
+            dropBackups (bool): Whether the refs/gitcleaner backups are deleted first; the previous
+                history then becomes unreachable, and reclaimable, but can no longer be rolled back to.
+        Returns:
+            CompactionReport: The sizes before and after, and what was run.
+        Raises:
+            RuntimeError: If a rewrite is pending, or a step fails.
+        """
+
+        pending: RewriteJournal | None = RewriteJournal.load(self.service, fp)
+        if pending is not None:
+            raise RuntimeError(f"An interrupted {pending.operation} is pending in '{fp}', resume it or roll it back first.")
+
+        start: float = time.perf_counter()
+        with self.service.span("compact", repo=fp, level=str(level)) as span:
+
+            before: dict[str, int] = self.sizes(fp)
+            steps: list[str] = list()
+            backups: list[tuple[str, str]] = RewriteJournal.backups(self.service, fp)
+            rewritten: list[str] = list(self.rewrittenRefs(fp))
+
+            dropped: int = 0
+            if dropBackups and backups:
+                deletes: str = ''.join(f"delete {ref} {oid}\n" for ref, oid in backups)
+                self._run(fp, ['update-ref', '--stdin'], steps, deletes.encode('utf-8'))
+                dropped, backups = len(backups), list()
+
+            # ORIG_HEAD still names the tip of the history a rebase replaced
+            if self.service.resolve(fp, 'ORIG_HEAD') is not None: self._run(fp, ['update-ref', '-d', 'ORIG_HEAD'], steps)
+
+            expire: list[str] = ['reflog', 'expire', '--expire=now' if level == CompactionLevel.AGGRESSIVE else '--expire-unreachable=now']
+            if level == CompactionLevel.LIGHT: self._run(fp, expire + ['HEAD', *rewritten], steps)
+            else: self._run(fp, expire + ['--all'], steps)
+
+            self._run(fp, Maintenance.REPACK[level], steps)
+            self._run(fp, ['prune', '--expire=now'], steps)
+            if level == CompactionLevel.AGGRESSIVE: self._run(fp, ['pack-refs', '--all'], steps)
+
+            after: dict[str, int] = self.sizes(fp)
+            report: CompactionReport = CompactionReport(fp, level, before, after, steps, len(backups), dropped, time.perf_counter() - start)
+            span.update({"reclaimed": report.reclaimed, "backups": len(backups)})
+
+        if self.service.hasLogger(): self.service.logger.logInfo(f"Compacted {fp}: {Maintenance.humanSize(max(report.reclaimed, 0))} reclaimed.")
+        return report
+
+    def _run(self, fp: str, arguments: list[str], steps: list[str], input: bytes | None = None) -> None:
+        steps.append(' '.join(['git', *arguments]))
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, *arguments], input=input)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {arguments[0]} failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+    def publish(self, fp: str, remotes: list[str], refs: list[str] | None = None, atomic: bool = False) -> list[PushResult]:
+
+        """
+        Force-pushes rewritten refs, one batched push per remote. Each ref is leased on the
+        remote-tracking ref when there is one, else on the commit it pointed at before the
+        last rewrite: the push of that ref is rejected if the remote holds anything else.
+        Args:
+            fp (str): The path to the git repository.
+            remotes (list[str]): Remote names, URLs or paths (a local bare repository works).
+            refs (list[str] | None): The refs to push, names or globs (see GitService.listRefs);
+                the refs moved by the last rewrite when None.
+            atomic (bool): Whether each remote must accept every ref or none.
+        Returns:
+            list[PushResult]: One result per remote, in order.
+        Raises:
+            ValueError: If there is nothing to publish.
+        """
+
+        assert remotes, "At least one remote is required."
+
+        previous: dict[str, str] = self.rewrittenRefs(fp)
+        names: list[str] = sorted(self.service.listRefs(fp, refs)) if refs is not None else sorted(previous)
+        if not names: raise ValueError(f"No rewritten ref to publish in '{fp}'." if refs is None else f"No ref matches: {', '.join(refs)}")
+
+        configured: set[str] = set(self._output(fp, ['remote']).split())
+        results: list[PushResult] = list()
+        with self.service.span("publish", repo=fp, remotes=len(remotes), refs=len(names)):
+            for remote in remotes:
+
+                leases: list[str] = list()
+                for ref in names:
+                    expected: str | None = self._tracking(fp, remote, ref) if remote in configured else None
+                    if expected is None: expected = previous.get(ref)
+                    # Without anything known about the remote, the plain lease falls back to git's own check
+                    leases.append(f"--force-with-lease={ref}:{expected}" if expected else f"--force-with-lease={ref}")
+
+                command: list[str] = ['git', '-C', fp, 'push', '--porcelain', *(['--atomic'] if atomic else []), *leases, remote]
+                result: subprocess.CompletedProcess = self.service.runGitCommand(command + [f"{ref}:{ref}" for ref in names])
+                pushed: dict[str, tuple[str, str]] = Maintenance.parsePorcelain(result.stdout.decode('utf-8', errors='replace'))
+                error: str | None = (result.stderr.decode('utf-8', errors='ignore').strip() or "push failed") if result.returncode != 0 else None
+                results.append(PushResult(remote, pushed, error))
+
+                if self.service.hasLogger():
+                    if error is None: self.service.logger.logInfo(f"Published {len(pushed)} refs to {remote}.")
+                    else: self.service.logger.logError(f"Publishing to {remote} failed: {error}")
+
+        return results
+
+    def _output(self, fp: str, arguments: list[str]) -> str:
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, *arguments])
+        return result.stdout.decode('utf-8').strip() if result.returncode == 0 else ""
+
+    def _tracking(self, fp: str, remote: str, ref: str) -> str | None:
+        # Only branches have remote-tracking refs, refs/heads/x -> refs/remotes/<remote>/x
+        if not ref.startswith('refs/heads/'): return None
+        return self.service.resolve(fp, f"refs/remotes/{remote}/{ref[len('refs/heads/'):]}")
+
+    @staticmethod
+    def parsePorcelain(output: str) -> dict[str, tuple[str, str]]:
+
+        """
+        Parses the output of `git push --porcelain`.
+        Args:
+            output (str): The standard output of the push.
+        Returns:
+            dict[str, tuple[str, str]]: The flag and summary of each remote ref.
+        """
+
+        refs: dict[str, tuple[str, str]] = dict()
+        for line in output.splitlines():
+            # <flag> TAB <from>:<to> TAB <summary>
+            parts: list[str] = line.split('\t')
+            if len(parts) < 3 or len(parts[0]) != 1: continue
+            refs[parts[1].rpartition(':')[2]] = (parts[0], parts[2])
+        return refs
+
+    def __repr__(self) -> str:
+        return f"Maintenance(service={self.service})"
@@ -0,0 +1,216 @@
+
+from .commit import Commit
+
+import re
+from typing import Iterable
+
+
+class MatchRule:
+
+    def __init__(self, target: str, replacement: str, regex: bool = False) -> None:
+        self._target: str = target
+        self._replacement: str = replacement
+        self._regex: bool = regex
+
+    @property
+    def target(self) -> str:
+        return self._target
+
+    @property
+    def replacement(self) -> str:
+        return self._replacement
+
+    @property
+    def regex(self) -> bool:
+        return self._regex
+
+    def __repr__(self) -> str:
+        return f"MatchRule(target={self.target!r}, replacement={self.replacement!r}, regex={self.regex})"
+
+
+
+class MessageMatcher:
+
+    """
+    Replacement engine compiling every target into a single regular expression,
+    so that each message is rewritten in one pass whatever the number of targets.
+    Literal targets are folded into a trie-shaped alternation; regex targets are
+    appended as their own groups and may reference their groups in the
+    replacement (e.g. "\\1" or "\\g<user>"), numbered as in the target alone.
+    """
+
+    # A numbered backreference in a pattern: one or two digits, not an octal escape
+    BACKREFERENCE: re.Pattern = re.compile(r'\\(?:(?![1-7][0-7]{2})([1-9][0-9]?)|.)|\[\^?\]?(?:\\.|[^\]])*\]', re.DOTALL)
+
+    def __init__(self, rules: list[MatchRule], ignoreCase: bool = False) -> None:
+
+        assert rules, "At least one rule is required."
+        assert all(isinstance(r, MatchRule) for r in rules), "All rules must be MatchRule instances."
+
+        flags: int = re.IGNORECASE if ignoreCase else 0
+        self._rules: list[MatchRule] = rules
+        self._ignoreCase: bool = ignoreCase
+        self._literals: dict[str, str] = {self._key(r.target): r.replacement for r in rules if not r.regex and r.target}
+        self._regexes: dict[str, MatchRule] = {f"_r{i}": r for i, r in enumerate(rules) if r.regex}
+        # Each regex on its own, the replacement groups are expanded against it
+        self._compiled: dict[str, re.Pattern] = {name: re.compile(r.target, flags) for name, r in self._regexes.items()}
+
+        alternatives: list[str] = list()
+        if self._literals: alternatives.append(f"(?P<_lit>{MessageMatcher.trieRegex(list(self._literals))})")
+        # Groups are numbered across the whole alternation, the backreferences of each target are shifted accordingly
+        offset: int = len(alternatives)
+        for name, compiled in self._compiled.items():
+            alternatives.append(f"(?P<{name}>{MessageMatcher.shiftBackreferences(compiled.pattern, offset + 1)})")
+            offset += 1 + compiled.groups
+        self._pattern: re.Pattern = re.compile('|'.join(alternatives) or '(?!)', flags)
+
+    @classmethod
+    def fromTargets(cls, targets: list[str] | dict[str, str], replacement: str = "",
+                    ignoreCase: bool = False, regex: bool = False) -> "MessageMatcher":
+
+        """
+        Creates a matcher from plain targets.
+        Args:
+            targets (list[str] | dict[str, str]): The targets, or a target -> replacement mapping.
+            replacement (str): The replacement used for targets given as a list.
+            ignoreCase (bool): Whether the targets are matched case-insensitively.
+            regex (bool): Whether the targets are regular expressions.
+        Returns:
+            MessageMatcher: The compiled matcher.
+        """
+
+        pairs: Iterable[tuple[str, str]] = targets.items() if isinstance(targets, dict) else ((t, replacement) for t in targets)
+        return cls([MatchRule(t, r, regex) for t, r in pairs], ignoreCase)
+
+    @staticmethod
+    def trieRegex(words: list[str]) -> str:
+
+        """
+        Builds a regular expression matching any of the words, factored as a trie
+        so that the regex engine never backtracks over shared prefixes.
+        Args:
+            words (list[str]): The literal words to match.
+        Returns:
+            str: The regular expression, longest words being preferred.
+        """
+
+        trie: dict = dict()
+        for word in words:
+            node: dict = trie
+            for char in word: node = node.setdefault(char, {})
+            node[''] = None
+
+        def build(node: dict) -> str | None:
+
+            if '' in node and len(node) == 1: return None
+
+            alternatives: list[str] = list()
+            chars: list[str] = list()
+            for char in sorted(k for k in node if k):
+                sub: str | None = build(node[char])
+                if sub is None: chars.append(re.escape(char))
+                else: alternatives.append(re.escape(char) + sub)
+
+            if chars: alternatives.append(chars[0] if len(chars) == 1 else f"[{''.join(chars)}]")
+            result: str = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+
+            # A lone char or char class can take the quantifier directly
+            if '' in node: result = f"{result}?" if len(alternatives) == 1 and chars else f"(?:{result})?"
+            return result
+
+        return build(trie) or ''
+
+    @staticmethod
+    def shiftBackreferences(pattern: str, offset: int) -> str:
+
+        """
+        Renumbers the numbered backreferences of a pattern embedded after other groups.
+        Args:
+            pattern (str): The regular expression.
+            offset (int): The number of groups opened before it.
+        Returns:
+            str: The pattern, "\\1" becoming a reference to group 1 + offset.
+        """
+
+        if not offset: return pattern
+
+        def shift(match: re.Match) -> str:
+            # Escapes and character classes are kept as they are, "[\\1]" is an octal escape
+            if match.group(1) is None: return match.group()
+            number: int = int(match.group(1)) + offset
+            if number > 99: raise ValueError(f"Too many groups before the backreference in {pattern!r}.")
+            return f"(?:\\{number})"
+
+        return MessageMatcher.BACKREFERENCE.sub(shift, pattern)
+
+    @property
+    def rules(self) -> list[MatchRule]:
+        return self._rules
+
+    @property
+    def pattern(self) -> re.Pattern:
+        return self._pattern
+
+    def _key(self, text: str) -> str:
+        return text.lower() if self._ignoreCase else text
+
+    def _replace(self, match: re.Match) -> str:
+
+        if match.lastgroup == '_lit':
+            replacement: str | None = self._literals.get(self._key(match.group()))
+            return replacement if replacement is not None else self._literal(match.group())
+
+        # The same regex alone matches the same text at the same position, with its own group numbers
+        own: re.Match = self._compiled[match.lastgroup].match(match.string, match.start())
+        return own.expand(self._regexes[match.lastgroup].replacement)
+
+    def _literal(self, text: str) -> str:
+
+        # re folds case more broadly than str.lower ("ſ" matches "s"), look the rule up the way re matched it
+        for rule in self._rules:
+            if not rule.regex and rule.target and re.fullmatch(re.escape(rule.target), text, re.IGNORECASE):
+                self._literals[self._key(text)] = rule.replacement
+                return rule.replacement
+        raise KeyError(text)
+
+    def search(self, message: str) -> bool:
+        return self._pattern.search(message) is not None
+
+    def sub(self, message: str) -> str:
+
+        """
+        Rewrites a message in a single pass.
+        Args:
+            message (str): The message to rewrite.
+        Returns:
+            str: The rewritten message.
+        """
+
+        return self._pattern.sub(self._replace, message)
+
+    def apply(self, commits: Iterable[Commit], fullMessage: bool = False) -> list[Commit]:
+
+        """
+        Rewrites the messages of a stream of commits.
+        Args:
+            commits (Iterable[Commit]): The commits to rewrite.
+            fullMessage (bool): Whether the bodies are rewritten too, not only the subjects.
+        Returns:
+            list[Commit]: Only the commits that changed, carrying their new message.
+        """
+
+        ret: list[Commit] = list()
+        for commit in commits:
+
+            if not fullMessage:
+                newMessage: str = self.sub(commit.name)
+                if newMessage != commit.name: ret.append(commit.withMessage(newMessage))
+                continue
+
+            newName, newBody = self.sub(commit.name), self.sub(commit.body)
+            if newName != commit.name or newBody != commit.body: ret.append(commit.withMessage(newName, newBody))
+
+        return ret
+
+    def __repr__(self) -> str:
+        return f"MessageMatcher(rules={len(self.rules)}, ignoreCase={self._ignoreCase})"
@@ -0,0 +1,276 @@
+
+from .commit import Commit
+from .recordParser import RecordParser
+
+import os
+import pathlib
+import re
+import sqlite3
+import subprocess
+import time
+from typing import Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class MessageIndex:
+
+    """
+    On-disk inverted index of commit messages across repositories, kept in a
+    SQLite file: every word of a message points to the commits holding it, so
+    finding the commits that mention a word costs an index lookup instead of a
+    `git log` of every repository. Each repository is stamped with the HEAD it
+    was indexed at: when HEAD moves forward only the new commits are indexed,
+    and after a rewrite only the commits that appeared or vanished are.
+    """
+
+    TERM: re.Pattern = re.compile(r'\w+')
+    # Longer words are indexed on their prefix, queries being prefixes anyway
+    TERM_LENGTH: int = 64
+    SCHEMA: tuple[str, ...] = (
+        "CREATE TABLE IF NOT EXISTS repos (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, head TEXT)",
+        "CREATE TABLE IF NOT EXISTS commits (id INTEGER PRIMARY KEY, repo INTEGER NOT NULL, oid TEXT NOT NULL, "
+        "short TEXT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL, UNIQUE (repo, oid))",
+        "CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS postings (term INTEGER NOT NULL, commit_ INTEGER NOT NULL, PRIMARY KEY (term, commit_)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS postings_commit ON postings (commit_)",
+    )
+
+    def __init__(self, service: "GitService", path: str | None = None) -> None:
+
+        default: pathlib.Path = pathlib.Path(os.environ.get('XDG_CACHE_HOME', pathlib.Path.home() / '.cache')) / 'gitcleaner' / 'messages.sqlite'
+        self._service: "GitService" = service
+        self._path: pathlib.Path = pathlib.Path(path) if path else default
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._db: sqlite3.Connection = sqlite3.connect(self._path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            for statement in MessageIndex.SCHEMA: self._db.execute(statement)
+
+    @property
+    def service(self) -> "GitService":
+        return self._service
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @property
+    def repos(self) -> dict[str, str | None]:
+        # The indexed repositories and the HEAD each one was indexed at
+        return dict(self._db.execute("SELECT path, head FROM repos ORDER BY path"))
+
+    @staticmethod
+    def key(fp: str) -> str:
+        return str(pathlib.Path(fp).resolve())
+
+    @staticmethod
+    def terms(text: str) -> set[str]:
+
+        """
+        Splits a message into its index terms.
+        Args:
+            text (str): The message.
+        Returns:
+            set[str]: The distinct casefolded words.
+        """
+
+        return {t[:MessageIndex.TERM_LENGTH] for t in MessageIndex.TERM.findall(text.casefold())}
+
+    def update(self, fp: str) -> int:
+
+        """
+        Brings the index of a repository up to date with its HEAD.
+        Args:
+            fp (str): The path to the git repository.
+        Returns:
+            int: The number of commits added to or dropped from the index.
+        Raises:
+            RuntimeError: If the repository has no commit.
+        """
+
+        key: str = MessageIndex.key(fp)
+        head: str | None = self.service.resolve(fp, 'HEAD')
+        if head is None: raise RuntimeError(f"'{fp}' has no commit to index.")
+
+        row: tuple[int, str | None] | None = self._db.execute("SELECT id, head FROM repos WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[1] == head: return 0
+
+        with self.service.span("MessageIndex.update", repo=fp) as span, self._db:
+
+            if row is None: repo: int = self._db.execute("INSERT INTO repos (path) VALUES (?)", (key,)).lastrowid
+            else: repo = row[0]
+            indexed: str | None = row[1] if row is not None else None
+
+            # HEAD only moved forward: the new commits are exactly indexed..HEAD
+            forward: bool = indexed is not None and self.service.runGitCommand(
+                ['git', '-C', fp, 'merge-base', '--is-ancestor', indexed, head]
+            ).returncode == 0
+
+            if indexed is None:
+                added: list[Commit] = list(self.service.iterCommits(fp))
+                dropped: list[int] = list()
+            elif forward:
+                added = list(self.service.iterCommits(fp, revisions=[f'{indexed}..{head}']))
+                dropped = list()
+            else:
+                # A rewrite or a branch switch: diff the reachable commits against the indexed ones
+                reachable: set[str] = set(self._revList(fp))
+                known: dict[str, int] = dict(self._db.execute("SELECT oid, id FROM commits WHERE repo = ?", (repo,)))
+                dropped = [i for oid, i in known.items() if oid not in reachable]
+                added = self._read(fp, [oid for oid in reachable if oid not in known])
+
+            self._drop(dropped)
+            self._add(repo, added)
+            self._db.execute("UPDATE repos SET head = ? WHERE id = ?", (head, repo))
+            span.update({"added": len(added), "dropped": len(dropped)})
+
+        if self.service.hasLogger(): self.service.logger.logInfo(f"Indexed {fp}: {len(added)} commits added, {len(dropped)} dropped.")
+        return len(added) + len(dropped)
+
+    def refresh(self, repos: Iterable[str]) -> dict[str, int]:
+
+        """
+        Updates several repositories, skipping the ones that cannot be read.
+        Args:
+            repos (Iterable[str]): The paths of the git repositories.
+        Returns:
+            dict[str, int]: The number of commits added or dropped, per repository updated.
+        """
+
+        changes: dict[str, int] = dict()
+        for fp in repos:
+            try: changes[fp] = self.update(fp)
+            except (RuntimeError, OSError) as e:
+                if self.service.hasLogger(): self.service.logger.logError(f"Could not index {fp}: {e}")
+        return changes
+
+    def _revList(self, fp: str) -> list[str]:
+        result: subprocess.CompletedProcess = self.service.runGitCommand(['git', '-C', fp, 'rev-list', 'HEAD'])
+        if result.returncode != 0: raise RuntimeError(f"rev-list failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+        return result.stdout.decode('ascii').split()
+
+    def _read(self, fp: str, oids: list[str]) -> list[Commit]:
+
+        if not oids: return list()
+        # --no-walk lists exactly the commits given on stdin, however scattered they are
+        command: list[str] = self.service.buildLogCommand(fp) + ['--no-walk', '--stdin']
+        result: subprocess.CompletedProcess = self.service.runGitCommand(command, input='\n'.join(oids).encode('ascii') + b'\n')
+        if result.returncode != 0: raise RuntimeError(f"git log failed: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+        return RecordParser.parse(result.stdout)
+
+    def _drop(self, commits: list[int]) -> None:
+        for i in range(0, len(commits), 512):
+            batch: list[int] = commits[i:i + 512]
+            marks: str = ','.join('?' * len(batch))
+            self._db.execute(f"DELETE FROM postings WHERE commit_ IN ({marks})", batch)
+            self._db.execute(f"DELETE FROM commits WHERE id IN ({marks})", batch)
+
+    def _add(self, repo: int, commits: list[Commit]) -> None:
+
+        if not commits: return
+        vocabulary: dict[str, int] = dict(self._db.execute("SELECT term, id FROM terms"))
+        nextTerm: int = max(vocabulary.values(), default=0) + 1
+        nextCommit: int = (self._db.execute("SELECT MAX(id) FROM commits").fetchone()[0] or 0) + 1
+
+        rows: list[tuple] = list()
+        postings: list[tuple[int, int]] = list()
+        newTerms: list[tuple[int, str]] = list()
+        # Oldest first, so that the ids grow with recency across incremental updates too
+        for i, commit in enumerate(reversed(commits), nextCommit):
+            rows.append((i, repo, commit.oid, commit.hashstr, commit.name, commit.body))
+            for term in MessageIndex.terms(commit.message):
+                if term not in vocabulary:
+                    vocabulary[term] = nextTerm
+                    newTerms.append((nextTerm, term))
+                    nextTerm += 1
+                postings.append((vocabulary[term], i))
+
+        self._db.executemany("INSERT INTO terms (id, term) VALUES (?, ?)", newTerms)
+        self._db.executemany("INSERT INTO commits (id, repo, oid, short, subject, body) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._db.executemany("INSERT INTO postings (term, commit_) VALUES (?, ?)", postings)
+
+    def search(self, query: str, repos: Iterable[str] | None = None, limit: int | None = None) -> dict[str, list[Commit]]:
+
+        """
+        Finds the indexed commits whose message contains a text, matched case-insensitively
+        from the start of a word: "leak" finds "leaked", not "unleak".
+        Args:
+            query (str): The text to look for.
+            repos (Iterable[str] | None): Only search these repositories, every indexed one when None.
+            limit (int | None): The maximum number of commits returned.
+        Returns:
+            dict[str, list[Commit]]: The matching commits per repository path, newest indexed first.
+                They carry their OID, short hash and message, ready to be passed to renameCommits.
+        Raises:
+            ValueError: If the query holds no word to look up.
+        """
+
+        words: list[str] = [t[:MessageIndex.TERM_LENGTH] for t in MessageIndex.TERM.findall(query.casefold())]
+        if not words: raise ValueError(f"Nothing to look up in {query!r}.")
+
+        start: float = time.perf_counter()
+        # Each word is a prefix range scan over the term index, the commits must hold all of them
+        lookups: list[str] = ["SELECT p.commit_ FROM terms t JOIN postings p ON p.term = t.id WHERE t.term >= ? AND t.term < ?"] * len(set(words))
+        arguments: list[str] = [bound for word in sorted(set(words)) for bound in (word, word + '\U0010ffff')]
+
+        sql: str = (
+            f"SELECT r.path, c.oid, c.short, c.subject, c.body FROM commits c JOIN repos r ON r.id = c.repo "
+            f"WHERE c.id IN ({' INTERSECT '.join(lookups)})"
+        )
+        if repos is not None:
+            keys: list[str] = [MessageIndex.key(fp) for fp in repos]
+            sql += f" AND r.path IN ({','.join('?' * len(keys))})"
+            arguments += keys
+        sql += " ORDER BY c.id DESC"
+
+        # A lone word is answered by the index alone; a phrase is checked against the message itself
+        needle: str = query.casefold().strip()
+        phrase: re.Pattern | None = re.compile(r'(?<!\w)' + re.escape(needle)) if needle != words[0] else None
+        hits: dict[str, list[Commit]] = dict()
+        found: int = 0
+        for path, oid, short, subject, body in self._db.execute(sql, arguments):
+            if phrase is not None:
+                text: str = f"{subject}\n\n{body}".casefold()
+                if needle not in text or not phrase.search(text): continue
+            hits.setdefault(path, []).append(Commit(subject, short, oid, body))
+            found += 1
+            if limit is not None and found >= limit: break
+
+        if self.service.hasMetrics(): self.service.metrics.record(['index', 'search'], time.perf_counter() - start, 0)
+        return hits
+
+    def remove(self, fp: str) -> None:
+
+        """
+        Drops a repository from the index.
+        Args:
+            fp (str): The path to the git repository.
+        """
+
+        with self._db:
+            row: tuple[int] | None = self._db.execute("SELECT id FROM repos WHERE path = ?", (MessageIndex.key(fp),)).fetchone()
+            if row is None: return
+            self._drop([i for (i,) in self._db.execute("SELECT id FROM commits WHERE repo = ?", row)])
+            self._db.execute("DELETE FROM repos WHERE id = ?", row)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            name: self._db.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            for name in ("repos", "commits", "terms", "postings")
+        }
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "MessageIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"MessageIndex(path={self.path})"
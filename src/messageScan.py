@@ -0,0 +1,459 @@
+
+from .commit import Commit
+from .matcher import MessageMatcher
+
+import array
+import bisect
+import concurrent.futures
+import functools
+import json
+import math
+import os
+import re
+import time
+from typing import Iterable
+
+
+class Detector:
+
+    """
+    A named pattern looked for in commit messages. Patterns are matched against
+    the UTF-8 bytes of the messages, so character classes such as \\w only cover
+    ASCII. Patterns starting with a literal (e.g. "ghp_") are much faster to scan
+    for, the regex engine skips ahead to it. When an entropy threshold is set,
+    matches whose Shannon entropy (bits per byte) is lower are ignored, which
+    keeps random-looking tokens and drops ordinary identifiers.
+    """
+
+    def __init__(self, name: str, pattern: str, entropy: float | None = None) -> None:
+
+        assert name and name.isidentifier(), "The detector name must be an identifier."
+        assert pattern, "The detector pattern cannot be empty."
+
+        self._name: str = name
+        self._pattern: str = pattern
+        self._entropy: float | None = entropy
+
+    @classmethod
+    def defaults(cls) -> list["Detector"]:
+
+        """
+        Returns the built-in detectors, the most specific ones first.
+        Returns:
+            list[Detector]: Common credentials, private keys, emails and high-entropy tokens.
+        """
+
+        return [
+            cls("private_key", r"-----BEGIN [A-Z ]*PRIVATE KEY-----"),
+            cls("aws_access_key", r"(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+            cls("github_token", r"gh[pousr]_[A-Za-z0-9]{36,}"),
+            cls("slack_token", r"xox[abprs]-[A-Za-z0-9-]{10,}"),
+            cls("jwt", r"eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}"),
+            # Only the user:password@ part of the URL is flagged, the scheme and host stay readable
+            cls("url_credentials", r"(?<=://)[^/\s:@]+:[^/\s@]+@"),
+            cls("email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b"),
+            # Hexadecimal strings (e.g. commit hashes) stay below 4 bits per byte
+            cls("high_entropy", r"[A-Za-z0-9+/_-]{32,}={0,2}", entropy=4.2),
+        ]
+
+    @classmethod
+    def hosts(cls, suffixes: list[str], name: str = "internal_host") -> "Detector":
+
+        """
+        Creates a detector for hostnames under some domains, e.g. ['corp.example.com', 'internal'].
+        Args:
+            suffixes (list[str]): The domain suffixes.
+            name (str): The detector name.
+        Returns:
+            Detector: The detector.
+        """
+
+        assert suffixes, "At least one domain suffix is required."
+        domains: str = MessageMatcher.trieRegex([s.strip('.').lower() for s in suffixes])
+        return cls(name, rf"\b(?:[A-Za-z0-9-]+\.)+{domains}\b")
+
+    @classmethod
+    def fromSpec(cls, spec: str) -> "Detector":
+
+        """
+        Creates a detector from a "name=regex" string.
+        Args:
+            spec (str): The specification.
+        Returns:
+            Detector: The detector.
+        Raises:
+            ValueError: If the specification is malformed or the regex invalid.
+        """
+
+        name, sep, pattern = spec.partition('=')
+        if not sep or not name.isidentifier() or not pattern:
+            raise ValueError(f"Invalid detector '{spec}', expected NAME=REGEX.")
+        try: re.compile(pattern.encode('utf-8'))
+        except re.error as e: raise ValueError(f"Invalid detector regex '{pattern}': {e}")
+        return cls(name, pattern)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def pattern(self) -> str:
+        return self._pattern
+
+    @property
+    def entropy(self) -> float | None:
+        return self._entropy
+
+    def spec(self) -> tuple[str, str, float | None]:
+        # Plain tuple sent to the scan workers
+        return (self.name, self.pattern, self.entropy)
+
+    def __repr__(self) -> str:
+        return f"Detector(name={self.name}, pattern={self.pattern!r}, entropy={self.entropy})"
+
+
+
+def shannonEntropy(data: bytes) -> float:
+
+    """
+    Computes the Shannon entropy of a byte string.
+    Args:
+        data (bytes): The bytes.
+    Returns:
+        float: The entropy in bits per byte, 0 for empty data.
+    """
+
+    if not data: return 0.0
+    size: int = len(data)
+    return -sum(n / size * math.log2(n / size) for n in (data.count(b) for b in set(data)))
+
+
+@functools.lru_cache(maxsize=8)
+def _compile(specs: tuple[tuple[str, str, float | None], ...], ignoreCase: bool) -> tuple[re.Pattern, ...]:
+    # Compiled once per process. Detectors are not folded into one alternation:
+    # that would stop the engine from skipping ahead to their literal prefixes
+    return tuple(re.compile(pattern.encode('utf-8'), re.IGNORECASE if ignoreCase else 0) for _, pattern, _ in specs)
+
+
+def _scanChunk(specs: tuple[tuple[str, str, float | None], ...], ignoreCase: bool,
+               chunk: bytes, base: int) -> list[tuple[int, int, int]]:
+
+    """
+    Runs the detectors over a slice of the message buffer. Module-level so that
+    process pool workers can run it.
+    Args:
+        specs (tuple): The detector specifications, see Detector.spec.
+        ignoreCase (bool): Whether the patterns are case-insensitive.
+        chunk (bytes): The slice, made of whole records.
+        base (int): The offset of the slice in the buffer.
+    Returns:
+        list[tuple[int, int, int]]: The (start, end, detector index) of every match, buffer offsets.
+    """
+
+    hits: list[tuple[int, int, int]] = list()
+
+    for index, pattern in enumerate(_compile(specs, ignoreCase)):
+        threshold: float | None = specs[index][2]
+        for match in pattern.finditer(chunk):
+            if match.end() == match.start(): continue
+            if threshold is not None and shannonEntropy(match.group()) < threshold: continue
+            hits.append((base + match.start(), base + match.end(), index))
+
+    return hits
+
+
+
+class ScanHit:
+
+    __slots__: tuple[str, ...] = ('_commit', '_detector', '_start', '_end', '_text')
+
+    def __init__(self, commit: Commit, detector: str, start: int, end: int, text: str) -> None:
+        self._commit: Commit = commit
+        self._detector: str = detector
+        self._start: int = start
+        self._end: int = end
+        self._text: str = text
+
+    @property
+    def commit(self) -> Commit:
+        return self._commit
+
+    @property
+    def detector(self) -> str:
+        return self._detector
+
+    @property
+    def start(self) -> int:
+        # Character offset in commit.message
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def field(self) -> str:
+        return "subject" if self.start < len(self.commit.name) else "body"
+
+    def toDict(self) -> dict:
+        return {
+            "oid": self.commit.oid, "short": self.commit.hashstr, "detector": self.detector,
+            "field": self.field, "start": self.start, "end": self.end, "text": self.text,
+        }
+
+    def __repr__(self) -> str:
+        return f"ScanHit({self.commit.hashstr} {self.detector} [{self.start}:{self.end}] {self.text!r})"
+
+
+
+class ScanReport:
+
+    def __init__(self, hits: list[ScanHit], scanned: int, size: int, duration: float, workers: int) -> None:
+        self._hits: list[ScanHit] = hits
+        self._scanned: int = scanned
+        self._size: int = size
+        self._duration: float = duration
+        self._workers: int = workers
+
+    @property
+    def hits(self) -> list[ScanHit]:
+        return self._hits
+
+    @property
+    def scanned(self) -> int:
+        return self._scanned
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def empty(self) -> bool:
+        return not self._hits
+
+    @property
+    def commits(self) -> list[Commit]:
+        # The flagged commits, newest first like the history they come from
+        return list({hit.commit.oid: hit.commit for hit in self.hits}.values())
+
+    @property
+    def bodies(self) -> bool:
+        # Whether some hits sit in message bodies, which only rewriteMessages can clean
+        return any(hit.field == "body" for hit in self.hits)
+
+    def byCommit(self) -> dict[str, list[ScanHit]]:
+        grouped: dict[str, list[ScanHit]] = dict()
+        for hit in self.hits: grouped.setdefault(hit.commit.oid, []).append(hit)
+        return grouped
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = dict()
+        for hit in self.hits: counts[hit.detector] = counts.get(hit.detector, 0) + 1
+        return counts
+
+    def redact(self, replacement: str = "[redacted]") -> list[Commit]:
+
+        """
+        Builds the cleaned commits, every hit being replaced.
+        Args:
+            replacement (str): The text replacing each hit.
+        Returns:
+            list[Commit]: The flagged commits carrying their new message, ready for
+                renameCommits (subjects) or rewriteMessages (full messages, see bodies).
+        """
+
+        ret: list[Commit] = list()
+        for hits in self.byCommit().values():
+
+            commit: Commit = hits[0].commit
+            message: str = commit.message
+
+            # Overlapping hits (e.g. URL credentials and the email-like text after them) get one replacement
+            spans: list[list[int]] = list()
+            for hit in sorted(hits, key=lambda h: (h.start, h.end)):
+                if spans and hit.start < spans[-1][1]: spans[-1][1] = max(spans[-1][1], hit.end)
+                else: spans.append([hit.start, hit.end])
+
+            # Right to left so that the offsets of the remaining spans stay valid
+            for start, end in reversed(spans):
+                message = message[:start] + replacement + message[end:]
+
+            name, _, body = message.partition('\n\n') if commit.body else (message, '', '')
+            ret.append(commit.withMessage(name, body))
+
+        return ret
+
+    def toDict(self) -> dict:
+        return {
+            "scanned": self.scanned, "bytes": self.size, "duration": self.duration, "workers": self.workers,
+            "commits": len(self.commits), "counts": self.counts(), "hits": [h.toDict() for h in self.hits],
+        }
+
+    def toJson(self, indent: int | None = 2) -> str:
+        return json.dumps(self.toDict(), indent=indent)
+
+    def summary(self) -> list[str]:
+
+        lines: list[str] = [
+            f"Scanned {self.scanned} commits ({self.size / 1048576:.1f} MiB) in {self.duration:.2f}s with {self.workers} worker(s).",
+        ]
+        if self.empty: return lines + ["Nothing found."]
+
+        lines.append(f"{len(self.hits)} matches in {len(self.commits)} commits:")
+        lines += [f"  {name}: {count}" for name, count in sorted(self.counts().items(), key=lambda kv: -kv[1])]
+        return lines
+
+    def __repr__(self) -> str:
+        return f"ScanReport(scanned={self.scanned}, hits={len(self.hits)}, commits={len(self.commits)})"
+
+
+
+class MessageScanner:
+
+    """
+    Bulk detector of secrets and patterns in commit messages. The messages are
+    packed into one contiguous buffer (NUL-separated records with an offset
+    table) and every precompiled detector runs over the whole buffer at once,
+    instead of once per message. Large buffers are split on record boundaries
+    and scanned by a process pool. A match lying inside another one is dropped;
+    on identical spans the detector listed first names the match.
+    """
+
+    # Buffers smaller than this are scanned in-process, a pool would cost more than it saves
+    PARALLEL_BYTES: int = 4 << 20
+    # Every worker gets a few chunks so that a slow chunk does not leave the others idle
+    CHUNKS_PER_WORKER: int = 4
+    SEPARATOR: bytes = b'\n\0'
+
+    def __init__(self, detectors: list[Detector] | None = None, workers: int | None = None,
+                 ignoreCase: bool = False) -> None:
+
+        detectors = Detector.defaults() if detectors is None else detectors
+        assert detectors, "At least one detector is required."
+        assert all(isinstance(d, Detector) for d in detectors), "All detectors must be Detector instances."
+
+        self._detectors: list[Detector] = detectors
+        self._workers: int = workers if workers else (os.cpu_count() or 1)
+        self._ignoreCase: bool = ignoreCase
+        self._specs: tuple[tuple[str, str, float | None], ...] = tuple(d.spec() for d in detectors)
+
+        # Fail on a bad pattern now rather than inside a worker
+        _compile(self._specs, ignoreCase)
+
+    @property
+    def detectors(self) -> list[Detector]:
+        return self._detectors
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def pack(self, commits: Iterable[Commit]) -> tuple[list[Commit], bytearray, array.array]:
+
+        """
+        Packs the commit messages into one buffer.
+        Args:
+            commits (Iterable[Commit]): The commits.
+        Returns:
+            tuple[list[Commit], bytearray, array.array]: The commits, the buffer of their
+                separated messages, and the buffer offset of every message.
+        """
+
+        packed: list[Commit] = list()
+        buffer: bytearray = bytearray()
+        starts: array.array = array.array('q')
+
+        for commit in commits:
+            packed.append(commit)
+            starts.append(len(buffer))
+            buffer += commit.message.encode('utf-8')
+            buffer += MessageScanner.SEPARATOR
+
+        return packed, buffer, starts
+
+    def chunks(self, buffer: bytearray, count: int) -> list[tuple[int, int]]:
+
+        """
+        Splits a buffer into slices ending on record boundaries.
+        Args:
+            buffer (bytearray): The packed messages.
+            count (int): The wanted number of slices.
+        Returns:
+            list[tuple[int, int]]: The (start, end) of every slice.
+        """
+
+        bounds: list[tuple[int, int]] = list()
+        start: int = 0
+        step: int = max(1, len(buffer) // count)
+
+        while start < len(buffer):
+            end: int = buffer.find(MessageScanner.SEPARATOR, max(start, min(start + step, len(buffer)) - len(MessageScanner.SEPARATOR)))
+            end = len(buffer) if end < 0 else end + len(MessageScanner.SEPARATOR)
+            bounds.append((start, end))
+            start = end
+
+        return bounds
+
+    def scan(self, commits: Iterable[Commit]) -> ScanReport:
+
+        """
+        Runs every detector over the commit messages.
+        Args:
+            commits (Iterable[Commit]): The commits to scan, e.g. GitService.iterCommits.
+        Returns:
+            ScanReport: The matches, with their offsets in each commit message.
+        """
+
+        begin: float = time.perf_counter()
+        packed, buffer, starts = self.pack(commits)
+
+        workers: int = min(self.workers, max(1, len(buffer) // (MessageScanner.PARALLEL_BYTES // 4)))
+        if len(buffer) < MessageScanner.PARALLEL_BYTES or workers < 2:
+            workers = 1
+            matches: list[tuple[int, int, int]] = _scanChunk(self._specs, self._ignoreCase, bytes(buffer), 0)
+
+        else:
+            view: memoryview = memoryview(buffer)
+            matches = list()
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                futures: list[concurrent.futures.Future] = [
+                    pool.submit(_scanChunk, self._specs, self._ignoreCase, bytes(view[start:end]), start)
+                    for start, end in self.chunks(buffer, workers * MessageScanner.CHUNKS_PER_WORKER)
+                ]
+                for future in futures: matches += future.result()
+            view.release()
+
+        hits: list[ScanHit] = list()
+        covered: int = -1
+        for start, end, index in sorted(matches, key=lambda m: (m[0], -m[1], m[2])):
+
+            # The offset table maps a buffer position back to its commit
+            i: int = bisect.bisect_right(starts, start) - 1
+            recordStart: int = starts[i]
+            recordEnd: int = (starts[i + 1] if i + 1 < len(starts) else len(buffer)) - len(MessageScanner.SEPARATOR)
+            if start >= recordEnd: continue
+            end = min(end, recordEnd)
+
+            if end <= covered: continue
+            covered = end
+
+            offset: int = len(buffer[recordStart:start].decode('utf-8', errors='replace'))
+            text: str = buffer[start:end].decode('utf-8', errors='replace')
+            hits.append(ScanHit(packed[i], self._specs[index][0], offset, offset + len(text), text))
+
+        return ScanReport(hits, len(packed), len(buffer), time.perf_counter() - begin, workers)
+
+    def __repr__(self) -> str:
+        return f"MessageScanner(detectors={len(self.detectors)}, workers={self.workers})"
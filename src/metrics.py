@@ -0,0 +1,269 @@
+
+import bisect
+import contextlib
+import json
+import threading
+import time
+from typing import Iterator
+
+
+class CommandStats:
+
+    # Upper bounds of the latency histogram buckets, in milliseconds (the last one is open)
+    BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, name: str) -> None:
+        self._name: str = name
+        self._calls: int = 0
+        self._spawns: int = 0
+        self._failures: int = 0
+        self._seconds: float = 0.0
+        self._maxSeconds: float = 0.0
+        self._bytesRead: int = 0
+        self._histogram: list[int] = [0] * (len(CommandStats.BUCKETS) + 1)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def spawns(self) -> int:
+        return self._spawns
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    @property
+    def seconds(self) -> float:
+        return self._seconds
+
+    @property
+    def bytesRead(self) -> int:
+        return self._bytesRead
+
+    @property
+    def histogram(self) -> list[int]:
+        return self._histogram
+
+    def add(self, duration: float, returncode: int, bytesRead: int) -> None:
+        self._calls += 1
+        self._spawns += 1
+        self._failures += returncode != 0
+        self._seconds += duration
+        self._maxSeconds = max(self._maxSeconds, duration)
+        self._bytesRead += bytesRead
+        self._histogram[bisect.bisect_left(CommandStats.BUCKETS, duration * 1000)] += 1
+
+    def spawn(self) -> None:
+        self._spawns += 1
+
+    def percentile(self, p: float) -> float | None:
+
+        """
+        Estimates a latency percentile from the histogram.
+        Args:
+            p (float): The percentile, between 0 and 100.
+        Returns:
+            float | None: The upper bound of the bucket holding it, in milliseconds
+            (the maximum for the open bucket), None without any timed call.
+        """
+
+        if not self._calls: return None
+        rank: float = self._calls * p / 100
+        seen: int = 0
+        for i, count in enumerate(self._histogram):
+            seen += count
+            if seen >= rank and count:
+                return CommandStats.BUCKETS[i] if i < len(CommandStats.BUCKETS) else self._maxSeconds * 1000
+        return self._maxSeconds * 1000
+
+    def toDict(self) -> dict:
+        return {
+            "calls": self._calls,
+            "spawns": self._spawns,
+            "failures": self._failures,
+            "seconds": round(self._seconds, 6),
+            "meanMs": round(self._seconds * 1000 / self._calls, 3) if self._calls else None,
+            "maxMs": round(self._maxSeconds * 1000, 3),
+            "p50Ms": self.percentile(50),
+            "p95Ms": self.percentile(95),
+            "bytesRead": self._bytesRead,
+            "histogram": {f"<={b}ms": n for b, n in zip(CommandStats.BUCKETS, self._histogram)} | {"inf": self._histogram[-1]},
+        }
+
+    def __repr__(self) -> str:
+        return f"CommandStats(name={self.name}, calls={self.calls}, seconds={self.seconds:.3f})"
+
+
+
+class Metrics:
+
+    """
+    Collects what the git layer costs: per-subcommand call and spawn counts,
+    latency histograms, bytes read from stdout, and timed spans around the
+    higher-level operations. Recording is cheap and thread-safe; a GitService
+    without a Metrics instance skips it entirely.
+    """
+
+    # Global options that come before the subcommand and take a value
+    OPTIONS_WITH_VALUE: set[str] = {'-C', '-c', '--git-dir', '--work-tree', '--namespace'}
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._started: float = time.time()
+        self._commands: dict[str, CommandStats] = dict()
+        self._spans: list[dict] = list()
+
+    @staticmethod
+    def subcommand(command: list[str]) -> str:
+
+        """
+        Extracts the git subcommand of a command line.
+        Args:
+            command (list[str]): The command, e.g. ['git', '-C', 'repo', 'log', ...].
+        Returns:
+            str: The subcommand (e.g. 'log'), or the program name for non-git commands.
+        """
+
+        if not command: return ""
+        if command[0] != 'git': return command[0]
+        i: int = 1
+        while i < len(command) and command[i].startswith('-'):
+            i += 2 if command[i] in Metrics.OPTIONS_WITH_VALUE else 1
+        return command[i] if i < len(command) else 'git'
+
+    def _stats(self, command: list[str]) -> CommandStats:
+        name: str = Metrics.subcommand(command)
+        stats: CommandStats | None = self._commands.get(name)
+        if stats is None:
+            stats = self._commands[name] = CommandStats(name)
+        return stats
+
+    def record(self, command: list[str], duration: float, returncode: int, bytesRead: int = 0) -> None:
+
+        """
+        Records one finished git process.
+        Args:
+            command (list[str]): The command that ran.
+            duration (float): Its wall time, in seconds.
+            returncode (int): Its exit code.
+            bytesRead (int): The size of its stdout.
+        """
+
+        with self._lock:
+            self._stats(command).add(duration, returncode, bytesRead)
+
+    def spawned(self, command: list[str]) -> None:
+        # Long-lived processes (cat-file sessions) count as spawns without a latency
+        with self._lock:
+            self._stats(command).spawn()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict]:
+
+        """
+        Times a higher-level operation. Spans opened inside it on the same thread
+        are recorded as its children.
+        Args:
+            name (str): The operation name, e.g. 'getCommits'.
+            **attributes: Extra values stored with the span.
+        Yields:
+            dict: The span record, attributes may be added to it while it runs.
+        """
+
+        stack: list[dict] = self._local.__dict__.setdefault('stack', [])
+        record: dict = {"name": name, "parent": stack[-1]["name"] if stack else None, "start": time.time(), **attributes}
+        stack.append(record)
+        start: float = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            stack.pop()
+            with self._lock:
+                self._spans.append(record)
+
+    @property
+    def commands(self) -> dict[str, CommandStats]:
+        return self._commands
+
+    @property
+    def spans(self) -> list[dict]:
+        return self._spans
+
+    def reset(self) -> None:
+        with self._lock:
+            self._started = time.time()
+            self._commands.clear()
+            self._spans.clear()
+
+    def snapshot(self) -> dict:
+
+        """
+        Builds an exportable copy of everything recorded so far.
+        Returns:
+            dict: The JSON-serializable metrics.
+        """
+
+        with self._lock:
+            commands: dict = {name: stats.toDict() for name, stats in sorted(self._commands.items())}
+            spans: list[dict] = [dict(s) for s in self._spans]
+
+        return {
+            "started": self._started,
+            "elapsed": round(time.time() - self._started, 6),
+            "spawns": sum(c["spawns"] for c in commands.values()),
+            "seconds": round(sum(c["seconds"] for c in commands.values()), 6),
+            "bytesRead": sum(c["bytesRead"] for c in commands.values()),
+            "commands": commands,
+            "spans": spans,
+        }
+
+    def toJson(self, indent: int | None = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.toJson())
+
+    def summary(self) -> list[str]:
+
+        """
+        Builds a short report of where the time went, slowest subcommands first.
+        Returns:
+            list[str]: One line per subcommand and per span name.
+        """
+
+        snapshot: dict = self.snapshot()
+        lines: list[str] = [
+            f"{snapshot['spawns']} git processes, {snapshot['seconds']:.3f}s in git, "
+            f"{snapshot['bytesRead'] / 1024:.1f} KiB read, {snapshot['elapsed']:.3f}s elapsed"
+        ]
+
+        ordered: list[tuple[str, dict]] = sorted(snapshot["commands"].items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+        for name, c in ordered:
+            timing: str = f"mean {c['meanMs']:.1f} ms, p95 <= {c['p95Ms']:.0f} ms, max {c['maxMs']:.1f} ms" if c["calls"] else "no timed calls"
+            lines.append(
+                f"  {name:<16} {c['calls']:>6} calls {c['spawns']:>6} spawns {c['seconds']:>9.3f}s  "
+                f"{timing}, {c['bytesRead'] / 1024:.1f} KiB" + (f", {c['failures']} failed" if c["failures"] else "")
+            )
+
+        totals: dict[str, list[float]] = dict()
+        for span in snapshot["spans"]:
+            totals.setdefault(span["name"], []).append(span["seconds"])
+        for name, durations in sorted(totals.items(), key=lambda kv: sum(kv[1]), reverse=True):
+            lines.append(f"  span {name:<24} {len(durations):>4}x {sum(durations):>9.3f}s (max {max(durations):.3f}s)")
+
+        return lines
+
+    def __repr__(self) -> str:
+        return f"Metrics(commands={len(self._commands)}, spans={len(self._spans)})"
@@ -0,0 +1,135 @@
+
+from .discovery import RepoScanner
+from .gitService import GitService, Commit
+from .logger import Logger
+from .rewriteJournal import RewriteJournal
+
+import concurrent.futures
+import os
+import time
+
+
+class RepoResult:
+
+    def __init__(self, path: str, modified: int = 0, duration: float = 0.0, error: str | None = None) -> None:
+        self._path: str = path
+        self._modified: int = modified
+        self._duration: float = duration
+        self._error: str | None = error
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def modified(self) -> int:
+        return self._modified
+
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def ok(self) -> bool:
+        return self._error is None
+
+    def toDict(self) -> dict:
+        return {"path": self.path, "modified": self.modified, "duration": self.duration, "error": self.error}
+
+    def __repr__(self) -> str:
+        return f"RepoResult(path={self.path}, modified={self.modified}, duration={self.duration:.3f}s, error={self.error})"
+
+    def __str__(self) -> str:
+        status: str = f"{self.modified} commits modified" if self.ok else f"failed: {self.error}"
+        return f"{self.path}: {status} ({self.duration:.2f}s)"
+
+
+
+def cleanRepository(fp: str, targets: list[str], replacement: str, log: bool = False) -> RepoResult:
+
+    """
+    Runs the find/replace rewrite on a single repository. Every failure is
+    captured in the result so that it can safely run inside a worker process.
+    Args:
+        fp (str): The path to the git repository.
+        targets (list[str]): The words to replace.
+        replacement (str): The replacement string for the targets.
+        log (bool): Whether the worker's GitService should log its commands.
+    Returns:
+        RepoResult: The outcome of the rewrite for this repository.
+    """
+
+    start: float = time.perf_counter()
+
+    try:
+        with GitService(Logger() if log else None) as git:
+            if not git.isFolderAGitRepository(fp):
+                return RepoResult(fp, duration=time.perf_counter() - start, error="not a git repository")
+
+            ret: list[Commit] = git.findReplacements(fp, targets, replacement)
+            try:
+                if ret: git.renameCommits(fp, [c.oid for c in ret], [c.name for c in ret])
+            except RuntimeError:
+                # Unattended runs never leave a repository mid-rewrite
+                if RewriteJournal.load(git, fp) is not None: git.rollbackRewrite(fp)
+                raise
+            return RepoResult(fp, modified=len(ret), duration=time.perf_counter() - start)
+
+    except Exception as e:
+        return RepoResult(fp, duration=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+
+
+class MultiRepoCleaner:
+
+    def __init__(self, workers: int | None = None, log: bool = False) -> None:
+        self._workers: int = workers if workers else min(8, os.cpu_count() or 1)
+        self._log: bool = log
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @staticmethod
+    def discover(root: str, maxDepth: int = 3) -> list[str]:
+
+        """
+        Finds the git repositories below a root directory, without running git (see RepoScanner).
+        Args:
+            root (str): The directory to search in.
+            maxDepth (int): How many directory levels to descend at most.
+        Returns:
+            list[str]: The sorted paths of the repositories found.
+        """
+
+        return [r.path for r in RepoScanner(maxDepth=maxDepth, validate=False).scan(root)]
+
+    def run(self, repos: list[str], targets: list[str], replacement: str) -> list[RepoResult]:
+
+        """
+        Cleans several repositories concurrently in a bounded process pool.
+        A failing repository never stops the others.
+        Args:
+            repos (list[str]): The paths of the repositories to clean.
+            targets (list[str]): The words to replace.
+            replacement (str): The replacement string for the targets.
+        Returns:
+            list[RepoResult]: One result per repository, in the input order.
+        """
+
+        results: list[RepoResult | None] = [None] * len(repos)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures: dict[concurrent.futures.Future, int] = {
+                pool.submit(cleanRepository, fp, targets, replacement, self._log): i for i, fp in enumerate(repos)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                i: int = futures[future]
+                try: results[i] = future.result()
+                except Exception as e: results[i] = RepoResult(repos[i], error=f"{type(e).__name__}: {e}")
+
+        return results
@@ -0,0 +1,215 @@
+
+from .commit import Commit
+
+import sys
+from typing import Iterable, Iterator
+
+
+class LazyCommit(Commit):
+
+    """
+    Commit backed by its raw `git log` record. The record is not copied: the
+    commit keeps a reference to the buffer it was read into (usually a whole
+    pipe chunk shared by many commits) and the bounds of its record, and each
+    field is only located and decoded the first time it is read.
+    """
+
+    __slots__: tuple[str, ...] = ('_buffer', '_start', '_end')
+
+    # Index of each field in the record, see Commit.RECORD_FORMAT
+    SHORT, OID, AUTHOR_NAME, AUTHOR_EMAIL, AUTHOR_DATE, COMMITTER_NAME, COMMITTER_EMAIL, COMMITTER_DATE, SUBJECT, BODY = range(10)
+
+    def __init__(self, buffer: bytes, start: int = 0, end: int | None = None) -> None:
+        # Commit.__init__ is skipped on purpose, its slots are filled as the fields get read
+        self._buffer: bytes = buffer
+        self._start: int = start
+        self._end: int = len(buffer) if end is None else end
+        self._name = self._hashstr = self._oid = self._body = None
+        self._authorName = self._authorEmail = self._authorDate = None
+        self._committerName = self._committerEmail = self._committerDate = None
+
+    def field(self, index: int) -> str:
+
+        """
+        Decodes a field of the record.
+        Args:
+            index (int): The field index, e.g. LazyCommit.SUBJECT.
+        Returns:
+            str: The decoded field.
+        Raises:
+            ValueError: If the record has fewer fields than Commit.RECORD_FIELDS.
+        """
+
+        # One C-level split of the record beats locating the separators from Python, the slice is
+        # short-lived; the body is last and may contain the separator itself
+        fields: list[bytes] = self._buffer[self._start:self._end].split(b'\x1f', min(index + 1, LazyCommit.BODY))
+        if len(fields) <= index: raise ValueError(f"Invalid commit record: {self._buffer[self._start:self._start + 80]!r}")
+        return fields[index].decode('utf-8', errors='replace')
+
+    @property
+    def name(self) -> str:
+        if self._name is None: self._name = self.field(LazyCommit.SUBJECT)
+        return self._name
+
+    @property
+    def hashstr(self) -> str:
+        if self._hashstr is None: self._hashstr = self.field(LazyCommit.SHORT)
+        return self._hashstr
+
+    @property
+    def oid(self) -> str:
+        if self._oid is None: self._oid = self.field(LazyCommit.OID) or self.hashstr
+        return self._oid
+
+    @property
+    def body(self) -> str:
+        if self._body is None: self._body = self.field(LazyCommit.BODY).rstrip('\n')
+        return self._body
+
+    @property
+    def authorName(self) -> str:
+        if self._authorName is None: self._authorName = sys.intern(self.field(LazyCommit.AUTHOR_NAME))
+        return self._authorName
+
+    @property
+    def authorEmail(self) -> str:
+        if self._authorEmail is None: self._authorEmail = sys.intern(self.field(LazyCommit.AUTHOR_EMAIL))
+        return self._authorEmail
+
+    @property
+    def authorDate(self) -> int:
+        if self._authorDate is None: self._authorDate = int(self.field(LazyCommit.AUTHOR_DATE) or 0)
+        return self._authorDate
+
+    @property
+    def committerName(self) -> str:
+        if self._committerName is None: self._committerName = sys.intern(self.field(LazyCommit.COMMITTER_NAME))
+        return self._committerName
+
+    @property
+    def committerEmail(self) -> str:
+        if self._committerEmail is None: self._committerEmail = sys.intern(self.field(LazyCommit.COMMITTER_EMAIL))
+        return self._committerEmail
+
+    @property
+    def committerDate(self) -> int:
+        if self._committerDate is None: self._committerDate = int(self.field(LazyCommit.COMMITTER_DATE) or 0)
+        return self._committerDate
+
+    @property
+    def raw(self) -> memoryview:
+        return memoryview(self._buffer)[self._start:self._end]
+
+    def toRecord(self) -> bytes:
+        # The record already is in the right format
+        return bytes(self.raw)
+
+    def detach(self) -> Commit:
+
+        """
+        Copies the commit into a plain Commit, so that keeping it does not keep the shared buffer alive.
+        Returns:
+            Commit: The decoded copy.
+        """
+
+        return Commit(*self._fields())
+
+    def _fields(self) -> tuple:
+        return (
+            self.name, self.hashstr, self.oid, self.body, self.authorName, self.authorEmail, self.authorDate,
+            self.committerName, self.committerEmail, self.committerDate
+        )
+
+    def __reduce__(self) -> tuple:
+        # Sending the commit to another process must not ship the whole buffer
+        return Commit, self._fields()
+
+
+
+class RecordParser:
+
+    """
+    Incremental parser of NUL-framed `git log -z` output. Records lying inside a
+    chunk become LazyCommits over that chunk; only the records straddling two
+    chunks are joined into a buffer of their own. Peak memory stays close to the
+    size of the raw output, the fields being decoded on demand.
+    """
+
+    SEPARATOR: bytes = b'\0'
+
+    def __init__(self) -> None:
+        self._pending: list[bytes] = list()
+
+    @classmethod
+    def parse(cls, buffer: bytes) -> list[Commit]:
+
+        """
+        Parses a complete output held in a single buffer.
+        Args:
+            buffer (bytes): The raw output, e.g. a commit cache file.
+        Returns:
+            list[Commit]: The commits, all sharing the buffer.
+        """
+
+        parser: RecordParser = cls()
+        return list(parser.feed(buffer)) + list(parser.close())
+
+    @classmethod
+    def iterate(cls, chunks: Iterable[bytes]) -> Iterator[Commit]:
+
+        """
+        Parses a stream of chunks as they come.
+        Args:
+            chunks (Iterable[bytes]): The raw output, e.g. from GitService.streamGitCommand.
+        Yields:
+            Commit: The commits, in output order.
+        """
+
+        parser: RecordParser = cls()
+        for chunk in chunks: yield from parser.feed(chunk)
+        yield from parser.close()
+
+    def feed(self, chunk: bytes) -> Iterator[Commit]:
+
+        """
+        Parses the next chunk of output.
+        Args:
+            chunk (bytes): The chunk.
+        Yields:
+            Commit: The records completed by this chunk.
+        """
+
+        start: int = 0
+        end: int = chunk.find(RecordParser.SEPARATOR)
+
+        # Finish the record left open by the previous chunk
+        if self._pending:
+            if end < 0:
+                self._pending.append(chunk)
+                return
+            self._pending.append(chunk[:end])
+            record: bytes = b''.join(self._pending)
+            self._pending = list()
+            if record: yield LazyCommit(record)
+            start, end = end + 1, chunk.find(RecordParser.SEPARATOR, end + 1)
+
+        while end >= 0:
+            if end > start: yield LazyCommit(chunk, start, end)
+            start, end = end + 1, chunk.find(RecordParser.SEPARATOR, end + 1)
+
+        if start < len(chunk): self._pending.append(chunk[start:])
+
+    def close(self) -> Iterator[Commit]:
+
+        """
+        Ends the stream.
+        Yields:
+            Commit: The last record, when the output did not end with a separator.
+        """
+
+        record: bytes = b''.join(self._pending)
+        self._pending = list()
+        if record: yield LazyCommit(record)
+
+    def __repr__(self) -> str:
+        return f"RecordParser(pending={sum(len(p) for p in self._pending)})"
@@ -0,0 +1,282 @@
+
+import json
+import os
+import shutil
+import subprocess
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class RewriteJournal:
+
+    """
+    On-disk record of one history rewrite, kept in `<git dir>/gitcleaner/` while
+    the rewrite runs. It holds what is needed to finish or undo the rewrite:
+    the operation and its arguments, the branch and the commit it pointed at,
+    the backup ref created before anything moved, and the old -> new OIDs of
+    the commits already rewritten (checkpointed by the rebase and DAG backends;
+    fast-import moves nothing before it completes). A finished rewrite deletes
+    its journal; its backup ref stays for later rollbacks.
+    """
+
+    DIRECTORY: str = "gitcleaner"
+    FILE: str = "journal.json"
+    BACKUP_NAMESPACE: str = "refs/gitcleaner/backups"
+
+    RUNNING: str = "RUNNING"
+    INTERRUPTED: str = "INTERRUPTED"
+
+    def __init__(self, service: "GitService", fp: str, gitDir: str, data: dict) -> None:
+        self._service: "GitService" = service
+        self._fp: str = fp
+        self._gitDir: str = gitDir
+        self._data: dict = data
+
+    @staticmethod
+    def gitDirectory(service: "GitService", fp: str) -> str:
+
+        result: subprocess.CompletedProcess = service.runGitCommand(['git', '-C', fp, 'rev-parse', '--absolute-git-dir'])
+        if result.returncode != 0: raise ValueError(f"'{fp}' is not a git repository.")
+        return result.stdout.decode('utf-8').strip()
+
+    @classmethod
+    def load(cls, service: "GitService", fp: str) -> "RewriteJournal | None":
+
+        """
+        Loads the journal of an unfinished rewrite.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+        Returns:
+            RewriteJournal | None: The journal, None when no rewrite is pending.
+        """
+
+        gitDir: str = cls.gitDirectory(service, fp)
+        try:
+            with open(os.path.join(gitDir, cls.DIRECTORY, cls.FILE), 'r', encoding='utf-8') as f:
+                return cls(service, fp, gitDir, json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def begin(cls, service: "GitService", fp: str, operation: str, arguments: dict,
+              refs: dict[str, str] | None = None, rewritten: dict[str, str] | None = None) -> "RewriteJournal":
+
+        """
+        Starts the journal of a rewrite and backs the current commit up under refs/gitcleaner/backups,
+        along with every other ref the rewrite moves. The backups of one rewrite share their timestamp.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            operation (str): The GitService method running the rewrite.
+            arguments (dict): The JSON-serializable arguments needed to run it again.
+            refs (dict[str, str] | None): The other refs the rewrite moves, with the object they point at.
+            rewritten (dict[str, str] | None): The commits already rewritten by an earlier, interrupted run.
+        Returns:
+            RewriteJournal: The journal, already saved.
+        Raises:
+            RuntimeError: If another rewrite is pending, or the refs cannot be backed up.
+        """
+
+        pending: RewriteJournal | None = cls.load(service, fp)
+        if pending is not None:
+            raise RuntimeError(f"An interrupted {pending.operation} is pending in '{fp}', resume it or roll it back first.")
+
+        head: str | None = service.resolve(fp, 'HEAD')
+        if head is None: raise RuntimeError(f"'{fp}' has no commit to rewrite.")
+        branchResult: subprocess.CompletedProcess = service.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        branch: str | None = branchResult.stdout.decode('utf-8').strip() if branchResult.returncode == 0 else None
+
+        # refs/heads/main -> refs/gitcleaner/backups/heads/main/<ns>, a detached HEAD under .../HEAD/<ns>
+        stamp: int = time.time_ns()
+        backup: str = cls.backupName(branch or 'HEAD', stamp)
+        moved: dict[str, list[str]] = {ref: [oid, cls.backupName(ref, stamp)] for ref, oid in (refs or {}).items() if ref != branch}
+
+        # One transaction: either every backup exists or none does
+        updates: str = ''.join(f"create {b} {oid}\n" for oid, b in [(head, backup), *moved.values()])
+        result: subprocess.CompletedProcess = service.runGitCommand(
+            ['git', '-C', fp, 'update-ref', '-m', f'gitcleaner: backup before {operation}', '--stdin'], input=updates.encode('utf-8')
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not create the backup refs: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+
+        journal: RewriteJournal = cls(service, fp, cls.gitDirectory(service, fp), {
+            "operation": operation, "arguments": arguments, "status": cls.RUNNING,
+            "branch": branch, "head": head, "backup": backup, "refs": moved, "started": time.time(), "rewritten": dict(rewritten or {}),
+        })
+        journal.save()
+        return journal
+
+    @staticmethod
+    def backupName(ref: str, stamp: int) -> str:
+        return f"{RewriteJournal.BACKUP_NAMESPACE}/{ref[len('refs/'):] if ref.startswith('refs/') else ref}/{stamp}"
+
+    @staticmethod
+    def backedUp(backup: str) -> str:
+        # refs/gitcleaner/backups/tags/v1/<ns> -> refs/tags/v1, .../HEAD/<ns> -> HEAD
+        name: str = backup[len(RewriteJournal.BACKUP_NAMESPACE) + 1:].rsplit('/', 1)[0]
+        return name if name == 'HEAD' else f"refs/{name}"
+
+    @property
+    def fp(self) -> str:
+        return self._fp
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(self._gitDir, RewriteJournal.DIRECTORY)
+
+    @property
+    def operation(self) -> str:
+        return self._data["operation"]
+
+    @property
+    def arguments(self) -> dict:
+        return self._data["arguments"]
+
+    @property
+    def status(self) -> str:
+        return self._data["status"]
+
+    @property
+    def branch(self) -> str | None:
+        return self._data["branch"]
+
+    @property
+    def head(self) -> str:
+        return self._data["head"]
+
+    @property
+    def backup(self) -> str:
+        return self._data["backup"]
+
+    @property
+    def refs(self) -> dict[str, list[str]]:
+        # The other refs moved by the rewrite: ref -> [previous object, backup ref]
+        return self._data.get("refs", {})
+
+    @property
+    def backupRefs(self) -> list[str]:
+        return [self.backup] + [b for _, b in self.refs.values()]
+
+    @property
+    def rewritten(self) -> dict[str, str]:
+        return self._data["rewritten"]
+
+    @property
+    def rebaseDirectory(self) -> str:
+        return os.path.join(self._gitDir, 'rebase-merge')
+
+    @property
+    def rebaseInProgress(self) -> bool:
+        return os.path.isdir(self.rebaseDirectory)
+
+    def file(self, name: str) -> str:
+        # Helper files (todo list, editors, messages) live next to the journal instead of the system temp dir
+        return os.path.join(self.directory, name)
+
+    def save(self) -> None:
+
+        # Write next to the target then swap, so an interruption never leaves a partial journal
+        os.makedirs(self.directory, exist_ok=True)
+        target: str = self.file(RewriteJournal.FILE)
+        temporary: str = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(temporary, target)
+
+    def rebaseProgress(self) -> dict[str, str]:
+
+        """
+        Reads the commits an interactive rebase already replayed.
+        Returns:
+            dict[str, str]: The old -> new OIDs git recorded in rebase-merge/rewritten-list.
+        """
+
+        try:
+            with open(os.path.join(self.rebaseDirectory, 'rewritten-list'), 'r', encoding='utf-8') as f:
+                return dict(line.split()[:2] for line in f if len(line.split()) >= 2)
+        except OSError:
+            return dict()
+
+    def stoppedReword(self) -> str | None:
+
+        """
+        Finds the commit a stopped rebase was rewording when it stopped (e.g. a rejected message).
+        Returns:
+            str | None: Its original OID, None when the rebase did not stop on a reword.
+        """
+
+        try:
+            with open(os.path.join(self.rebaseDirectory, 'done'), 'r', encoding='utf-8') as f:
+                done: list[list[str]] = [line.split() for line in f if line.split()]
+        except OSError:
+            return None
+        return done[-1][1] if done and done[-1][0] in ('reword', 'r') and len(done[-1]) > 1 else None
+
+    def checkpoint(self, rewritten: dict[str, str]) -> None:
+
+        """
+        Records commits as rewritten.
+        Args:
+            rewritten (dict[str, str]): Old -> new OIDs.
+        """
+
+        self._data["rewritten"].update(rewritten)
+        self.save()
+
+    def interrupt(self, reason: str) -> None:
+        self._data["status"] = RewriteJournal.INTERRUPTED
+        self._data["reason"] = reason
+        self.checkpoint(self.rebaseProgress())
+
+    def finish(self) -> None:
+        # The backup ref outlives the journal, it is what rollbacks use afterwards
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def discard(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def backups(service: "GitService", fp: str, branch: str | None = None) -> list[tuple[str, str]]:
+
+        """
+        Lists the backup refs, newest first.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            branch (str | None): Only list the backups of this branch (e.g. refs/heads/main), all when None.
+        Returns:
+            list[tuple[str, str]]: The (ref, OID) pairs.
+        """
+
+        prefix: str = f"{RewriteJournal.BACKUP_NAMESPACE}/{branch[len('refs/'):]}/" if branch else f"{RewriteJournal.BACKUP_NAMESPACE}/"
+        result: subprocess.CompletedProcess = service.runGitCommand(
+            ['git', '-C', fp, 'for-each-ref', '--format=%(refname) %(objectname)', prefix]
+        )
+        if result.returncode != 0: return []
+
+        refs: list[tuple[str, str]] = [tuple(line.split(' ', 1)) for line in result.stdout.decode('utf-8').splitlines() if line]
+        # The last path component is a nanosecond timestamp
+        return sorted(refs, key=lambda r: int(r[0].rsplit('/', 1)[1]) if r[0].rsplit('/', 1)[1].isdigit() else 0, reverse=True)
+
+    @staticmethod
+    def siblings(service: "GitService", fp: str, backup: str) -> list[tuple[str, str]]:
+
+        """
+        Lists the backups taken by the same rewrite as one backup ref.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            backup (str): One of the backup refs.
+        Returns:
+            list[tuple[str, str]]: The (ref, OID) pairs sharing its timestamp, itself included.
+        """
+
+        stamp: str = backup.rsplit('/', 1)[1]
+        return [(ref, oid) for ref, oid in RewriteJournal.backups(service, fp) if ref.rsplit('/', 1)[1] == stamp]
+
+    def __repr__(self) -> str:
+        return f"RewriteJournal(operation={self.operation}, status={self.status}, branch={self.branch}, backup={self.backup})"
@@ -0,0 +1,269 @@
+
+from .commit import Commit
+from .historyGraph import HistoryGraph
+
+import difflib
+import json
+import subprocess
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gitService import GitService
+
+
+class MessageChange:
+
+    def __init__(self, old: Commit, new: Commit) -> None:
+        self._old: Commit = old
+        self._new: Commit = new
+
+    @property
+    def oid(self) -> str:
+        return self._old.oid
+
+    @property
+    def old(self) -> str:
+        return self._old.message
+
+    @property
+    def new(self) -> str:
+        return self._new.message
+
+    def diff(self) -> list[str]:
+        return list(difflib.unified_diff(self.old.splitlines(), self.new.splitlines(), 'old', 'new', lineterm=''))
+
+    def toDict(self) -> dict:
+        return {"oid": self.oid, "short": self._old.hashstr, "old": self.old, "new": self.new, "diff": self.diff()}
+
+    def __repr__(self) -> str:
+        return f"MessageChange({self._old.hashstr}: {self._old.name!r} -> {self._new.name!r})"
+
+
+
+class RewritePlan:
+
+    """
+    Read-only description of a rewrite: how far back it reaches, how many commits
+    get a new hash, which refs are involved and what every message becomes.
+    Computing it never modifies the repository.
+    """
+
+    def __init__(self, repository: str, branch: str | None, backend: str, oldest: Commit | None,
+                 replayed: int, refs: list[str], tags: list[str], changes: list[MessageChange],
+                 moved: list[str] | None = None, merges: int = 0) -> None:
+        self._repository: str = repository
+        self._merges: int = merges
+        self._moved: list[str] | None = moved
+        self._branch: str | None = branch
+        self._backend: str = backend
+        self._oldest: Commit | None = oldest
+        self._replayed: int = replayed
+        self._refs: list[str] = refs
+        self._tags: list[str] = tags
+        self._changes: list[MessageChange] = changes
+
+    @classmethod
+    def compute(cls, service: "GitService", fp: str, commits: list[Commit], backend: str,
+                mergeBackend: str | None = None) -> "RewritePlan":
+
+        """
+        Computes the plan of rewriting the given commits on the current branch.
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            commits (list[Commit]): The commits carrying their new message, e.g. from findReplacements.
+            backend (str): The name of the backend that would run the rewrite.
+            mergeBackend (str | None): The backend running it instead when merges are replayed.
+        Returns:
+            RewritePlan: The plan.
+        """
+
+        branchResult: subprocess.CompletedProcess = service.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        branch: str | None = branchResult.stdout.decode('utf-8').strip() if branchResult.returncode == 0 else None
+
+        # Walk back from HEAD only until every target has been seen
+        targets: dict[str, Commit] = {c.oid: c for c in commits}
+        changes: list[MessageChange] = list()
+        oldest: Commit | None = None
+        for c in service.iterCommits(fp):
+            if c.oid in targets:
+                changes.append(MessageChange(c, targets.pop(c.oid)))
+                oldest = c
+            if not targets: break
+
+        if oldest is None:
+            return cls(fp, branch, backend, None, 0, [], [], [])
+        # The walk met the targets newest first, the rewrite replays them oldest first
+        changes.reverse()
+
+        hasParent: bool = service.resolve(fp, f'{oldest.oid}^') is not None
+        count: subprocess.CompletedProcess = service.runGitCommand(
+            ['git', '-C', fp, 'rev-list', '--count', 'HEAD'] + ([f'^{oldest.oid}^@'] if hasParent else [])
+        )
+        replayed: int = int(count.stdout.decode('utf-8').strip() or 0) if count.returncode == 0 else 0
+        count = service.runGitCommand(
+            ['git', '-C', fp, 'rev-list', '--merges', '--count', 'HEAD'] + ([f'^{oldest.oid}^@'] if hasParent else [])
+        )
+        merges: int = int(count.stdout.decode('utf-8').strip() or 0) if count.returncode == 0 else 0
+        if merges and mergeBackend: backend = mergeBackend
+
+        contains: subprocess.CompletedProcess = service.runGitCommand(
+            ['git', '-C', fp, 'for-each-ref', f'--contains={oldest.oid}', '--format=%(refname)']
+        )
+        # Backup refs left by earlier rewrites are meant to keep pointing at the old history
+        names: list[str] = [n for n in contains.stdout.decode('utf-8').split() if not n.startswith('refs/gitcleaner/')] if contains.returncode == 0 else []
+        refs: list[str] = [n for n in names if not n.startswith('refs/tags/')]
+        tags: list[str] = [n for n in names if n.startswith('refs/tags/')]
+
+        return cls(fp, branch, backend, oldest, replayed, refs, tags, changes, merges=merges)
+
+    @classmethod
+    def computeRefs(cls, service: "GitService", fp: str, commits: list[Commit], patterns: list[str],
+                    backend: str = "FAST_IMPORT") -> "RewritePlan":
+
+        """
+        Computes the plan of rewriting the given commits on a set of refs at once (see GitService.rewriteRefs).
+        Args:
+            service (GitService): The service used to query the repository.
+            fp (str): The path to the git repository.
+            commits (list[Commit]): The commits carrying their new message.
+            patterns (list[str]): The refs to rewrite, names or globs.
+            backend (str): The name of the backend that would run the rewrite.
+        Returns:
+            RewritePlan: The plan, its moved refs being the selected refs that reach a target.
+        """
+
+        branchResult: subprocess.CompletedProcess = service.runGitCommand(['git', '-C', fp, 'symbolic-ref', '-q', 'HEAD'])
+        branch: str | None = branchResult.stdout.decode('utf-8').strip() if branchResult.returncode == 0 else None
+
+        tips: dict[str, tuple[str, str]] = service.listRefs(fp, patterns)
+        heads: list[str] = sorted({commit for _, commit in tips.values()})
+        graph: HistoryGraph = HistoryGraph.load(service, fp, heads) if heads else HistoryGraph([], {})
+        targets: dict[str, Commit] = {c.oid: c for c in commits if c.oid in graph}
+        if not targets: return cls(fp, branch, backend, None, 0, [], [], [], [])
+
+        affected: set[str] = graph.affected(targets)
+        moved: list[str] = sorted(ref for ref, (_, commit) in tips.items() if commit in affected)
+        oldest: str = next(oid for oid in graph.order if oid in targets)
+
+        changes: list[MessageChange] = list()
+        pending: dict[str, Commit] = dict(targets)
+        for c in service.iterCommits(fp, revisions=heads):
+            if c.oid in pending: changes.append(MessageChange(c, pending.pop(c.oid)))
+            if not pending: break
+        position: dict[str, int] = {oid: i for i, oid in enumerate(graph.order)}
+        changes.sort(key=lambda change: position[change.oid])
+
+        contains: subprocess.CompletedProcess = service.runGitCommand(
+            ['git', '-C', fp, 'for-each-ref', '--format=%(refname)'] + [f'--contains={oid}' for oid in targets]
+        )
+        names: list[str] = [n for n in contains.stdout.decode('utf-8').split() if not n.startswith('refs/gitcleaner/')] if contains.returncode == 0 else []
+        old: Commit = next(c for c in commits if c.oid == oldest)
+
+        return cls(
+            fp, branch, backend, old, len(affected), [n for n in names if not n.startswith('refs/tags/')],
+            [n for n in names if n.startswith('refs/tags/')], changes, moved,
+            sum(1 for oid in affected if len(graph.parents[oid]) > 1)
+        )
+
+    @property
+    def repository(self) -> str:
+        return self._repository
+
+    @property
+    def branch(self) -> str | None:
+        return self._branch
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def oldest(self) -> Commit | None:
+        return self._oldest
+
+    @property
+    def replayed(self) -> int:
+        return self._replayed
+
+    @property
+    def merges(self) -> int:
+        # Merge commits among the replayed ones
+        return self._merges
+
+    @property
+    def refs(self) -> list[str]:
+        return self._refs
+
+    @property
+    def tags(self) -> list[str]:
+        return self._tags
+
+    @property
+    def moved(self) -> list[str]:
+        # The refs the rewrite moves: the current branch, or the selected refs of a multi-ref rewrite
+        if self._moved is not None: return self._moved
+        return [self.branch] if self.branch and not self.empty else []
+
+    @property
+    def staleRefs(self) -> list[str]:
+        # Refs sharing the rewritten history that the rewrite itself does not move
+        return [r for r in self.refs + self.tags if r not in self.moved]
+
+    @property
+    def changes(self) -> list[MessageChange]:
+        # Oldest first, the order the rewrite replays them in
+        return self._changes
+
+    @property
+    def empty(self) -> bool:
+        return not self.changes
+
+    def toDict(self) -> dict:
+        return {
+            "repository": self.repository,
+            "branch": self.branch,
+            "backend": self.backend,
+            "oldest": self.oldest.oid if self.oldest else None,
+            "replayed": self.replayed,
+            "merges": self.merges,
+            "modified": len(self.changes),
+            "refs": self.refs,
+            "tags": self.tags,
+            "moved": self.moved,
+            "staleRefs": self.staleRefs,
+            "changes": [c.toDict() for c in self.changes],
+        }
+
+    def toJson(self, indent: int | None = 2) -> str:
+        return json.dumps(self.toDict(), indent=indent, ensure_ascii=False)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.toJson())
+
+    @staticmethod
+    def plural(count: int, noun: str) -> str:
+        return f"{count} {noun}" + ("" if count == 1 else "s")
+
+    def summary(self) -> list[str]:
+
+        """
+        Builds a short human-readable description of the plan.
+        Returns:
+            list[str]: One line per fact.
+        """
+
+        if self.empty: return ["Nothing to rewrite."]
+        scope: str = f"Refs: {len(self.moved)} moved" if self._moved is not None else f"Branch: {self.branch or 'detached HEAD'}"
+        return [
+            f"{scope} ({self.backend} backend)",
+            f"Oldest affected commit: {self.oldest.hashstr} {self.oldest.name}",
+            f"Changed: {RewritePlan.plural(len(self.changes), 'message')}, "
+            f"{RewritePlan.plural(self.replayed, 'commit')} with a new hash"
+            + (f" ({RewritePlan.plural(self.merges, 'merge')} kept)" if self.merges else ""),
+            f"Refs sharing the rewritten history: {', '.join(self.refs + self.tags) or 'none'}",
+        ] + ([f"Left pointing at the old history: {', '.join(self.staleRefs)}"] if self.staleRefs else [])
+
+    def __repr__(self) -> str:
+        return f"RewritePlan(repository={self.repository}, modified={len(self.changes)}, replayed={self.replayed})"
@@ -0,0 +1,347 @@
+
+from .commit import Commit
+from .matcher import MessageMatcher
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import pickle
+import re
+from typing import Callable, Iterable, Iterator
+
+
+# A message travelling through the pipeline: (subject, body)
+Message = tuple[str, str]
+
+
+class TransformStage:
+
+    """
+    One step of a TransformPipeline, turning a (subject, body) pair into a new one.
+    Stages flagged as parallel are CPU-bound enough to be worth running in worker
+    processes, they must then be picklable.
+    """
+
+    parallel: bool = False
+
+    def __init__(self, body: bool = True) -> None:
+        self._body: bool = body
+
+    @property
+    def body(self) -> bool:
+        # Whether the stage may change the bodies, which then need a full-message rewrite
+        return self._body
+
+    def apply(self, subject: str, body: str) -> Message:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(body={self.body})"
+
+
+
+class RegexStage(TransformStage):
+
+    parallel: bool = True
+
+    def __init__(self, pattern: str | re.Pattern, replacement: str | Callable[[re.Match], str],
+                 flags: int = 0, body: bool = False) -> None:
+
+        """
+        Substitutes a regular expression, like re.sub.
+        Args:
+            pattern (str | re.Pattern): The expression.
+            replacement (str | Callable[[re.Match], str]): The replacement, group references allowed.
+            flags (int): The re flags, when the pattern is given as a string.
+            body (bool): Whether the bodies are rewritten too, not only the subjects.
+        """
+
+        super().__init__(body)
+        self._pattern: re.Pattern = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        self._replacement: str | Callable[[re.Match], str] = replacement
+
+    @property
+    def pattern(self) -> re.Pattern:
+        return self._pattern
+
+    def apply(self, subject: str, body: str) -> Message:
+        return self._pattern.sub(self._replacement, subject), self._pattern.sub(self._replacement, body) if self.body else body
+
+    def __repr__(self) -> str:
+        return f"RegexStage(pattern={self._pattern.pattern!r}, body={self.body})"
+
+
+
+class MatcherStage(TransformStage):
+
+    parallel: bool = True
+
+    def __init__(self, matcher: MessageMatcher, body: bool = False) -> None:
+
+        """
+        Runs a MessageMatcher, i.e. the word replacements of findReplacements.
+        Args:
+            matcher (MessageMatcher): The compiled targets.
+            body (bool): Whether the bodies are rewritten too, not only the subjects.
+        """
+
+        super().__init__(body)
+        self._matcher: MessageMatcher = matcher
+
+    @property
+    def matcher(self) -> MessageMatcher:
+        return self._matcher
+
+    def apply(self, subject: str, body: str) -> Message:
+        return self._matcher.sub(subject), self._matcher.sub(body) if self.body else body
+
+    def __repr__(self) -> str:
+        return f"MatcherStage(matcher={self._matcher}, body={self.body})"
+
+
+
+class TrailerStage(TransformStage):
+
+    """
+    Removes git trailers ("Signed-off-by: ...", "Co-authored-by: ...") from the
+    last paragraph of the bodies, the whole paragraph going away once empty.
+    """
+
+    TRAILER: re.Pattern = re.compile(r'^(?P<key>[A-Za-z0-9][A-Za-z0-9-]*)\s*:\s')
+
+    def __init__(self, keys: list[str] | None = None) -> None:
+
+        """
+        Args:
+            keys (list[str] | None): The trailer keys removed (case-insensitive), every trailer when None.
+        """
+
+        super().__init__(body=True)
+        self._keys: frozenset[str] | None = frozenset(k.lower() for k in keys) if keys is not None else None
+
+    @property
+    def keys(self) -> frozenset[str] | None:
+        return self._keys
+
+    def apply(self, subject: str, body: str) -> Message:
+
+        head, sep, last = body.rstrip('\n').rpartition('\n\n')
+        lines: list[str] = last.split('\n')
+
+        # Only a paragraph made of trailers (and their indented continuation lines) is a trailer block
+        if not lines or not TrailerStage.TRAILER.match(lines[0]): return subject, body
+        kept: list[str] = list()
+        dropping: bool = False
+        for line in lines:
+            if line[:1] in (' ', '\t'):
+                if not dropping: kept.append(line)
+                continue
+            match: re.Match | None = TrailerStage.TRAILER.match(line)
+            if match is None: return subject, body
+            dropping = self._keys is None or match.group('key').lower() in self._keys
+            if not dropping: kept.append(line)
+
+        if len(kept) == len(lines): return subject, body
+        return subject, (head + sep + '\n'.join(kept)) if kept else head
+
+    def __repr__(self) -> str:
+        return f"TrailerStage(keys={sorted(self._keys) if self._keys is not None else None})"
+
+
+
+class ConventionalStage(TransformStage):
+
+    """
+    Normalizes Conventional Commits subjects: "Feature (API) : Add X." becomes
+    "feat(api): add X". Subjects whose prefix is not a known type are left alone.
+    """
+
+    TYPES: frozenset[str] = frozenset({'feat', 'fix', 'docs', 'style', 'refactor', 'perf', 'test', 'build', 'ci', 'chore', 'revert'})
+    ALIASES: dict[str, str] = {
+        'feature': 'feat', 'features': 'feat', 'bugfix': 'fix', 'hotfix': 'fix', 'bug': 'fix', 'doc': 'docs',
+        'tests': 'test', 'refacto': 'refactor', 'performance': 'perf', 'chores': 'chore',
+    }
+    SUBJECT: re.Pattern = re.compile(r'^\s*(?P<type>[A-Za-z]+)\s*(?:\(\s*(?P<scope>[^()]*?)\s*\))?\s*(?P<bang>!)?\s*:\s*(?P<text>.*?)\s*$')
+
+    def __init__(self, types: Iterable[str] | None = None, aliases: dict[str, str] | None = None) -> None:
+
+        """
+        Args:
+            types (Iterable[str] | None): The accepted types, the Conventional Commits ones by default.
+            aliases (dict[str, str] | None): Spellings mapped to a type, e.g. {"feature": "feat"}.
+        """
+
+        super().__init__(body=False)
+        self._types: frozenset[str] = frozenset(t.lower() for t in types) if types is not None else ConventionalStage.TYPES
+        self._aliases: dict[str, str] = {k.lower(): v.lower() for k, v in (aliases if aliases is not None else ConventionalStage.ALIASES).items()}
+
+    def apply(self, subject: str, body: str) -> Message:
+
+        match: re.Match | None = ConventionalStage.SUBJECT.match(subject)
+        if match is None: return subject, body
+
+        kind: str = match.group('type').lower()
+        kind = self._aliases.get(kind, kind)
+        text: str = match.group('text').rstrip('.')
+        if kind not in self._types or not text: return subject, body
+
+        # Keep acronyms ("API") but lower a capitalized first word
+        if text[:1].isupper() and not text[1:2].isupper(): text = text[0].lower() + text[1:]
+        scope: str = f"({match.group('scope').lower()})" if match.group('scope') else ""
+        return f"{kind}{scope}{match.group('bang') or ''}: {text}", body
+
+    def __repr__(self) -> str:
+        return f"ConventionalStage(types={len(self._types)})"
+
+
+
+class CallableStage(TransformStage):
+
+    def __init__(self, function: Callable[[str, str], Message | str], body: bool = True, parallel: bool = False) -> None:
+
+        """
+        Runs a user-supplied function.
+        Args:
+            function (Callable[[str, str], Message | str]): Called with (subject, body), it returns
+                the new (subject, body) pair, or only the new subject.
+            body (bool): Whether the function may change the bodies.
+            parallel (bool): Whether to run it in worker processes, it must then be a picklable
+                module-level function.
+        """
+
+        super().__init__(body)
+        self._function: Callable[[str, str], Message | str] = function
+        self.parallel = parallel
+
+    def apply(self, subject: str, body: str) -> Message:
+        result: Message | str = self._function(subject, body)
+        return (result, body) if isinstance(result, str) else result
+
+    def __repr__(self) -> str:
+        return f"CallableStage(function={getattr(self._function, '__qualname__', self._function)!r}, parallel={self.parallel})"
+
+
+
+# Stages of the parallel segment run by a worker process, set once by its initializer
+_stages: tuple[TransformStage, ...] = ()
+
+
+def _initWorker(stages: tuple[TransformStage, ...]) -> None:
+    global _stages
+    _stages = stages
+
+
+def _runBatch(messages: list[Message]) -> list[Message]:
+    return [TransformPipeline.run(_stages, subject, body) for subject, body in messages]
+
+
+
+class TransformPipeline:
+
+    """
+    Chain of message transforms streaming commits through. Consecutive parallel
+    stages form a segment that fans batches of messages out to a process pool;
+    at most a few batches per worker are in flight, so memory stays bounded on
+    any history size and the output keeps the input order. The changed commits
+    come out carrying their new message, ready for GitService.rewriteMessages,
+    which streams them to fast-import without any temporary file.
+    """
+
+    BATCH: int = 512
+    # Batches queued per worker, enough to keep every worker busy
+    IN_FLIGHT: int = 2
+
+    def __init__(self, stages: list[TransformStage], workers: int | None = None, batch: int = BATCH) -> None:
+
+        assert stages, "At least one stage is required."
+        assert all(isinstance(s, TransformStage) for s in stages), "All stages must be TransformStage instances."
+        assert batch > 0, "The batch size must be positive."
+
+        self._stages: list[TransformStage] = stages
+        self._workers: int = workers if workers else (os.cpu_count() or 1)
+        self._batch: int = batch
+        self._used: int = 1
+
+    @property
+    def stages(self) -> list[TransformStage]:
+        return self._stages
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def used(self) -> int:
+        # The workers the last run actually used, 1 when it stayed in-process
+        return self._used
+
+    @property
+    def body(self) -> bool:
+        return any(s.body for s in self._stages)
+
+    @staticmethod
+    def run(stages: Iterable[TransformStage], subject: str, body: str) -> Message:
+        for stage in stages: subject, body = stage.apply(subject, body)
+        return subject, body
+
+    def apply(self, commits: Iterable[Commit]) -> Iterator[Commit]:
+
+        """
+        Streams commits through the stages.
+        Args:
+            commits (Iterable[Commit]): The commits, e.g. GitService.iterCommits.
+        Yields:
+            Commit: Only the commits whose message changed, carrying their new message, in input order.
+        """
+
+        self._used = 1
+        items: Iterator[tuple[Commit, str, str]] = ((c, c.name, c.body) for c in commits)
+        for parallel, segment in itertools.groupby(self._stages, key=lambda s: s.parallel):
+            stages: tuple[TransformStage, ...] = tuple(segment)
+            items = self._fanOut(stages, items) if parallel and self._workers > 1 else self._serial(stages, items)
+
+        for commit, subject, body in items:
+            if subject != commit.name or body != commit.body: yield commit.withMessage(subject, body)
+
+    @staticmethod
+    def _serial(stages: tuple[TransformStage, ...], items: Iterator[tuple[Commit, str, str]]) -> Iterator[tuple[Commit, str, str]]:
+        for commit, subject, body in items:
+            yield (commit, *TransformPipeline.run(stages, subject, body))
+
+    def _fanOut(self, stages: tuple[TransformStage, ...], items: Iterator[tuple[Commit, str, str]]) -> Iterator[tuple[Commit, str, str]]:
+
+        batches: Iterator[list[tuple[Commit, str, str]]] = iter(lambda: list(itertools.islice(items, self._batch)), [])
+        first: list[tuple[Commit, str, str]] = next(batches, [])
+        second: list[tuple[Commit, str, str]] = next(batches, [])
+
+        # A single batch is not worth a pool, and stages that cannot be pickled never leave this process
+        if not second or not TransformPipeline.picklable(stages):
+            yield from self._serial(stages, itertools.chain(first, second, itertools.chain.from_iterable(batches)))
+            return
+
+        self._used = max(self._used, self._workers)
+        with concurrent.futures.ProcessPoolExecutor(self._workers, initializer=_initWorker, initargs=(stages,)) as pool:
+
+            pending: collections.deque = collections.deque()
+            for batch in itertools.chain((first, second), batches):
+                pending.append((batch, pool.submit(_runBatch, [(s, b) for _, s, b in batch])))
+                # Bounded in-flight work: wait for the oldest batch before reading more history
+                while len(pending) >= self._workers * TransformPipeline.IN_FLIGHT:
+                    yield from TransformPipeline._collect(*pending.popleft())
+
+            while pending: yield from TransformPipeline._collect(*pending.popleft())
+
+    @staticmethod
+    def picklable(stages: tuple[TransformStage, ...]) -> bool:
+        try: pickle.dumps(stages)
+        except (pickle.PicklingError, TypeError, AttributeError): return False
+        return True
+
+    @staticmethod
+    def _collect(batch: list[tuple[Commit, str, str]], future: concurrent.futures.Future) -> Iterator[tuple[Commit, str, str]]:
+        for (commit, _, _), (subject, body) in zip(batch, future.result()):
+            yield commit, subject, body
+
+    def __repr__(self) -> str:
+        return f"TransformPipeline(stages={self._stages}, workers={self._workers}, batch={self._batch})"
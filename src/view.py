@@ -1,6 +1,16 @@
 
 from .gitService import GitService, Commit
+from .commitPicker import CommitPicker
+from .discovery import DiscoveredRepo, RepoScanner
+from .identityMap import IdentityMap
+from .multiRepo import MultiRepoCleaner, RepoResult
+from .rewriteJournal import RewriteJournal
+from .rewritePlan import RewritePlan
 from .logger import Logger
+from .messageScan import ScanReport
+from .metrics import Metrics
+
+import os
 
 import inquirer
 import enum
@@ -15,6 +25,10 @@ class ViewState(enum.Enum):
     EDIT_MENU: int = 3
     EDIT_MANUAL: int = 6
     EDIT_BATCH: int = 8
+    EDIT_MULTI: int = 9
+    EDIT_IDENTITY: int = 10
+    EDIT_RECOVERY: int = 11
+    EDIT_SCAN: int = 12
 
     def __str__(self) -> str:
         return f"ViewState.{self.name} ({self.value})"
@@ -41,15 +55,34 @@ class ViewHelper:
     USER_INTERACTION_BALISE: str = "[\033[92m>\033[0m]"
     ERROR_BALISE: str = "[\033[91mX\033[0m]"
     GTIHUBLINK: str = "https://github.com/Ant0in"
+    COMMIT_PAGE_SIZE: int = 50
+    NEXT_PAGE: str = "Next page..."
+    PREVIOUS_PAGE: str = "Previous page..."
+    SEARCH: str = "Search..."
+    CLEAR_SEARCH: str = "Clear search"
+    REVIEW_EDITS: str = "Review staged edits..."
+    APPLY_EDITS: str = "Apply staged edits"
+    PREVIEW_SIZE: int = 10
 
     @staticmethod
-    def InquireCommit(message: str, commits: list[Commit]) -> Commit | None:
-
+    def InquireCommit(message: str, commits: list[Commit], hasNext: bool = False, hasPrevious: bool = False,
+                      searching: bool = False, staged: dict[str, tuple[str, Commit]] | None = None) -> Commit | str | None:
+
+        # Only one window of commits is ever handed to inquirer, the picker pages through the rest
+        staged = staged or dict()
+        actions: list[str] = (
+            ([ViewHelper.NEXT_PAGE] if hasNext else []) + ([ViewHelper.PREVIOUS_PAGE] if hasPrevious else [])
+            + [ViewHelper.SEARCH] + ([ViewHelper.CLEAR_SEARCH] if searching else [])
+            + ([ViewHelper.REVIEW_EDITS, ViewHelper.APPLY_EDITS] if staged else [])
+        )
         questions: list = [
             inquirer.List(
                 'commit',
                 message=message,
-                choices=[commit for commit in commits] + ["Back"],
+                choices=[
+                    (f"{commit.hashstr}, {staged[commit.oid][1].name} (staged)", commit) if commit.oid in staged else commit
+                    for commit in commits
+                ] + actions + ["Back"],
             ),
         ]
 
@@ -83,6 +116,29 @@ class ViewHelper:
         print(userinput)
         return userinput.strip() 
 
+    @staticmethod
+    def InquireSearch(current: str = "") -> str:
+        # Unlike InquireSingle an empty answer is allowed, it clears the search
+        question: list = [inquirer.Text('query', message="Search hashes and messages (fuzzy, empty to clear)", default=current)]
+        return inquirer.prompt(question)['query'].strip()
+
+    @staticmethod
+    def InquireConfirm(message: str, default: bool = False) -> bool:
+        question: list = [inquirer.Confirm('confirm', message=message, default=default)]
+        return bool(inquirer.prompt(question)['confirm'])
+
+    @staticmethod
+    def InquireTargets() -> list[str]:
+
+        targets: list[str] = list()
+
+        while 1:
+            userInput: str = ViewHelper.InquireSingle("Enter the words you wish to replace in the commit messages, use '.' to end the input")
+            if userInput == '.': break
+            else: targets.append(userInput.strip())
+
+        return targets
+
     @staticmethod
     def Flush() -> None:
         # let's use Escape Sequences to clear the console
@@ -104,6 +160,7 @@ class ViewHelper:
         ViewHelper.GitStatus(view.git)
         return ViewHelper.Inquire("Select an option", {
             "Edit": ViewState.EDIT_MENU,
+            "Edit Multiple Repositories": ViewState.EDIT_MULTI,
             "Informations": ViewState.INFO,
             "Quit": ViewState.QUIT 
         })
@@ -132,10 +189,21 @@ class ViewHelper:
             fp: str = ViewHelper.InquireSingle('Enter the path to the git repository')
         found: bool = view.git.isFolderAGitRepository(fp)
 
+        # A folder holding several checkouts: let the user pick one of them
+        if not found and fp and os.path.isdir(fp):
+            repos: list[DiscoveredRepo] = view.scanner.scan(fp)
+            if repos:
+                print(f"{ViewHelper.INFO_BALISE} Found {len(repos)} git repositories below '{fp}'.")
+                fp = ViewHelper.Inquire("Select a repository", {str(r): r.path for r in repos})
+                found = True
+
         print(f"\n{ViewHelper.INFO_BALISE} Git Folder @ '{fp}': {ViewHelper.FOUND if found else ViewHelper.NOT_FOUND}")
         state: ViewState = ViewHelper.Inquire("Select an option", {
             "Edit in Batch": ViewState.EDIT_BATCH,
             "Edit Manually": ViewState.EDIT_MANUAL,
+            "Edit Identities": ViewState.EDIT_IDENTITY,
+            "Scan for Secrets": ViewState.EDIT_SCAN,
+            "Resume or Undo a Rewrite": ViewState.EDIT_RECOVERY,
             "Back": ViewState.MAIN 
         })
 
@@ -160,23 +228,98 @@ class ViewHelper:
 
         print(f"{ViewHelper.INFO_BALISE} Current Git Folder: {view.currentGitFolder}")
 
-        commits: list[Commit] = view.git.getCommits(view.currentGitFolder)
-        if not commits:
-            print(f"{ViewHelper.INFO_BALISE} No commits found in the current git folder.")
-            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
-            view.removeCurrentGitFolder()
+        # The picker reads one window of history at a time and keeps the next few loaded in the background
+        picker: CommitPicker = CommitPicker(view.git.iterCommits(view.currentGitFolder), ViewHelper.COMMIT_PAGE_SIZE)
+        with picker:
+
+            if not picker.page(0):
+                print(f"{ViewHelper.INFO_BALISE} No commits found in the current git folder.")
+                input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+                view.removeCurrentGitFolder()
+                return ViewState.EDIT_MENU
+
+            picker.prefetch()
+            page: int = 0
+            while 1:
+
+                commits: list[Commit] = picker.page(page)
+                first: int = page * picker.window + 1 if commits else 0
+                total: str = str(picker.count) if picker.query or picker.exhausted else f"{picker.count}+"
+                scope: str = f"matching '{picker.query}'" if picker.query else "in the current git folder"
+                print(f"{ViewHelper.INFO_BALISE} Showing commits {first}-{first + len(commits) - 1 if commits else 0} of {total} {scope}.")
+
+                if view.edits: print(f"{ViewHelper.INFO_BALISE} {len(view.edits)} edits staged, they are applied together in one rewrite.")
+
+                commit: Commit | str | None = ViewHelper.InquireCommit(
+                    "Select a commit to edit", commits, picker.hasPage(page + 1), page > 0, bool(picker.query), view.edits
+                )
+                match commit:
+                    case ViewHelper.NEXT_PAGE: page += 1
+                    case ViewHelper.PREVIOUS_PAGE: page -= 1
+                    case ViewHelper.SEARCH: picker.search(ViewHelper.InquireSearch(picker.query)); page = 0
+                    case ViewHelper.CLEAR_SEARCH: picker.search(""); page = 0
+                    case ViewHelper.REVIEW_EDITS: ViewHelper.EditManualQueue(view)
+                    case ViewHelper.APPLY_EDITS: break
+                    case None:
+                        if not view.edits or ViewHelper.InquireConfirm(f"Discard the {len(view.edits)} staged edits?"): break
+                    case _: ViewHelper.EditManualSingle(view, commit)
+
+        if commit is None:
+            view.clearEdits()
             return ViewState.EDIT_MENU
+        return ViewHelper.EditManualApply(view)
+
+    @staticmethod
+    def EditManualSingle(view: 'View', commit: Commit) -> None:
+        # Edits are only staged here, the history is replayed once for all of them by EditManualApply
+        current: str = view.edits[commit.oid][1].name if commit.oid in view.edits else commit.name
+        name: str = ViewHelper.InquireSingle(f"Enter the new commit message for '{commit.hashstr}, {current}', use '.' to keep it")
+        if name != '.': view.stageEdit(commit, name)
+
+    @staticmethod
+    def EditManualQueue(view: 'View') -> None:
 
-        print(f"{ViewHelper.INFO_BALISE} Found {len(commits)} commits in the current git folder.")
-        commit: Commit = ViewHelper.InquireCommit("Select a commit to edit", commits)
+        while view.edits:
+            choices: dict[str, str] = {f"{edited.hashstr}: {old!r} -> {edited.name!r}": oid for oid, (old, edited) in view.edits.items()}
+            answer: str = inquirer.prompt([
+                inquirer.List('edit', message="Select a staged edit to change", choices=list(choices) + ["Discard all", "Back"])
+            ])['edit']
 
-        if commit is None: return ViewState.EDIT_MENU
-        else: return ViewHelper.EditManualSingle(view, commit)
+            if answer == "Back": return
+            if answer == "Discard all":
+                if ViewHelper.InquireConfirm(f"Discard the {len(view.edits)} staged edits?"): view.clearEdits()
+                continue
+
+            edited: Commit = view.edits[choices[answer]][1]
+            name: str = ViewHelper.InquireSingle(f"Enter the new commit message for '{edited.hashstr}', use '.' to unstage the edit")
+            if name == '.': view.unstageEdit(edited.oid)
+            else: view.stageEdit(edited, name)
 
     @staticmethod
-    def EditManualSingle(view: 'View', commit: Commit) -> ViewState:
-        name: str = ViewHelper.InquireSingle(f"Enter the new commit message for '{commit}'")
-        view.git.renameCommit(view.currentGitFolder, commit.hashstr, name)
+    def EditManualApply(view: 'View') -> ViewState:
+
+        fp: str = view.currentGitFolder
+        edited: list[Commit] = [commit for _, commit in view.edits.values()]
+        plan: RewritePlan = view.git.planRewrite(fp, edited)
+        for line in plan.summary(): print(f"{ViewHelper.INFO_BALISE} {line}")
+        print(f"{ViewHelper.INFO_BALISE} Changes, oldest first:")
+        for change in plan.changes[:ViewHelper.PREVIEW_SIZE]: print(f"    {change.oid[:7]}: {change.old.splitlines()[0]!r} -> {change.new.splitlines()[0]!r}")
+        if len(plan.changes) > ViewHelper.PREVIEW_SIZE: print(f"    ... and {len(plan.changes) - ViewHelper.PREVIEW_SIZE} more")
+
+        if not ViewHelper.InquireConfirm("Apply this rewrite?"): return ViewState.EDIT_MANUAL
+
+        try:
+            # Every staged edit goes through a single rewrite, the history is replayed once
+            with view.git.span("EditManual.apply", repo=fp, modified=len(edited)):
+                view.git.renameCommits(fp, [c.oid for c in edited], [c.name for c in edited])
+        except (RuntimeError, ValueError) as e:
+            print(f"{ViewHelper.ERROR_BALISE} {e}")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the commit list... ")
+            return ViewState.EDIT_MANUAL
+
+        view.clearEdits()
+        print(f"{ViewHelper.INFO_BALISE} Commits modified successfully.")
+        input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the commit list... ")
         return ViewState.EDIT_MANUAL
 
     @staticmethod
@@ -186,13 +329,7 @@ class ViewHelper:
         ViewHelper.GitStatus(view.git)
         print(f"{ViewHelper.INFO_BALISE} Current Git Folder: {view.currentGitFolder}")
 
-        targets: list[str] = list()
-
-        while 1:
-            userInput: str = ViewHelper.InquireSingle("Enter the words you wish to replace in the commit messages, use '.' to end the input")
-            if userInput == '.': break
-            else: targets.append(userInput.strip())
-
+        targets: list[str] = ViewHelper.InquireTargets()
         if not targets:
             print(f"{ViewHelper.ERROR_BALISE} No targets provided, returning to the edit menu.")
             input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to continue... ")
@@ -200,47 +337,184 @@ class ViewHelper:
         
         print(f"{ViewHelper.INFO_BALISE} Targets: {', '.join(targets)}")
         replacement: str = ViewHelper.InquireSingle("Enter the replacement string for the targets")
+        fullMessage: bool = ViewHelper.InquireConfirm("Also clean the commit message bodies?")
+        refs: list[str] | None = GitService.ALL_REFS if ViewHelper.InquireConfirm("Clean every branch and tag at once?") else None
 
-        commits: list[Commit] = view.git.getCommits(view.currentGitFolder)
-        if not commits:
-            print(f"{ViewHelper.INFO_BALISE} No commits found in the current git folder.")
+        with view.git.span("EditBatch.scan", repo=view.currentGitFolder):
+            revisions: list[str] | None = sorted(view.git.listRefs(view.currentGitFolder, refs)) if refs else None
+            ret: list[Commit] = view.git.findReplacements(view.currentGitFolder, targets, replacement, fullMessage=fullMessage, revisions=revisions)
+            plan: RewritePlan | None = view.git.planRewrite(view.currentGitFolder, ret, fullMessage, refs=refs) if ret else None
+
+        if not ret:
+            print(f"{ViewHelper.INFO_BALISE} No commits were modified.")
             input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
             return ViewState.EDIT_MENU
         
-        print(f"{ViewHelper.INFO_BALISE} Found {len(commits)} commits in the current git folder.")
-        
-        ret: list[Commit] = list()
-        for commit in commits:
+        for line in plan.summary(): print(f"{ViewHelper.INFO_BALISE} {line}")
+        print(f"{ViewHelper.INFO_BALISE} Changes, oldest first:")
+        for change in plan.changes[:ViewHelper.PREVIEW_SIZE]: print(f"    {change.oid[:7]}: {change.old.splitlines()[0]!r} -> {change.new.splitlines()[0]!r}")
+        if len(plan.changes) > ViewHelper.PREVIEW_SIZE: print(f"    ... and {len(plan.changes) - ViewHelper.PREVIEW_SIZE} more")
 
-            newMessage: str = commit.name
-            for target in targets:
-                if target in commit.name:
-                    newMessage = newMessage.replace(target, replacement)
-            
-            if newMessage != commit.name:
-                ret.append(Commit(newMessage, commit.hashstr))
+        if not ViewHelper.InquireConfirm("Apply this rewrite?"):
+            print(f"{ViewHelper.INFO_BALISE} Rewrite cancelled, nothing was modified.")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+            return ViewState.EDIT_MENU
 
-        if not ret:
-            print(f"{ViewHelper.INFO_BALISE} No commits were modified.")
+        try:
+            with view.git.span("EditBatch.apply", repo=view.currentGitFolder, modified=len(ret)):
+                if fullMessage: view.git.rewriteMessages(view.currentGitFolder, ret, refs)
+                else: view.git.renameCommits(view.currentGitFolder, [i.oid for i in ret], [i.name for i in ret], refs=refs)
+        except (RuntimeError, ValueError) as e:
+            print(f"{ViewHelper.ERROR_BALISE} {e}")
             input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
             return ViewState.EDIT_MENU
-        
-        print(f"{ViewHelper.INFO_BALISE} {len(ret)} commits will be modified.")
-        print(ret, [i.hashstr for i in ret], [i.name for i in ret])
-        view.git.renameCommits(view.currentGitFolder, [i.hashstr for i in ret], [i.name for i in ret])
 
         print(f"{ViewHelper.INFO_BALISE} Commits modified successfully.")
         input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
         return ViewState.EDIT_MENU
 
+    @staticmethod
+    def EditScan(view: 'View') -> ViewState:
+
+        ViewHelper.Title()
+        ViewHelper.GitStatus(view.git)
+        print(f"{ViewHelper.INFO_BALISE} Current Git Folder: {view.currentGitFolder}")
+
+        report: ScanReport = view.git.scanMessages(view.currentGitFolder)
+        for line in report.summary(): print(f"{ViewHelper.INFO_BALISE} {line}")
+        for hit in report.hits[:ViewHelper.PREVIEW_SIZE]: print(f"    {hit.commit.hashstr} {hit.detector} ({hit.field} {hit.start}:{hit.end}): {hit.text!r}")
+        if len(report.hits) > ViewHelper.PREVIEW_SIZE: print(f"    ... and {len(report.hits) - ViewHelper.PREVIEW_SIZE} more")
+
+        if report.empty or not ViewHelper.InquireConfirm("Redact these matches?"):
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+            return ViewState.EDIT_MENU
+
+        replacement: str = ViewHelper.InquireSingle("Enter the replacement string for the matches") or "[redacted]"
+        commits: list[Commit] = report.redact(replacement)
+        plan: RewritePlan = view.git.planRewrite(view.currentGitFolder, commits, report.bodies)
+        for line in plan.summary(): print(f"{ViewHelper.INFO_BALISE} {line}")
+
+        if not ViewHelper.InquireConfirm("Apply this rewrite?"):
+            print(f"{ViewHelper.INFO_BALISE} Rewrite cancelled, nothing was modified.")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+            return ViewState.EDIT_MENU
+
+        try:
+            if report.bodies: view.git.rewriteMessages(view.currentGitFolder, commits)
+            else: view.git.renameCommits(view.currentGitFolder, [c.oid for c in commits], [c.name for c in commits])
+            print(f"{ViewHelper.INFO_BALISE} {len(commits)} commits redacted.")
+        except (RuntimeError, ValueError) as e:
+            print(f"{ViewHelper.ERROR_BALISE} {e}")
+
+        input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+        return ViewState.EDIT_MENU
+
+    @staticmethod
+    def EditIdentity(view: 'View') -> ViewState:
+
+        ViewHelper.Title()
+        ViewHelper.GitStatus(view.git)
+        print(f"{ViewHelper.INFO_BALISE} Current Git Folder: {view.currentGitFolder}")
+
+        email: str = ViewHelper.InquireSingle("Enter the author/committer email to replace")
+        newName: str = ViewHelper.InquireSingle("Enter the new name, use '.' to keep it")
+        newEmail: str = ViewHelper.InquireSingle("Enter the new email, use '.' to keep it")
+
+        if newName == '.' and newEmail == '.':
+            print(f"{ViewHelper.ERROR_BALISE} Nothing to replace, returning to the edit menu.")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to continue... ")
+            return ViewState.EDIT_MENU
+
+        identities: IdentityMap = IdentityMap()
+        identities.add(email, newName=None if newName == '.' else newName, newEmail=None if newEmail == '.' else newEmail)
+
+        try:
+            rewritten: dict[str, str] = view.git.rewriteIdentities(view.currentGitFolder, identities)
+        except (RuntimeError, ValueError) as e:
+            print(f"{ViewHelper.ERROR_BALISE} {e}")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+            return ViewState.EDIT_MENU
+
+        print(f"{ViewHelper.INFO_BALISE} {len(rewritten)} commits replayed successfully.")
+        input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+        return ViewState.EDIT_MENU
+
+    @staticmethod
+    def EditRecovery(view: 'View') -> ViewState:
+
+        ViewHelper.Title()
+        ViewHelper.GitStatus(view.git)
+        print(f"{ViewHelper.INFO_BALISE} Current Git Folder: {view.currentGitFolder}")
+
+        try:
+            journal: RewriteJournal | None = RewriteJournal.load(view.git, view.currentGitFolder)
+            if journal is not None:
+                print(f"{ViewHelper.INFO_BALISE} An interrupted {journal.operation} is pending ({len(journal.rewritten)} commits already rewritten).")
+                if ViewHelper.InquireConfirm("Resume it? (No rolls it back)", default=True):
+                    view.git.resumeRewrite(view.currentGitFolder)
+                    print(f"{ViewHelper.INFO_BALISE} Rewrite finished.")
+                else:
+                    oid: str = view.git.rollbackRewrite(view.currentGitFolder)
+                    print(f"{ViewHelper.INFO_BALISE} Branch restored to {oid[:7]}.")
+
+            else:
+                backups: list[tuple[str, str]] = RewriteJournal.backups(view.git, view.currentGitFolder)
+                if not backups: print(f"{ViewHelper.INFO_BALISE} No rewrite to undo.")
+                elif ViewHelper.InquireConfirm(f"Undo the last rewrite, back to {backups[0][1][:7]}?"):
+                    oid: str = view.git.rollbackRewrite(view.currentGitFolder)
+                    print(f"{ViewHelper.INFO_BALISE} Branch restored to {oid[:7]}.")
+
+        except (RuntimeError, ValueError) as e:
+            print(f"{ViewHelper.ERROR_BALISE} {e}")
+
+        input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the edit menu... ")
+        return ViewState.EDIT_MENU
+
+    @staticmethod
+    def EditMulti(view: 'View') -> ViewState:
+
+        ViewHelper.Title()
+        ViewHelper.GitStatus(view.git)
+
+        userInput: str = ViewHelper.InquireSingle("Enter a root directory, or a comma-separated list of git repositories")
+        paths: list[str] = [p.strip() for p in userInput.split(',') if p.strip()]
+        repos: list[str] = [r.path for r in view.scanner.scan(paths[0])] if len(paths) == 1 and not os.path.exists(os.path.join(paths[0], '.git')) else paths
+
+        if not repos:
+            print(f"{ViewHelper.ERROR_BALISE} No git repositories found, returning to the main menu.")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to continue... ")
+            return ViewState.MAIN
+
+        print(f"{ViewHelper.INFO_BALISE} Found {len(repos)} repositories.")
+        targets: list[str] = ViewHelper.InquireTargets()
+        if not targets:
+            print(f"{ViewHelper.ERROR_BALISE} No targets provided, returning to the main menu.")
+            input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to continue... ")
+            return ViewState.MAIN
+
+        replacement: str = ViewHelper.InquireSingle("Enter the replacement string for the targets")
+        results: list[RepoResult] = MultiRepoCleaner(log=view.git.hasLogger()).run(repos, targets, replacement)
+
+        for result in results:
+            print(f"{ViewHelper.INFO_BALISE if result.ok else ViewHelper.ERROR_BALISE} {result}")
+
+        failed: int = sum(1 for r in results if not r.ok)
+        print(f"{ViewHelper.INFO_BALISE} {len(results) - failed} repositories cleaned, {failed} failed.")
+        input(f"{ViewHelper.USER_INTERACTION_BALISE} Press Enter to return to the main menu... ")
+        return ViewState.MAIN
+
 
 
 class View:
 
-    def __init__(self, state: ViewState = ViewState.MAIN, log: bool = False) -> None:
+    def __init__(self, state: ViewState = ViewState.MAIN, log: bool = False, metrics: bool = False) -> None:
         self._state: ViewState = state
-        self._git: GitService = GitService(Logger() if log else None)
+        # Log lines are written as they come, a background writer would print them over the prompts
+        self._git: GitService = GitService(Logger(background=False) if log else None, cache=True, metrics=Metrics() if metrics else None)
+        self._scanner: RepoScanner = RepoScanner(self._git, cache=True)
         self._currentGitFolder: str | None = None
+        # Manual edits waiting to be applied together: oid -> (old subject, commit carrying the new one)
+        self._edits: dict[str, tuple[str, Commit]] = dict()
 
     @property
     def state(self) -> ViewState:
@@ -253,16 +527,45 @@ class View:
     def git(self) -> GitService:
         return self._git
 
+    @property
+    def scanner(self) -> RepoScanner:
+        return self._scanner
+
     @property
     def currentGitFolder(self) -> str | None:
         return self._currentGitFolder
     
     def setCurrentGitFolder(self, folder: str) -> None:
+        if folder != self._currentGitFolder: self.clearEdits()
         self._currentGitFolder = folder
 
     def removeCurrentGitFolder(self) -> None:
+        self.clearEdits()
         self._currentGitFolder = None
 
+    @property
+    def edits(self) -> dict[str, tuple[str, Commit]]:
+        return self._edits
+
+    def stageEdit(self, commit: Commit, name: str) -> None:
+
+        """
+        Stages a new subject for a commit of the current git folder, replacing any edit already staged for it.
+        Args:
+            commit (Commit): The commit, as listed from the history.
+            name (str): Its new subject. Staging the subject it already has unstages the edit.
+        """
+
+        old: str = self._edits[commit.oid][0] if commit.oid in self._edits else commit.name
+        if name == old: self.unstageEdit(commit.oid)
+        else: self._edits[commit.oid] = (old, commit.withMessage(name))
+
+    def unstageEdit(self, oid: str) -> None:
+        self._edits.pop(oid, None)
+
+    def clearEdits(self) -> None:
+        self._edits.clear()
+
     def display(self) -> None:
 
         while self.state != ViewState.QUIT:
@@ -276,7 +579,14 @@ class View:
                 case ViewState.EDIT_MENU: ret: ViewState = ViewHelper.EditMenu(self)
                 case ViewState.EDIT_MANUAL: ret: ViewState = ViewHelper.EditManual(self)
                 case ViewState.EDIT_BATCH: ret: ViewState = ViewHelper.EditBatch(self)
+                case ViewState.EDIT_MULTI: ret: ViewState = ViewHelper.EditMulti(self)
+                case ViewState.EDIT_IDENTITY: ret: ViewState = ViewHelper.EditIdentity(self)
+                case ViewState.EDIT_RECOVERY: ret: ViewState = ViewHelper.EditRecovery(self)
+                case ViewState.EDIT_SCAN: ret: ViewState = ViewHelper.EditScan(self)
                 case _: raise NotImplementedError(f"ViewState {self.state} is not implemented.")
 
             if ret: self.setState(ret)
 
+        if self.git.hasMetrics():
+            for line in self.git.metrics.summary(): print(f"{ViewHelper.INFO_BALISE} {line}")
+
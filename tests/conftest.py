@@ -0,0 +1,58 @@
+
+import subprocess
+
+import pytest
+
+
+def buildRepository(path: str, messages: list[str], start: int = 1_600_000_000) -> str:
+
+    """
+    Creates a linear repository, with main checked out. Commit i sets file.txt to "i", so the
+    commit hashes only depend on the messages and dates and are the same on every machine.
+    Args:
+        path (str): The directory to create the repository in.
+        messages (list[str]): The commit messages, oldest first.
+        start (int): The date of the first commit, each next one is a second later.
+    Returns:
+        str: The path of the repository.
+    """
+
+    chunks: list[bytes] = list()
+    for i, message in enumerate(messages):
+        data: bytes = f"{message}\n".encode('utf-8')
+        chunks.append(
+            b"commit refs/heads/main\nmark :%d\n" % (i + 1)
+            + b"author Test <test@example.com> %d +0000\ncommitter Test <test@example.com> %d +0000\n" % (start + i, start + i)
+            + b"data %d\n%s" % (len(data), data)
+            + (b"from :%d\n" % i if i else b"")
+            + b"M 100644 inline file.txt\ndata %d\n%d\n\n" % (len(b"%d\n" % i), i)
+        )
+
+    subprocess.run(['git', 'init', '-q', '-b', 'main', path], check=True)
+    subprocess.run(['git', '-C', path, 'fast-import', '--quiet', '--done'], input=b''.join(chunks) + b"done\n", check=True)
+    subprocess.run(['git', '-C', path, 'reset', '-q', '--hard', 'main'], check=True)
+    for key, value in (('user.name', 'Test'), ('user.email', 'test@example.com')):
+        subprocess.run(['git', '-C', path, 'config', key, value], check=True)
+    return path
+
+
+def subjects(path: str) -> list[str]:
+    # The subjects of the current branch, newest first
+    result: subprocess.CompletedProcess = subprocess.run(['git', '-C', path, 'log', '--format=%s'], capture_output=True, check=True)
+    return result.stdout.decode('utf-8').splitlines()
+
+
+@pytest.fixture
+def repo(tmp_path) -> str:
+    return buildRepository(str(tmp_path / "repo"), [f"commit {i} body word" for i in range(20)])
+
+
+# Found by brute force: in this chain, commits 100 and 244 share the abbreviated hash d36ce66
+COLLIDING_CHAIN: int = 13946
+COLLIDING_PREFIX: str = "d36ce66"
+COLLIDING_COMMITS: tuple[int, int] = (100, 244)
+
+
+@pytest.fixture
+def collidingRepo(tmp_path) -> str:
+    return buildRepository(str(tmp_path / "colliding"), [f"commit {i} of chain {COLLIDING_CHAIN}" for i in range(245)])
@@ -0,0 +1,33 @@
+
+from src.asyncGitService import AsyncGitService
+from src.commit import Commit
+from src.gitService import GitService
+
+import asyncio
+import sys
+
+import pytest
+
+
+def test_lists_many_repositories_across_event_loops(repo):
+    # One slot: the second listing waits on the semaphore, in each of the two loops
+    service: AsyncGitService = AsyncGitService(concurrency=1)
+    for _ in range(2):
+        results: dict[str, list[Commit] | Exception] = asyncio.run(service.listMany([repo, f"{repo}/."], limit=5))
+        assert [len(r) for r in results.values()] == [5, 5]
+
+
+def test_listing_survives_a_flood_of_stderr(repo, monkeypatch):
+    # Far more than a pipe buffer of warnings before the output, then one record
+    record: bytes = GitService().getCommits(repo, limit=1)[0].toRecord()
+    script: str = f"import sys; sys.stderr.write('w' * (1 << 22)); sys.stderr.flush(); sys.stdout.buffer.write({record!r} + b'\\0')"
+    monkeypatch.setattr(GitService, 'buildLogCommand', staticmethod(lambda *args: [sys.executable, '-c', script]))
+
+    service: AsyncGitService = AsyncGitService(timeout=20)
+    commits: list[Commit] = asyncio.run(service.getCommits(repo))
+    assert [c.oid for c in commits] == [Commit.fromRecord(record).oid]
+
+
+def test_failed_listing_reports_stderr(tmp_path):
+    with pytest.raises(RuntimeError, match="git log failed"):
+        asyncio.run(AsyncGitService().getCommits(str(tmp_path)))
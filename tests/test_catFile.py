@@ -0,0 +1,35 @@
+
+from src.catFile import CatFileSession, GitObject
+from src.gitService import GitService
+
+import os
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def test_sessions_are_pooled_per_repository_and_closed(git, repo):
+    session: CatFileSession = git.catFile(repo)
+    # Any spelling of the path, and every later lookup, reuses the same process
+    assert git.catFile(os.path.join(repo, '.')) is session
+    assert git.catFile(repo, check=True) is not session
+
+    head: str = subprocess.run(['git', '-C', repo, 'rev-parse', 'HEAD'], capture_output=True, check=True).stdout.decode('ascii').strip()
+    objects: list[GitObject | None] = session.query(['HEAD', 'HEAD~19', 'no-such-ref'] * 100)
+    assert len(objects) == 300 and objects[2] is None
+    assert objects[0].oid == head and objects[0].type == 'commit'
+    assert objects[1].message() == "commit 0 body word\n"
+    assert git.resolve(repo, 'HEAD') == head and git.catFile(repo) is session
+
+    # A session that died is replaced, and close shuts every pooled session down
+    session.close()
+    assert not session.alive
+    replacement: CatFileSession = git.catFile(repo)
+    assert replacement is not session and replacement.get('HEAD').oid == head
+    git.close()
+    assert not replacement.alive
@@ -0,0 +1,74 @@
+
+from src.commit import Commit
+from src.commitCache import CommitCache
+from src.gitService import GitService, RewriteBackend
+
+import subprocess
+
+import pytest
+
+from conftest import subjects
+
+
+def fields(commits: list[Commit]) -> list[tuple[str, str, str]]:
+    return [(c.oid, c.name, c.body) for c in commits]
+
+
+@pytest.fixture
+def git(tmp_path):
+    with GitService(cache=True, cacheDirectory=str(tmp_path / "cache")) as service: yield service
+
+
+def test_listing_is_extended_after_a_new_commit(git, repo, monkeypatch):
+    first: list[Commit] = git.getCommits(repo)
+    subprocess.run(['git', '-C', repo, 'commit', '-q', '--allow-empty', '-m', 'newer'], check=True)
+
+    # Only the new commit is read from git
+    read: list[list[str] | None] = list()
+    iterCommits = GitService.iterCommits
+    monkeypatch.setattr(GitService, 'iterCommits', lambda self, fp, **kwargs: read.append(kwargs.get('revisions')) or iterCommits(self, fp, **kwargs))
+
+    second: list[Commit] = git.getCommits(repo)
+    assert [c.name for c in second] == ["newer"] + [c.name for c in first]
+    assert read[-1] == [f"{first[0].oid}..{second[0].oid}"]
+
+
+def test_rewrite_invalidates_the_listing(git, repo):
+    commits: list[Commit] = git.getCommits(repo)
+    git.renameCommits(repo, [commits[4].oid], ["renamed"], RewriteBackend.FAST_IMPORT)
+
+    assert [c.name for c in git.getCommits(repo)] == subjects(repo)
+    assert git.getCommits(repo)[4].name == "renamed"
+
+
+def test_head_moved_to_a_non_ancestor_drops_the_entry(git, repo):
+    git.getCommits(repo)
+    # A side branch from main~5: the cached HEAD is not an ancestor of the new one
+    subprocess.run(['git', '-C', repo, 'checkout', '-q', '-b', 'side', 'main~5'], check=True)
+    subprocess.run(['git', '-C', repo, 'commit', '-q', '--allow-empty', '-m', 'side'], check=True)
+
+    assert [c.name for c in git.getCommits(repo)] == subjects(repo)
+    assert git.getCommits(repo)[0].name == "side"
+
+
+def test_listing_is_reloaded_from_disk(git, repo, tmp_path):
+    commits: list[Commit] = git.getCommits(repo)
+
+    # A new service has an empty memory level, the file written by the first one is read back
+    with GitService(cache=True, cacheDirectory=str(tmp_path / "cache")) as other:
+        head: str = other.resolve(repo, 'HEAD')
+        cached: list[Commit] | None = other.cache.lookup(repo, head)
+        assert cached is not None and fields(cached) == fields(commits)
+
+
+def test_filtered_listings_bypass_the_cache(git, repo):
+    git.getCommits(repo)
+    assert len(git.getCommits(repo, limit=3)) == 3
+    assert len(git.getCommits(repo)) == 20
+
+
+def test_memory_level_is_bounded(git, tmp_path):
+    cache: CommitCache = CommitCache(git, str(tmp_path / "bounded"), capacity=1)
+    cache.store("/a", "1" * 40, [])
+    cache.store("/b", "2" * 40, [])
+    assert list(cache._memory) == [CommitCache.key("/b")]
@@ -0,0 +1,48 @@
+
+from src.commit import Commit
+from src.commitPicker import CommitPicker
+
+from typing import Iterator
+
+
+def history(count: int, pulled: list[int]) -> Iterator[Commit]:
+    for i in range(count):
+        pulled[0] += 1
+        yield Commit(f"commit {i}", f"{i:040x}"[:7], f"{i:040x}")
+
+
+def settle(picker: CommitPicker) -> None:
+    if picker._thread is not None: picker._thread.join()
+
+
+def test_prefetch_only_reads_a_few_windows_ahead():
+    pulled: list[int] = [0]
+    with CommitPicker(history(10_000, pulled), window=10) as picker:
+        picker.page(0)
+        picker.prefetch(pages=2)
+        settle(picker)
+        assert pulled[0] == 3 * 10 + 1
+
+        # Paging moves the lookahead along
+        picker.page(5)
+        settle(picker)
+        assert pulled[0] == 8 * 10 + 1
+        assert not picker.exhausted
+
+
+def test_search_reads_the_whole_history():
+    pulled: list[int] = [0]
+    with CommitPicker(history(1_000, pulled), window=10) as picker:
+        picker.page(0)
+        picker.prefetch()
+        assert picker.search("commit 999") == 1
+        assert pulled[0] == 1_000 and picker.exhausted
+        assert picker.page(0)[0].name == "commit 999"
+
+
+def test_pages_without_prefetch_load_on_demand():
+    pulled: list[int] = [0]
+    with CommitPicker(history(25, pulled), window=10) as picker:
+        assert [c.name for c in picker.page(1)] == [f"commit {i}" for i in range(10, 20)]
+        assert pulled[0] == 21
+        assert len(picker.page(2)) == 5 and not picker.hasPage(3)
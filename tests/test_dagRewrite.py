@@ -0,0 +1,50 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def run(path: str, *args: str) -> str:
+    return subprocess.run(['git', '-C', path, *args], capture_output=True, check=True).stdout.decode('utf-8').strip()
+
+
+def shape(path: str) -> dict[str, list[str]]:
+    # Every commit of main by subject, with the subjects of its parents in order
+    subjects: dict[str, str] = dict(line.split(' ', 1) for line in run(path, 'log', '--format=%H %s', 'main').splitlines())
+    return {subjects[oid]: [subjects[p] for p in parents] for oid, *parents in (line.split() for line in run(path, 'rev-list', '--parents', 'main').splitlines())}
+
+
+@pytest.fixture
+def merged(repo) -> str:
+    # side forks from main~3, then is merged back into main without fast-forward
+    run(repo, 'checkout', '-q', '-b', 'side', 'main~3')
+    for i in range(2): run(repo, 'commit', '-q', '--allow-empty', '-m', f"side {i}")
+    run(repo, 'checkout', '-q', 'main')
+    run(repo, 'merge', '-q', '--no-ff', '-m', 'merge side', 'side')
+    return repo
+
+
+def test_parents_are_kept_across_a_merge(git, merged):
+    before: dict[str, list[str]] = shape(merged)
+    target: Commit = next(c for c in git.getCommits(merged) if c.name == "commit 10 body word")
+    git.renameCommits(merged, [target.oid], ["renamed"], RewriteBackend.DAG)
+
+    expected: dict[str, list[str]] = {("renamed" if s == target.name else s): [("renamed" if p == target.name else p) for p in ps] for s, ps in before.items()}
+    assert shape(merged) == expected
+    assert run(merged, 'rev-list', '--count', '--merges', 'main') == "1"
+
+
+def test_auto_picks_the_dag_walk_over_merges(git, merged):
+    target: Commit = next(c for c in git.getCommits(merged) if c.name == "commit 15 body word")
+    git.renameCommits(merged, [target.oid], ["renamed"])
+
+    assert run(merged, 'log', '-1', '--format=%p', 'main').count(' ') == 1
+    assert "renamed" in run(merged, 'log', '--format=%s', 'main').splitlines()
@@ -0,0 +1,56 @@
+
+from src.discovery import DiscoveredRepo, RepoKind, RepoScanner
+
+import json
+import os
+import shutil
+import subprocess
+
+from conftest import buildRepository
+
+
+def scan(root: str, **options) -> list[str]:
+    return [os.path.relpath(r.path, root) for r in RepoScanner(**options).scan(root)]
+
+
+def test_walk_descends_into_repositories(tmp_path):
+    root: str = str(tmp_path / "root")
+    outer: str = buildRepository(os.path.join(root, "outer"), ["outer"])
+    buildRepository(os.path.join(outer, "vendor", "inner"), ["inner"])
+    buildRepository(os.path.join(outer, "vendor", "inner", "deeper"), ["deeper"])
+    subprocess.run(['git', 'init', '-q', '--bare', os.path.join(root, "bare.git")], check=True)
+
+    assert scan(root) == ["outer", "outer/vendor/inner", "outer/vendor/inner/deeper"]
+    found: list[DiscoveredRepo] = RepoScanner(validate=False, bare=True).walk(root)
+    assert [(os.path.relpath(r.path, root), r.kind) for r in found] == [
+        ("bare.git", RepoKind.BARE), ("outer", RepoKind.REPOSITORY),
+        ("outer/vendor/inner", RepoKind.REPOSITORY), ("outer/vendor/inner/deeper", RepoKind.REPOSITORY),
+    ]
+
+
+def test_cache_is_kept_per_root_and_pruned(tmp_path):
+    roots: list[str] = [str(tmp_path / name) for name in ("first", "second")]
+    for root in roots:
+        buildRepository(os.path.join(root, "a"), ["a"])
+        buildRepository(os.path.join(root, "b"), ["b"])
+    cache: str = str(tmp_path / "cache")
+
+    for root in roots: assert scan(root, cache=True, cacheDirectory=cache) == ["a", "b"]
+    with open(os.path.join(cache, 'discovery.json'), 'r', encoding='utf-8') as f:
+        data: dict = json.load(f)
+    assert sorted(data['roots']) == roots
+    assert len(data['roots'][roots[0]]['validations']) == 2
+
+    # A removed repository leaves its root's entries, a removed root leaves the file
+    scanner: RepoScanner = RepoScanner(cache=True, cacheDirectory=cache)
+    assert len(scanner.scan(roots[0])) == 2
+    shutil.rmtree(os.path.join(roots[0], "b"))
+    assert len(scanner.scan(roots[0])) == 1
+    shutil.rmtree(roots[1])
+    assert scan(roots[0], cache=True, cacheDirectory=cache) == ["a"]
+
+    with open(os.path.join(cache, 'discovery.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    assert list(data['roots']) == [roots[0]]
+    assert os.path.join(roots[0], "b") not in data['roots'][roots[0]]['listings']
+    assert len(data['roots'][roots[0]]['validations']) == 1
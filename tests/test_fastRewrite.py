@@ -0,0 +1,47 @@
+
+from src.commit import Commit
+from src.fastRewrite import FastRewriter
+from src.gitService import GitService, RewriteBackend
+
+import subprocess
+
+import pytest
+
+from conftest import subjects
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def commitLatin1(path: str, message: bytes) -> None:
+    # A commit carrying an "encoding ISO-8859-1" header, its message is not valid UTF-8
+    messageFile: str = f"{path}/.git/MESSAGE"
+    with open(messageFile, 'wb') as f: f.write(message)
+    subprocess.run(['git', '-C', path, '-c', 'i18n.commitEncoding=ISO-8859-1', 'commit', '-q', '--allow-empty', '-F', messageFile], check=True)
+
+
+def test_rewrites_across_a_non_utf8_commit(git, repo):
+    commitLatin1(repo, b"caf\xe9 au lait\n")
+    commits: list[Commit] = git.getCommits(repo)
+    git.renameCommits(repo, [commits[5].oid], ["renamed"], RewriteBackend.FAST_IMPORT)
+
+    after: list[str] = subjects(repo)
+    assert after[0] == "café au lait" and after[5] == "renamed"
+
+
+def test_unreached_target_reports_the_export(git, repo):
+    subprocess.run(['git', '-C', repo, 'checkout', '-q', '-b', 'side', 'main~3'], check=True)
+    subprocess.run(['git', '-C', repo, 'commit', '-q', '--allow-empty', '-m', 'side only'], check=True)
+    side: str = git.getCommits(repo)[0].oid
+    before: str = subprocess.run(['git', '-C', repo, 'rev-parse', 'main'], capture_output=True, check=True).stdout.decode()
+
+    with pytest.raises(RuntimeError, match="targets not reached"):
+        FastRewriter(git).rewrite(repo, {side: "renamed"}, refs=['refs/heads/main'])
+    assert subprocess.run(['git', '-C', repo, 'rev-parse', 'main'], capture_output=True, check=True).stdout.decode() == before
+
+
+def test_failed_export_carries_git_error(git, repo):
+    with pytest.raises(RuntimeError, match="fast-export failed: .*no-such-ref"):
+        FastRewriter(git).rewrite(repo, {}, refs=['no-such-ref'])
@@ -0,0 +1,26 @@
+
+from src.gitService import GitService
+
+import sys
+import threading
+
+
+def test_stream_survives_a_flood_of_stderr():
+    # Far more than a pipe buffer of warnings, written before any output
+    script: str = "import sys; sys.stderr.write('w' * (1 << 22)); sys.stderr.flush(); sys.stdout.write('out' * 1000)"
+    chunks: list[bytes] = list()
+
+    with GitService() as git:
+        reader: threading.Thread = threading.Thread(target=lambda: chunks.extend(git.streamGitCommand([sys.executable, '-c', script])), daemon=True)
+        reader.start()
+        reader.join(timeout=30)
+
+    assert not reader.is_alive(), "the stream blocked on stderr"
+    assert b''.join(chunks) == b'out' * 1000
+
+
+def test_stream_closed_early_kills_the_process(repo):
+    with GitService() as git:
+        stream = git.streamGitCommand(['git', '-C', repo, 'log', '--format=%H'], chunkSize=8)
+        assert next(stream)
+        stream.close()
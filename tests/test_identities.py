@@ -0,0 +1,42 @@
+
+from src.commit import Commit
+from src.gitService import GitService
+from src.identityMap import IdentityMap
+
+import subprocess
+
+import pytest
+
+from conftest import buildRepository
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def log(path: str, format: str) -> list[str]:
+    return subprocess.run(['git', '-C', path, 'log', f'--format={format}'], capture_output=True, check=True).stdout.decode('utf-8').splitlines()
+
+
+def test_bodies_and_identities_are_rewritten(git, tmp_path):
+    repo: str = buildRepository(str(tmp_path / "repo"), [
+        "first\n\nbody mentions hunter2", "second", "third\n\nhunter2 again\n\nsigned-off",
+    ])
+    commits: list[Commit] = git.getCommits(repo)
+    assert [(c.name, c.authorName, c.authorEmail) for c in commits][-1] == ("first", "Test", "test@example.com")
+    assert commits[0].body == "hunter2 again\n\nsigned-off"
+
+    # Bodies are only cleaned when asked, and the subject of a matching body is kept
+    assert git.findReplacements(repo, ["hunter2"], "***") == []
+    cleaned: list[Commit] = git.findReplacements(repo, ["hunter2"], "***", fullMessage=True)
+    assert [c.name for c in cleaned] == ["third", "first"]
+    git.rewriteMessages(repo, cleaned)
+    assert log(repo, '%B%x00')[:4] == ["third", "", "*** again", ""]
+    assert "hunter2" not in "".join(log(repo, '%B'))
+
+    identities: IdentityMap = IdentityMap.fromMailmap("Proper Name <proper@example.com> <TEST@example.com>\n")
+    git.rewriteIdentities(repo, identities)
+    assert set(log(repo, '%an <%ae> %cn <%ce>')) == {"Proper Name <proper@example.com> Proper Name <proper@example.com>"}
+    # Dates and messages survive the identity rewrite
+    assert log(repo, '%at %s') == ["1600000002 third", "1600000001 second", "1600000000 first"]
@@ -0,0 +1,48 @@
+
+from src.logger import Logger, LogLevel
+
+import json
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh():
+    Logger.reset()
+    yield
+    Logger.reset()
+
+
+def test_records_after_close_are_written(capsys):
+    logger: Logger = Logger("test")
+    logger.logInfo("before")
+    logger.close()
+    logger.logInfo("after")
+    assert capsys.readouterr().out.splitlines() == ["[test] [INFO] before", "[test] [INFO] after"]
+
+
+def test_synchronous_logger_writes_before_returning(capsys):
+    logger: Logger = Logger("test", background=False)
+    print("prompt")
+    logger.logWarning("warned")
+    print("next prompt")
+    assert capsys.readouterr().out.splitlines() == ["prompt", "[test] [WARNING] warned", "next prompt"]
+
+
+def test_file_records_and_level_filter(tmp_path):
+    path: str = str(tmp_path / "log.jsonl")
+    logger: Logger = Logger("test", level=LogLevel.INFO, path=path, console=False)
+    logger.logDebug("dropped")
+    logger.logCommand(['git', '-C', '/repo', 'status'], 1, 0.5, b"fatal: boom")
+    logger.close()
+
+    with open(path, 'r', encoding='utf-8') as f: records: list[dict] = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]["repo"] == "/repo" and records[0]["level"] == "ERROR" and "fatal: boom" in records[0]["message"]
+
+
+def test_reset_builds_a_fresh_singleton():
+    first: Logger = Logger("first")
+    assert Logger("ignored") is first
+    Logger.reset()
+    assert Logger("second").description == "second"
@@ -0,0 +1,100 @@
+
+from src.gitService import GitService, RewriteBackend
+from src.maintenance import CompactionLevel, CompactionReport, PushResult
+from src.rewriteJournal import RewriteJournal
+
+import os
+import stat
+import subprocess
+
+import pytest
+
+from conftest import subjects
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def run(path: str, *args: str) -> str:
+    return subprocess.run(['git', '-C', path, *args], capture_output=True, check=True).stdout.decode('utf-8').strip()
+
+
+def exists(path: str, oid: str) -> bool:
+    return subprocess.run(['git', '-C', path, 'cat-file', '-e', f'{oid}^{{commit}}'], capture_output=True).returncode == 0
+
+
+def rename(git: GitService, repo: str, index: int = 4, name: str = "renamed") -> str:
+    # Returns the commit main pointed at before the rewrite
+    before: str = run(repo, 'rev-parse', 'main')
+    git.renameCommits(repo, [git.getCommits(repo)[index].oid], [name], RewriteBackend.FAST_IMPORT)
+    return before
+
+
+@pytest.fixture
+def remote(tmp_path, repo) -> str:
+    # A bare remote holding main, registered as origin with its remote-tracking ref
+    path: str = str(tmp_path / "remote.git")
+    subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', path], check=True)
+    run(repo, 'remote', 'add', 'origin', path)
+    run(repo, 'push', '-q', 'origin', 'main')
+    return path
+
+
+@pytest.mark.parametrize("level", list(CompactionLevel), ids=str)
+def test_compaction_keeps_the_backups_reachable(git, repo, level):
+    before: str = rename(git, repo)
+    report: CompactionReport = git.compactRepository(repo, level)
+
+    assert report.backups == 1 and report.dropped == 0
+    assert exists(repo, before)
+    run(repo, 'fsck', '--no-progress')
+    assert git.rollbackRewrite(repo) == before
+
+
+def test_dropping_backups_reclaims_the_old_history(git, repo):
+    before: str = rename(git, repo)
+    report: CompactionReport = git.compactRepository(repo, CompactionLevel.NORMAL, dropBackups=True)
+
+    assert report.dropped == 1 and report.backups == 0
+    assert not RewriteJournal.backups(git, repo)
+    assert not exists(repo, before)
+    assert subjects(repo)[4] == "renamed"
+
+
+def test_compaction_refuses_while_a_rewrite_is_pending(git, repo):
+    hook: str = os.path.join(repo, '.git', 'hooks', 'commit-msg')
+    with open(hook, 'w', encoding='utf-8') as f: f.write('#!/bin/sh\nexit 1\n')
+    os.chmod(hook, os.stat(hook).st_mode | stat.S_IEXEC)
+    with pytest.raises(RuntimeError):
+        git.renameCommits(repo, [git.getCommits(repo)[4].oid], ["stopped"], RewriteBackend.REBASE)
+
+    with pytest.raises(RuntimeError, match="pending"):
+        git.compactRepository(repo)
+
+
+def test_publish_force_pushes_the_rewritten_refs(git, repo, remote):
+    rename(git, repo)
+    results: list[PushResult] = git.publishRefs(repo, ['origin'])
+
+    assert [r.ok for r in results] == [True]
+    assert run(remote, 'rev-parse', 'main') == run(repo, 'rev-parse', 'main')
+
+
+@pytest.mark.parametrize("byPath", [False, True], ids=["tracking", "backup"])
+def test_lease_rejects_a_remote_that_moved(git, repo, remote, tmp_path, byPath):
+    # Someone else pushes to the remote; the local remote-tracking ref is not fetched
+    other: str = str(tmp_path / "other")
+    subprocess.run(['git', 'clone', '-q', remote, other], check=True)
+    run(other, '-c', 'user.name=Other', '-c', 'user.email=other@example.com', 'commit', '-q', '--allow-empty', '-m', 'theirs')
+    run(other, 'push', '-q', 'origin', 'main')
+    theirs: str = run(remote, 'rev-parse', 'main')
+
+    rename(git, repo)
+    # By path, no remote-tracking ref exists: the lease is the commit main held before the rewrite
+    results: list[PushResult] = git.publishRefs(repo, [remote if byPath else 'origin'])
+
+    assert not results[0].ok
+    assert results[0].rejected == ['refs/heads/main']
+    assert run(remote, 'rev-parse', 'main') == theirs
@@ -0,0 +1,67 @@
+
+from src.commit import Commit
+from src.matcher import MatchRule, MessageMatcher
+
+import pytest
+
+
+def test_literals_prefer_the_longest_target():
+    matcher: MessageMatcher = MessageMatcher.fromTargets(['foo', 'foobar', 'bar'], 'X')
+    assert matcher.sub("foobar foo bar baz") == "X X X baz"
+
+
+def test_literals_are_not_regular_expressions():
+    assert MessageMatcher.fromTargets(['a.b', '(x)'], '_').sub("a.b axb (x) x") == "_ axb _ x"
+
+
+def test_mapping_gives_each_target_its_replacement():
+    assert MessageMatcher.fromTargets({'cat': 'dog', 'red': 'blue'}).sub("red cat") == "blue dog"
+
+
+@pytest.mark.parametrize("targets, message, expected", [
+    ({r'c(o)mmit': r'C\1'}, "commit 10", "Co 10"),
+    ({r'(\w+)@corp': r'\1@x'}, "bob@corp", "bob@x"),
+    ({r'(?P<user>\w+)@corp': r'\g<user>@x'}, "bob@corp", "bob@x"),
+    ({r'(\w+)-(\d+)': r'\2-\1'}, "JIRA-12", "12-JIRA"),
+])
+def test_regex_replacements_use_their_own_groups(targets, message, expected):
+    assert MessageMatcher.fromTargets(targets, regex=True).sub(message) == expected
+
+
+def test_backreferences_next_to_literals_and_other_regexes():
+    matcher: MessageMatcher = MessageMatcher([
+        MatchRule('secret', '***'),
+        MatchRule(r'(a)(b)', r'\2\1', regex=True),
+        MatchRule(r'(\w)\1', r'<\1>', regex=True),
+        MatchRule(r'(?P<user>\w+)@corp', r'\g<user>@x', regex=True),
+    ])
+    assert matcher.sub("secret ab zz bob@corp") == "*** ba <z> bob@x"
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r'(a)\1', r'(a)(?:\3)'),
+    (r'[\1]\123', r'[\1]\123'),
+    (r'\\1', r'\\1'),
+    (r'\18', r'(?:\20)'),
+])
+def test_shift_backreferences(pattern, expected):
+    assert MessageMatcher.shiftBackreferences(pattern, 2) == expected
+
+
+def test_ignore_case_literals():
+    assert MessageMatcher.fromTargets(['Token'], 'X', ignoreCase=True).sub("token TOKEN ToKeN") == "X X X"
+
+
+def test_ignore_case_follows_re_case_folding():
+    # re matches "s" with the long s, str.lower does not map one onto the other
+    assert MessageMatcher.fromTargets(['ſ'], 'X', ignoreCase=True).sub('s S ſ') == "X X X"
+    assert MessageMatcher.fromTargets(['s'], 'X', ignoreCase=True).sub('ſ') == "X"
+
+
+def test_apply_returns_only_the_changed_commits():
+    commits: list[Commit] = [Commit("fix leak", "a1", body="leak"), Commit("other", "b2", body="leak")]
+    subjectsOnly: list[Commit] = MessageMatcher.fromTargets(['leak'], 'X').apply(commits)
+    assert [(c.hashstr, c.name, c.body) for c in subjectsOnly] == [("a1", "fix X", "leak")]
+
+    full: list[Commit] = MessageMatcher.fromTargets(['leak'], 'X').apply(commits, fullMessage=True)
+    assert [(c.name, c.body) for c in full] == [("fix X", "X"), ("other", "X")]
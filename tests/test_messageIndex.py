@@ -0,0 +1,51 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+from src.messageIndex import MessageIndex
+
+import subprocess
+
+import pytest
+
+from conftest import buildRepository
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def names(hits: dict[str, list[Commit]]) -> dict[str, list[str]]:
+    return {path: [c.name for c in commits] for path, commits in hits.items()}
+
+
+def test_index_is_built_updated_and_queried(git, repo, tmp_path):
+    other: str = buildRepository(str(tmp_path / "other"), ["Leaked token", "unleak nothing"])
+    path: str = str(tmp_path / "index.sqlite")
+
+    with MessageIndex(git, path) as index:
+        assert index.refresh([repo, other, str(tmp_path / "missing")]) == {repo: 20, other: 2}
+        assert len(index.search("word")[repo]) == 20
+        # Words match from their start, case-insensitively; a phrase is matched as a whole
+        assert names(index.search("LEAK")) == {other: ["Leaked token"]}
+        assert names(index.search("commit 12")) == {repo: ["commit 12 body word"]}
+        assert len(index.search("commit 1")[repo]) == 11
+        assert names(index.search("body wo", limit=2)) == {repo: ["commit 19 body word", "commit 18 body word"]}
+        assert index.search("token", repos=[repo]) == {}
+
+        # A new commit is indexed alone, a rewrite swaps the replayed commits
+        subprocess.run(['git', '-C', repo, 'commit', '-q', '--allow-empty', '-m', "commit 20 leak"], check=True)
+        assert index.update(repo) == 1
+        target: Commit = next(c for c in git.getCommits(repo) if c.name == "commit 15 body word")
+        git.renameCommits(repo, [target.oid], ["commit 15 leak"], RewriteBackend.FAST_IMPORT)
+        assert index.update(repo) == 12
+        assert index.update(repo) == 0
+        assert names(index.search("leak", repos=[repo])) == {repo: ["commit 20 leak", "commit 15 leak"]}
+        assert index.search("commit 15 body") == {}
+
+    # The index survives on disk, and a removed repository leaves no posting behind
+    with MessageIndex(git, path) as index:
+        assert set(index.repos) == {repo, other} and index.update(other) == 0
+        assert names(index.search("leak", repos=[other])) == {other: ["Leaked token"]}
+        index.remove(repo)
+        assert index.stats()["commits"] == 2 and index.search("word") == {}
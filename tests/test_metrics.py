@@ -0,0 +1,33 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+from src.metrics import Metrics
+
+import json
+
+import pytest
+
+
+def test_spans_and_commands_are_recorded(repo):
+    metrics: Metrics = Metrics()
+    with GitService(metrics=metrics) as git:
+        commits: list[Commit] = git.findReplacements(repo, ["word"], "term")
+        git.renameCommits(repo, [commits[0].oid], [commits[0].name], RewriteBackend.FAST_IMPORT)
+        with pytest.raises(ValueError):
+            git.renameCommits(repo, ["no-such-commit"], ["name"], RewriteBackend.FAST_IMPORT)
+
+    spans: dict[str, list[dict]] = dict()
+    for span in metrics.spans: spans.setdefault(span["name"], []).append(span)
+    assert spans["findReplacements"][0]["modified"] == 20 and spans["findReplacements"][0]["parent"] is None
+    assert [s.get("error") for s in spans["renameCommits"]] == [None, "ValueError"]
+    assert all(s["seconds"] >= 0 for s in metrics.spans)
+
+    # Every git process is counted under its subcommand, the cat-file sessions as spawns
+    assert Metrics.subcommand(['git', '-C', repo, '-c', 'a=b', '--no-pager', 'log']) == 'log'
+    assert metrics.commands['log'].calls >= 1 and metrics.commands['log'].bytesRead > 0
+    assert metrics.commands['fast-import'].calls == 1 and metrics.commands['cat-file'].spawns >= 1
+
+    snapshot: dict = json.loads(metrics.toJson())
+    assert snapshot["spawns"] == sum(c["spawns"] for c in snapshot["commands"].values())
+    assert len(snapshot["spans"]) == len(metrics.spans)
+    assert any(line.lstrip().startswith("span renameCommits") for line in metrics.summary())
@@ -0,0 +1,23 @@
+
+from src.multiRepo import MultiRepoCleaner, RepoResult
+
+import os
+
+from conftest import buildRepository, subjects
+
+
+def test_run_cleans_every_repository_and_isolates_failures(tmp_path):
+    first: str = buildRepository(str(tmp_path / "first"), [f"commit {i} secret" for i in range(5)])
+    second: str = buildRepository(str(tmp_path / "nested" / "second"), ["clean", "secret here", "clean again"])
+    missing: str = str(tmp_path / "plain")
+    os.mkdir(missing)
+
+    assert MultiRepoCleaner.discover(str(tmp_path)) == [first, second]
+    results: list[RepoResult] = MultiRepoCleaner(workers=2).run([first, missing, second], ["secret"], "redacted")
+
+    # One result per repository, in the input order, whatever the completion order
+    assert [r.path for r in results] == [first, missing, second]
+    assert [(r.ok, r.modified) for r in results] == [(True, 5), (False, 0), (True, 1)]
+    assert results[1].error == "not a git repository"
+    assert subjects(first) == [f"commit {i} redacted" for i in reversed(range(5))]
+    assert subjects(second) == ["clean again", "redacted here", "clean"]
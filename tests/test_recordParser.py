@@ -0,0 +1,72 @@
+
+from src.commit import Commit
+from src.recordParser import LazyCommit, RecordParser
+
+import pytest
+
+
+def fields(commit: Commit) -> tuple:
+    return (
+        commit.name, commit.hashstr, commit.oid, commit.body, commit.authorName, commit.authorEmail,
+        commit.authorDate, commit.committerName, commit.committerEmail, commit.committerDate
+    )
+
+
+def record(i: int) -> bytes:
+    # Bodies hold the field separator and multi-byte characters, they must survive any split
+    body: str = f"body {i}\nwith \x1f separator and é" if i % 3 else ""
+    commit: Commit = Commit(f"subject {i} ✓", f"{i:07x}", f"{i:040x}", body, "Ann", "ann@x", 1_600_000_000 + i, "Bob", "bob@x", 1_600_000_100 + i)
+    return commit.toRecord() + b'\n'
+
+
+@pytest.fixture
+def output() -> bytes:
+    return b''.join(record(i) + RecordParser.SEPARATOR for i in range(40))
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_parse_matches_the_eager_parser(output):
+    expected: list[tuple] = [fields(Commit.fromRecord(r)) for r in output.split(RecordParser.SEPARATOR) if r]
+    assert [fields(c) for c in RecordParser.parse(output)] == expected
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 97, 1000, 1 << 20])
+def test_chunk_boundaries_do_not_change_the_records(output, size):
+    assert [fields(c) for c in RecordParser.iterate(chunked(output, size))] == [fields(c) for c in RecordParser.parse(output)]
+
+
+def test_chunk_ending_on_a_separator():
+    first, second = record(1), record(2)
+    commits: list[Commit] = list(RecordParser.iterate([first + b'\0', second + b'\0']))
+    assert [c.name for c in commits] == ["subject 1 ✓", "subject 2 ✓"]
+
+
+def test_record_spread_over_many_chunks_is_held_pending():
+    parser: RecordParser = RecordParser()
+    data: bytes = record(5)
+    assert not list(parser.feed(data[:10]))
+    assert not list(parser.feed(data[10:20]))
+    assert repr(parser) == "RecordParser(pending=20)"
+    assert [c.name for c in parser.feed(data[20:] + b'\0')] == ["subject 5 ✓"]
+    assert repr(parser) == "RecordParser(pending=0)"
+
+
+def test_close_flushes_an_unterminated_record():
+    parser: RecordParser = RecordParser()
+    assert [c.oid for c in parser.feed(record(1) + b'\0' + record(2))] == [f"{1:040x}"]
+    assert [c.oid for c in parser.close()] == [f"{2:040x}"]
+    assert not list(parser.close())
+
+
+def test_empty_records_are_skipped():
+    assert [c.name for c in RecordParser.iterate([b'\0\0', record(3), b'\0', b'\0'])] == ["subject 3 ✓"]
+
+
+def test_records_inside_a_chunk_share_it():
+    chunk: bytes = record(1) + b'\0' + record(2) + b'\0'
+    commits: list[Commit] = list(RecordParser().feed(chunk))
+    assert all(isinstance(c, LazyCommit) and c._buffer is chunk for c in commits)
+    assert fields(commits[1].detach()) == fields(commits[1])
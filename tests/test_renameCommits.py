@@ -0,0 +1,61 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+
+import pytest
+
+from conftest import COLLIDING_COMMITS, COLLIDING_PREFIX, subjects
+
+
+BACKENDS: list[RewriteBackend] = [RewriteBackend.REBASE, RewriteBackend.FAST_IMPORT, RewriteBackend.DAG]
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_renames_only_the_targets(git, repo, backend):
+    commits: list[Commit] = git.getCommits(repo)
+    git.renameCommits(repo, [commits[3].oid, commits[12].oid], ["third", "twelfth"], backend)
+
+    after: list[str] = subjects(repo)
+    expected: list[str] = [c.name for c in commits]
+    expected[3], expected[12] = "third", "twelfth"
+    assert after == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_accepts_abbreviated_hashes(git, repo, backend):
+    commits: list[Commit] = git.getCommits(repo)
+    git.renameCommits(repo, [commits[5].hashstr], ["renamed"], backend)
+    assert subjects(repo)[5] == "renamed"
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+@pytest.mark.parametrize("index", COLLIDING_COMMITS)
+def test_colliding_prefix_renames_the_right_commit(git, collidingRepo, backend, index):
+    commits: list[Commit] = git.getCommits(collidingRepo)
+    target: Commit = commits[len(commits) - 1 - index]
+    assert target.oid.startswith(COLLIDING_PREFIX)
+
+    git.renameCommits(collidingRepo, [target.oid], ["RENAMED"], backend)
+
+    after: list[str] = subjects(collidingRepo)
+    assert after.count("RENAMED") == 1
+    assert after[len(commits) - 1 - index] == "RENAMED"
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_ambiguous_prefix_is_rejected(git, collidingRepo, backend):
+    before: list[str] = subjects(collidingRepo)
+    with pytest.raises(ValueError, match="Ambiguous"):
+        git.renameCommits(collidingRepo, [COLLIDING_PREFIX], ["RENAMED"], backend)
+    assert subjects(collidingRepo) == before
+
+
+def test_listing_abbreviations_are_unique(git, collidingRepo):
+    # git abbreviates past the shared prefix, so hashes taken from the listing stay usable
+    shown: list[str] = [c.hashstr for c in git.getCommits(collidingRepo) if c.oid.startswith(COLLIDING_PREFIX)]
+    assert len(shown) == 2 and all(len(h) > len(COLLIDING_PREFIX) for h in shown)
@@ -0,0 +1,145 @@
+
+from src.commit import Commit
+from src.dagRewrite import DagRewriter
+from src.gitService import GitService, RewriteBackend
+from src.rewriteJournal import RewriteJournal
+
+import os
+import stat
+import subprocess
+
+import pytest
+
+from conftest import COLLIDING_COMMITS, subjects
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def installHook(path: str) -> str:
+    # Rejects any message containing REJECT, as a commit-msg policy would
+    hook: str = os.path.join(path, '.git', 'hooks', 'commit-msg')
+    with open(hook, 'w', encoding='utf-8') as f: f.write('#!/bin/sh\n! grep -q REJECT "$1"\n')
+    os.chmod(hook, os.stat(hook).st_mode | stat.S_IEXEC)
+    return hook
+
+
+def revParse(path: str, revision: str) -> str:
+    return subprocess.run(['git', '-C', path, 'rev-parse', revision], capture_output=True, check=True).stdout.decode().strip()
+
+
+def test_stopped_rebase_resumes(git, repo):
+    commits: list[Commit] = git.getCommits(repo)
+    hook: str = installHook(repo)
+
+    with pytest.raises(RuntimeError, match="Rebase stopped"):
+        git.renameCommits(repo, [commits[12].oid, commits[3].oid], ["twelfth", "REJECT third"], RewriteBackend.REBASE)
+
+    # The commits replayed before the rejected one are checkpointed
+    journal: RewriteJournal | None = RewriteJournal.load(git, repo)
+    assert journal is not None and journal.status == RewriteJournal.INTERRUPTED
+    assert commits[12].oid in journal.rewritten
+
+    os.remove(hook)
+    git.resumeRewrite(repo)
+
+    expected: list[str] = [c.name for c in commits]
+    expected[12], expected[3] = "twelfth", "REJECT third"
+    assert subjects(repo) == expected
+    assert RewriteJournal.load(git, repo) is None
+
+
+def test_resume_picks_the_stopped_commit_by_full_oid(git, collidingRepo):
+    commits: list[Commit] = git.getCommits(collidingRepo)
+    newer, older = (commits[len(commits) - 1 - i] for i in reversed(COLLIDING_COMMITS))
+    hook: str = installHook(collidingRepo)
+
+    # The older commit is reworded first and rejected, the newer one shares its 7-character prefix
+    with pytest.raises(RuntimeError):
+        git.renameCommits(collidingRepo, [newer.oid, older.oid], ["newer", "REJECT older"], RewriteBackend.REBASE)
+    os.remove(hook)
+    git.resumeRewrite(collidingRepo)
+
+    after: list[str] = subjects(collidingRepo)
+    assert after[len(commits) - 1 - COLLIDING_COMMITS[0]] == "REJECT older"
+    assert after[len(commits) - 1 - COLLIDING_COMMITS[1]] == "newer"
+
+
+def test_pending_journal_blocks_new_rewrites(git, repo):
+    commits: list[Commit] = git.getCommits(repo)
+    installHook(repo)
+    with pytest.raises(RuntimeError):
+        git.renameCommits(repo, [commits[5].oid], ["REJECT"], RewriteBackend.REBASE)
+
+    with pytest.raises(RuntimeError, match="pending"):
+        git.renameCommits(repo, [commits[15].oid], ["other"], RewriteBackend.FAST_IMPORT)
+
+
+def test_rollback_restores_the_backup(git, repo):
+    before: str = revParse(repo, 'HEAD')
+    original: list[str] = subjects(repo)
+    commits: list[Commit] = git.getCommits(repo)
+    git.renameCommits(repo, [commits[4].oid], ["renamed"], RewriteBackend.FAST_IMPORT)
+
+    backups: list[tuple[str, str]] = RewriteJournal.backups(git, repo, 'refs/heads/main')
+    assert [oid for _, oid in backups] == [before]
+
+    assert git.rollbackRewrite(repo) == before
+    assert revParse(repo, 'main') == before and subjects(repo) == original
+
+
+def test_rollback_of_a_stopped_rebase(git, repo):
+    before: str = revParse(repo, 'HEAD')
+    commits: list[Commit] = git.getCommits(repo)
+    installHook(repo)
+    with pytest.raises(RuntimeError):
+        git.renameCommits(repo, [commits[5].oid], ["REJECT"], RewriteBackend.REBASE)
+
+    assert git.rollbackRewrite(repo) == before
+    assert revParse(repo, 'HEAD') == before
+    assert RewriteJournal.load(git, repo) is None
+    assert not os.path.isdir(os.path.join(repo, '.git', 'rebase-merge'))
+
+
+def test_other_refs_are_backed_up_and_restored(git, repo):
+    subprocess.run(['git', '-C', repo, 'branch', 'side', 'main~2'], check=True)
+    subprocess.run(['git', '-C', repo, 'tag', '-a', '-m', 'release', 'v1', 'main~5'], check=True)
+    subprocess.run(['git', '-C', repo, 'tag', 'light', 'main~1'], check=True)
+    refs: dict[str, str] = {ref: revParse(repo, ref) for ref in ('refs/heads/main', 'refs/heads/side', 'refs/tags/v1', 'refs/tags/light')}
+
+    target: Commit = git.getCommits(repo)[10]
+    git.renameCommits(repo, [target.oid], ["renamed"], refs=GitService.ALL_REFS)
+    assert all(revParse(repo, ref) != oid for ref, oid in refs.items())
+
+    backedUp: dict[str, str] = {RewriteJournal.backedUp(ref): oid for ref, oid in RewriteJournal.backups(git, repo)}
+    assert backedUp == refs
+
+    git.rollbackRewrite(repo)
+    assert {ref: revParse(repo, ref) for ref in refs} == refs
+
+
+def test_interrupted_dag_walk_resumes_from_its_checkpoint(git, repo, monkeypatch):
+    commits: list[Commit] = git.getCommits(repo)
+    moveRefs = DagRewriter._moveRefs
+
+    def interrupted(self, *args) -> None:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(DagRewriter, '_moveRefs', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        git.renameCommits(repo, [commits[8].oid], ["renamed"], RewriteBackend.DAG)
+
+    journal: RewriteJournal | None = RewriteJournal.load(git, repo)
+    assert journal is not None and len(journal.rewritten) == 9
+
+    # The checkpointed commits are not written again
+    written: list[bytes] = list()
+    monkeypatch.setattr(DagRewriter, '_moveRefs', moveRefs)
+    monkeypatch.setattr(DagRewriter, 'rewriteCommit', lambda *args: written.append(args) or args[0])
+    git.resumeRewrite(repo)
+
+    assert not written
+    assert subjects(repo)[8] == "renamed"
+    assert RewriteJournal.load(git, repo) is None
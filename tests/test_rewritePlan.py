@@ -0,0 +1,58 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+from src.rewritePlan import RewritePlan
+
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def run(path: str, *args: str) -> str:
+    return subprocess.run(['git', '-C', path, *args], capture_output=True, check=True).stdout.decode('utf-8').strip()
+
+
+def renamed(git: GitService, repo: str, *numbers: int) -> list[Commit]:
+    names: set[str] = {f"commit {n} body word" for n in numbers}
+    return [c.withMessage(f"renamed {c.name}") for c in git.getCommits(repo) if c.name in names]
+
+
+def test_plan_counts_the_replayed_commits_and_the_stale_refs(git, repo):
+    run(repo, 'branch', 'other', 'main~2')
+    run(repo, 'tag', 'old', 'main~10')
+    run(repo, 'tag', '-a', '-m', 'annotated', 'shared', 'main~5')
+    head: str = run(repo, 'rev-parse', 'main')
+
+    plan: RewritePlan = git.planRewrite(repo, renamed(git, repo, 15, 12))
+    assert plan.branch == "refs/heads/main" and plan.oldest.name == "commit 12 body word"
+    # Commits 12 to 19 get a new hash, the changes are listed in the order they are replayed
+    assert plan.replayed == 8 and plan.merges == 0
+    assert [c.old for c in plan.changes] == ["commit 12 body word", "commit 15 body word"]
+    assert plan.moved == ["refs/heads/main"]
+    assert sorted(plan.staleRefs) == ["refs/heads/other", "refs/tags/shared"]
+    assert plan.summary()[2] == "Changed: 2 messages, 8 commits with a new hash"
+    assert run(repo, 'rev-parse', 'main') == head
+
+    single: RewritePlan = git.planRewrite(repo, renamed(git, repo, 19))
+    assert single.replayed == 1 and single.staleRefs == []
+    assert single.summary()[2] == "Changed: 1 message, 1 commit with a new hash"
+    assert git.planRewrite(repo, []).summary() == ["Nothing to rewrite."]
+
+
+def test_plan_counts_the_merges_and_picks_their_backend(git, repo):
+    run(repo, 'checkout', '-q', '-b', 'side', 'main~3')
+    for i in range(2): run(repo, 'commit', '-q', '--allow-empty', '-m', f"side {i}")
+    run(repo, 'checkout', '-q', 'main')
+    run(repo, 'merge', '-q', '--no-ff', '-m', 'merge side', 'side')
+
+    plan: RewritePlan = git.planRewrite(repo, renamed(git, repo, 15))
+    # Commits 15 to 19, both side commits and the merge
+    assert plan.replayed == 8 and plan.merges == 1
+    assert plan.backend == str(RewriteBackend.DAG)
+    assert plan.summary()[2].endswith("(1 merge kept)")
+    assert plan.staleRefs == ["refs/heads/side"]
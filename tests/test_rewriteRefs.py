@@ -0,0 +1,102 @@
+
+from src.commit import Commit
+from src.gitService import GitService, RewriteBackend
+from src.rewritePlan import RewritePlan
+
+import subprocess
+
+import pytest
+
+
+BACKENDS: list[RewriteBackend] = [RewriteBackend.FAST_IMPORT, RewriteBackend.DAG]
+
+
+@pytest.fixture
+def git():
+    with GitService() as service: yield service
+
+
+def run(path: str, *args: str) -> str:
+    return subprocess.run(['git', '-C', path, *args], capture_output=True, check=True).stdout.decode('utf-8').strip()
+
+
+@pytest.fixture
+def branched(repo) -> str:
+    # feature forks from main~4 with two commits of its own; one annotated and one lightweight tag on main
+    run(repo, 'checkout', '-q', '-b', 'feature', 'main~4')
+    for i in range(2): run(repo, 'commit', '-q', '--allow-empty', '-m', f"feature {i}")
+    run(repo, 'checkout', '-q', 'main')
+    run(repo, 'tag', '-a', '-m', 'release notes', 'v1', 'main~2')
+    run(repo, 'tag', 'light', 'main~1')
+    return repo
+
+
+def target(git: GitService, repo: str) -> Commit:
+    # Shared by main, feature and both tags
+    return git.getCommits(repo)[6]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_rewrites_every_branch_in_one_pass(git, branched, backend):
+    shared: Commit = target(git, branched)
+    git.rewriteRefs(branched, GitService.ALL_REFS, subjects={shared.oid: "renamed"}, backend=backend)
+
+    assert run(branched, 'log', '--format=%s', '-1', 'main~6') == "renamed"
+    assert run(branched, 'log', '--format=%s', 'feature').splitlines()[:2] == ["feature 1", "feature 0"]
+    # The shared commit was replayed once: both branches still fork from the same commit
+    assert run(branched, 'merge-base', 'main', 'feature') == run(branched, 'rev-parse', 'main~4')
+    assert run(branched, 'log', '--format=%s', '-1', 'feature~4') == "renamed"
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_annotated_tag_is_recreated(git, branched, backend):
+    shared: Commit = target(git, branched)
+    before: str = run(branched, 'rev-parse', 'v1')
+    git.rewriteRefs(branched, GitService.ALL_REFS, subjects={shared.oid: "renamed"}, backend=backend)
+
+    assert run(branched, 'rev-parse', 'v1') != before
+    assert run(branched, 'cat-file', '-t', 'v1') == "tag"
+    assert run(branched, 'tag', '-l', '--format=%(contents)', 'v1') == "release notes"
+    assert run(branched, 'rev-parse', 'v1^{commit}') == run(branched, 'rev-parse', 'main~2')
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_lightweight_tag_is_moved(git, branched, backend):
+    shared: Commit = target(git, branched)
+    git.rewriteRefs(branched, GitService.ALL_REFS, subjects={shared.oid: "renamed"}, backend=backend)
+
+    assert run(branched, 'cat-file', '-t', 'light') == "commit"
+    assert run(branched, 'rev-parse', 'light') == run(branched, 'rev-parse', 'main~1')
+
+
+def test_refs_outside_the_selection_are_reported_stale(git, branched):
+    shared: Commit = target(git, branched)
+    feature: str = run(branched, 'rev-parse', 'feature')
+    renamed: Commit = shared.withMessage("renamed")
+
+    plan: RewritePlan = git.planRewrite(branched, [renamed], refs=['main'])
+    assert plan.moved == ['refs/heads/main']
+    assert sorted(plan.staleRefs) == ['refs/heads/feature', 'refs/tags/light', 'refs/tags/v1']
+    assert plan.replayed == 7 and [c.oid for c in plan.changes] == [shared.oid]
+
+    git.rewriteRefs(branched, ['main'], subjects={shared.oid: "renamed"})
+    assert run(branched, 'rev-parse', 'feature') == feature
+    assert run(branched, 'log', '--format=%s', '-1', 'main~6') == "renamed"
+
+
+def test_target_outside_the_refs_is_rejected(git, branched):
+    only: str = run(branched, 'rev-parse', 'feature')
+    with pytest.raises(ValueError, match="not on the selected refs"):
+        git.rewriteRefs(branched, ['main'], subjects={only: "renamed"})
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=str)
+def test_tag_of_a_tag_is_recreated(git, branched, backend):
+    run(branched, 'tag', '-a', '-m', 'outer notes', 'outer', 'v1')
+    shared: Commit = target(git, branched)
+    git.rewriteRefs(branched, GitService.ALL_REFS, subjects={shared.oid: "renamed"}, backend=backend)
+
+    # The outer tag still wraps the (re-created) inner one, which wraps the new commit
+    assert run(branched, 'cat-file', '-t', 'outer') == "tag"
+    assert run(branched, 'rev-parse', 'outer^{tag}^{}') == run(branched, 'rev-parse', 'main~2')
+    assert run(branched, 'tag', '-l', '--format=%(object)', 'outer') == run(branched, 'rev-parse', 'v1')
@@ -0,0 +1,48 @@
+
+from src.commit import Commit
+from src.commitCache import CommitCache
+from src.gitService import GitService, RewriteBackend
+
+import os
+import subprocess
+
+import pytest
+
+from conftest import subjects
+
+
+def run(path: str, *args: str) -> str:
+    return subprocess.run(['git', '-C', path, *args], capture_output=True, check=True).stdout.decode('utf-8').strip()
+
+
+def test_listings_and_rewrites_are_scoped(repo, tmp_path):
+    os.mkdir(os.path.join(repo, "docs"))
+    for i in range(2):
+        with open(os.path.join(repo, "docs", "notes.md"), 'w', encoding='utf-8') as f: f.write(f"{i}\n")
+        run(repo, 'add', 'docs')
+        run(repo, 'commit', '-q', '-m', f"docs {i} word")
+    run(repo, 'branch', 'other', 'main~5')
+    run(repo, 'checkout', '-q', '-b', 'side', 'main~10')
+    run(repo, 'commit', '-q', '--allow-empty', '-m', "side word")
+    run(repo, 'checkout', '-q', 'main')
+
+    with GitService(cache=CommitCache(str(tmp_path / "cache"))) as git:
+        # A full listing fills the cache, selected listings bypass it
+        assert len(git.getCommits(repo)) == 22
+        assert [c.name for c in git.getCommits(repo, limit=3)] == ["docs 1 word", "docs 0 word", "commit 19 body word"]
+        assert [c.name for c in git.getCommits(repo, paths=["docs"])] == ["docs 1 word", "docs 0 word"]
+        assert [c.name for c in git.getCommits(repo, since="@1600000017")] == ["docs 1 word", "docs 0 word", "commit 19 body word", "commit 18 body word", "commit 17 body word"]
+        assert [c.name for c in git.getCommits(repo, revisions=["other..main"])][-1] == "commit 17 body word"
+        assert [c.name for c in git.getCommits(repo, revisions=["side", "^main"])] == ["side word"]
+
+        found: list[Commit] = git.findReplacements(repo, ["word"], "term", revisions=["main~4..main"])
+        assert [c.name for c in found] == ["docs 1 term", "docs 0 term", "commit 19 body term", "commit 18 body term"]
+        git.renameCommits(repo, [c.oid for c in found], [c.name for c in found], RewriteBackend.FAST_IMPORT)
+        assert subjects(repo)[:5] == ["docs 1 term", "docs 0 term", "commit 19 body term", "commit 18 body term", "commit 17 body word"]
+
+        # Commits of another branch are refused before anything is replayed
+        head: str = run(repo, 'rev-parse', 'main')
+        side: list[Commit] = git.findReplacements(repo, ["word"], "term", revisions=["side", "^main"])
+        with pytest.raises(ValueError, match="not on the current branch"):
+            git.renameCommits(repo, [side[0].oid], [side[0].name], RewriteBackend.FAST_IMPORT)
+        assert run(repo, 'rev-parse', 'main') == head
@@ -0,0 +1,77 @@
+
+from src.commit import Commit
+from src.transform import CallableStage, ConventionalStage, RegexStage, TrailerStage, TransformPipeline
+
+import pytest
+
+
+def shout(subject: str, body: str) -> str:
+    return subject.upper()
+
+
+def history(count: int) -> list[Commit]:
+    return [Commit(f"commit {i}", f"{i:07x}", f"{i:040x}", f"body {i}") for i in range(count)]
+
+
+def test_stages_run_in_order():
+    stages = [RegexStage(r'commit', 'change'), RegexStage(r'change (\d+)', r'\1 changed')]
+    assert [c.name for c in TransformPipeline(stages, workers=1).apply(history(3))] == ["0 changed", "1 changed", "2 changed"]
+    # The other way round the second stage never matches
+    assert [c.name for c in TransformPipeline(stages[::-1], workers=1).apply(history(3))] == ["change 0", "change 1", "change 2"]
+
+
+def test_only_changed_commits_are_yielded():
+    changed: list[Commit] = list(TransformPipeline([RegexStage(r'^commit 1\d*$', 'one')], workers=1).apply(history(12)))
+    assert [(c.oid, c.name) for c in changed] == [(f"{i:040x}", "one") for i in (1, 10, 11)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_run_keeps_the_input_order(workers):
+    pipeline: TransformPipeline = TransformPipeline([RegexStage(r'(\d+)', r'#\1'), CallableStage(shout, parallel=True)], workers=workers, batch=4)
+    changed: list[Commit] = list(pipeline.apply(history(50)))
+    assert [c.name for c in changed] == [f"COMMIT #{i}" for i in range(50)]
+    assert pipeline.used == workers
+
+
+def test_unpicklable_stages_fall_back_to_serial():
+    pipeline: TransformPipeline = TransformPipeline([CallableStage(lambda s, b: s + "!", parallel=True)], workers=2, batch=4)
+    assert [c.name for c in pipeline.apply(history(20))] == [f"commit {i}!" for i in range(20)]
+    assert pipeline.used == 1
+
+
+def test_serial_stages_split_parallel_segments():
+    calls: list[str] = list()
+    record = CallableStage(lambda s, b: calls.append(s) or s)
+    stages = [RegexStage(r'commit', 'a'), record, RegexStage(r'a', 'b')]
+    pipeline: TransformPipeline = TransformPipeline(stages, workers=2, batch=4)
+    assert [c.name for c in pipeline.apply(history(20))] == [f"b {i}" for i in range(20)]
+    # The in-process stage saw the output of the first segment
+    assert calls == [f"a {i}" for i in range(20)]
+
+
+@pytest.mark.parametrize("body, keys, expected", [
+    ("Text.\n\nSigned-off-by: A <a@x>\nCo-authored-by: B <b@x>", None, "Text."),
+    ("Text.\n\nSigned-off-by: A <a@x>\nReviewed-by: B <b@x>", ["signed-off-by"], "Text.\n\nReviewed-by: B <b@x>"),
+    ("Text.\n\nFixes: a long\n  continued line\nSigned-off-by: A <a@x>", ["fixes"], "Text.\n\nSigned-off-by: A <a@x>"),
+    ("Text.\n\nNot a trailer paragraph\nSigned-off-by: A <a@x>", None, "Text.\n\nNot a trailer paragraph\nSigned-off-by: A <a@x>"),
+    ("Just text.", None, "Just text."),
+])
+def test_trailer_stage(body, keys, expected):
+    assert TrailerStage(keys).apply("subject", body) == ("subject", expected)
+
+
+@pytest.mark.parametrize("subject, expected", [
+    ("Feature (API) : Add X.", "feat(api): add X"),
+    ("fix: API timeout", "fix: API timeout"),
+    ("bugfix!: Crash on start", "fix!: crash on start"),
+    ("Update readme", "Update readme"),
+    ("unknown: thing", "unknown: thing"),
+    ("feat: ", "feat: "),
+])
+def test_conventional_stage(subject, expected):
+    assert ConventionalStage().apply(subject, "body") == (expected, "body")
+
+
+def test_pipeline_body_flag():
+    assert not TransformPipeline([ConventionalStage(), RegexStage('a', 'b')]).body
+    assert TransformPipeline([ConventionalStage(), TrailerStage()]).body
@@ -0,0 +1,54 @@
+
+from src.commit import Commit
+from src.rewriteJournal import RewriteJournal
+from src.view import View, ViewHelper, ViewState
+
+import builtins
+
+import pytest
+
+from conftest import subjects
+
+
+@pytest.fixture
+def view(tmp_path, monkeypatch):
+    # The view caches listings and discoveries, kept out of the user's cache
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / "cache"))
+    view: View = View(metrics=True)
+    yield view
+    view.git.close()
+
+
+def test_staged_edits_are_applied_in_one_rewrite(view, repo, monkeypatch):
+    view.setCurrentGitFolder(repo)
+    commits: list[Commit] = view.git.getCommits(repo)
+
+    view.stageEdit(commits[2], "first edit")
+    view.stageEdit(commits[2], "second edit")
+    view.stageEdit(commits[7], "another edit")
+    view.stageEdit(commits[9], "dropped edit")
+    # Staging the original subject again unstages the edit
+    view.stageEdit(commits[9], commits[9].name)
+    assert {oid: (old, c.name) for oid, (old, c) in view.edits.items()} == {
+        commits[2].oid: ("commit 17 body word", "second edit"), commits[7].oid: ("commit 12 body word", "another edit"),
+    }
+    assert subjects(repo) == [c.name for c in commits]
+
+    monkeypatch.setattr(ViewHelper, "InquireConfirm", staticmethod(lambda message, default=False: True))
+    monkeypatch.setattr(builtins, "input", lambda prompt="": "")
+    assert ViewHelper.EditManualApply(view) == ViewState.EDIT_MANUAL
+
+    assert subjects(repo)[2] == "second edit" and subjects(repo)[7] == "another edit"
+    assert not view.edits
+    # One rewrite, hence a single backup of the branch
+    assert [s["name"] for s in view.git.metrics.spans].count("renameCommits") == 1
+    assert len(RewriteJournal.backups(view.git, repo)) == 1
+
+
+def test_staged_edits_are_dropped_with_their_folder(view, repo, tmp_path):
+    view.setCurrentGitFolder(repo)
+    view.stageEdit(view.git.getCommits(repo)[0], "edit")
+    view.setCurrentGitFolder(repo)
+    assert len(view.edits) == 1
+    view.setCurrentGitFolder(str(tmp_path))
+    assert not view.edits